@@ -1,7 +1,16 @@
+import asyncio
+import os
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, Any, Optional, List
-from faster_whisper import WhisperModel
+from typing import Dict, Any, AsyncIterator, Iterable, Iterator, Optional, List, Tuple, Union
 
+import numpy as np
+
+from app.agents.model_registry import WhisperModelRegistry, get_model_registry
+from app.core.audio import AudioBuffer, WHISPER_SAMPLE_RATE, prepare_for_whisper
+from app.core.metrics import get_metrics
 
 
 @dataclass
@@ -13,46 +22,319 @@ class ASRResult:
     no_speech_prob: Optional[float]
 
 
+class ASRSegment:
+    """
+    One decoded segment. Slots instead of a dict per segment: a long
+    consultation yields thousands of these.
+    """
+    __slots__ = ("start", "end", "text", "avg_logprob", "no_speech_prob", "words")
+
+    def __init__(self,
+                 start: float,
+                 end: float,
+                 text: str,
+                 avg_logprob: Optional[float] = None,
+                 no_speech_prob: Optional[float] = None,
+                 words: Optional[List[Dict[str, Any]]] = None):
+        self.start = start
+        self.end = end
+        self.text = text
+        self.avg_logprob = avg_logprob
+        self.no_speech_prob = no_speech_prob
+        self.words = words
+
+    @classmethod
+    def from_whisper(cls, seg: Any, word_timestamps: bool = False) -> "ASRSegment":
+        words = None
+        if word_timestamps and getattr(seg, "words", None):
+            words = [
+                {
+                    "start": float(w.start),
+                    "end": float(w.end),
+                    "word": w.word.strip(),
+                    "probability": float(w.probability),
+                }
+                for w in seg.words
+            ]
+        # These fields may exist depending on build/version; keep safe:
+        avg_logprob = getattr(seg, "avg_logprob", None)
+        no_speech_prob = getattr(seg, "no_speech_prob", None)
+        return cls(float(seg.start), float(seg.end), seg.text.strip(),
+                   float(avg_logprob) if avg_logprob is not None else None,
+                   float(no_speech_prob) if no_speech_prob is not None else None,
+                   words)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        The ASRResult.segments entry for this segment.
+        """
+        d: Dict[str, Any] = {"start": self.start, "end": self.end, "text": self.text}
+        if self.words:
+            d["words"] = self.words
+        return d
+
+    def __repr__(self) -> str:
+        return f"ASRSegment({self.start:.2f}-{self.end:.2f}, {self.text!r})"
+
+
+class ConfidenceStats:
+    """
+    Running confidence aggregates over the segments seen so far, in O(1)
+    memory: the same averages ASRResult reports, plus the worst segment.
+    """
+    __slots__ = ("segments", "speech_seconds", "min_logprob", "max_no_speech",
+                 "_logprob_sum", "_logprob_n", "_no_speech_sum", "_no_speech_n")
+
+    def __init__(self):
+        self.segments = 0
+        self.speech_seconds = 0.0
+        self.min_logprob: Optional[float] = None
+        self.max_no_speech: Optional[float] = None
+        self._logprob_sum = 0.0
+        self._logprob_n = 0
+        self._no_speech_sum = 0.0
+        self._no_speech_n = 0
+
+    def add(self, seg: ASRSegment) -> None:
+        self.segments += 1
+        self.speech_seconds += max(0.0, seg.end - seg.start)
+        if seg.avg_logprob is not None:
+            self._logprob_sum += seg.avg_logprob
+            self._logprob_n += 1
+            if self.min_logprob is None or seg.avg_logprob < self.min_logprob:
+                self.min_logprob = seg.avg_logprob
+        if seg.no_speech_prob is not None:
+            self._no_speech_sum += seg.no_speech_prob
+            self._no_speech_n += 1
+            if self.max_no_speech is None or seg.no_speech_prob > self.max_no_speech:
+                self.max_no_speech = seg.no_speech_prob
+
+    @property
+    def avg_logprob(self) -> Optional[float]:
+        return self._logprob_sum / self._logprob_n if self._logprob_n else None
+
+    @property
+    def no_speech_prob(self) -> Optional[float]:
+        return self._no_speech_sum / self._no_speech_n if self._no_speech_n else None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "segments": self.segments,
+            "speech_seconds": round(self.speech_seconds, 3),
+            "avg_logprob": self.avg_logprob,
+            "no_speech_prob": self.no_speech_prob,
+            "min_logprob": self.min_logprob,
+            "max_no_speech": self.max_no_speech,
+        }
+
+
+class ASRStream:
+    """
+    Segments of one transcription, yielded as they are decoded (sync or async iteration).
+    keep=False does not collect segments, for flat memory on long audio.
+    """
+
+    def __init__(self, model: Any, model_input: Any, options: Dict[str, Any], model_size: str, keep: bool = True):
+        self._model = model
+        self._input = model_input
+        self._options = options
+        self._model_size = model_size
+        self._keep = keep
+        self._segments: List[ASRSegment] = []
+        self._iter: Optional[Iterator[ASRSegment]] = None
+        self.info: Any = None
+        self.stats = ConfidenceStats()
+        self.done = False
+
+    @property
+    def language(self) -> Optional[str]:
+        return getattr(self.info, "language", None)
+
+    @property
+    def duration(self) -> float:
+        return float(getattr(self.info, "duration", 0.0) or 0.0)
+
+    def _decode(self) -> Iterator[ASRSegment]:
+        metrics = get_metrics()
+        word_timestamps = self._options.get("word_timestamps", False)
+        busy = 0.0   # decoder time only, not the time the consumer spends between segments
+        try:
+            t0 = time.perf_counter()
+            # segments is lazy: decoding happens while iterating it, so both are timed
+            segments, self.info = self._model.transcribe(self._input, **self._options)
+            segments = iter(segments)
+            while True:
+                raw = next(segments, None)
+                busy += time.perf_counter() - t0
+                if raw is None:
+                    break
+                seg = ASRSegment.from_whisper(raw, word_timestamps)
+                self.stats.add(seg)
+                if self._keep:
+                    self._segments.append(seg)
+                yield seg
+                t0 = time.perf_counter()
+            self.done = True
+        finally:
+            metrics.observe("ics_asr_decode_seconds", busy, model=self._model_size)
+            if self.done:
+                metrics.inc("ics_asr_audio_seconds_total", self.duration, model=self._model_size)
+
+    def __iter__(self) -> Iterator[ASRSegment]:
+        if self._iter is None:
+            self._iter = self._decode()
+        return self._iter
+
+    async def __aiter__(self) -> AsyncIterator[ASRSegment]:
+        it = iter(self)
+        while True:
+            seg = await asyncio.to_thread(next, it, None)
+            if seg is None:
+                return
+            yield seg
+
+    def result(self) -> ASRResult:
+        """
+        Decode whatever is left and return the whole transcription.
+        """
+        if not self._keep:
+            raise RuntimeError("ASRStream(keep=False) does not collect segments")
+        for _ in self:
+            pass
+        return ASRResult(
+            text=" ".join(seg.text for seg in self._segments if seg.text),
+            language=self.language,
+            segments=[seg.to_dict() for seg in self._segments],
+            avg_logprob=self.stats.avg_logprob,
+            no_speech_prob=self.stats.no_speech_prob,
+        )
+
+
+def resolve_parallelism(num_workers: int = 0, cpu_threads: int = 0) -> Tuple[int, int]:
+    """
+    0 means "auto": split the cores into workers of ~4 threads each
+    (CTranslate2's default intra-op thread count), e.g. 16 cores -> 4 x 4.
+    """
+    cores = os.cpu_count() or 1
+    if num_workers <= 0:
+        num_workers = max(1, cores // 4)
+    if cpu_threads <= 0:
+        cpu_threads = max(1, cores // num_workers)
+    return num_workers, cpu_threads
+
+
+def asr_fingerprint(model_size: str, device: str, compute_type: str, language: Optional[str] = "en") -> Dict[str, Any]:
+    """
+    Everything that changes the transcript for a given audio input.
+    """
+    return {
+        "model_size": model_size,
+        "device": device,
+        "compute_type": compute_type,
+        "language": language,
+        "beam_size": 5,
+        "vad_filter": True,
+    }
+
+
 class ASRAgent:
     """
     ASR Agent using faster-whisper.
     Converts audio -> transcript + basic confidence signals.
+    Models come from the shared registry; num_workers > 1 decodes in parallel (0 = auto).
     """
 
-    def __init__(self, model_size: str = "small", device: str = "cpu", compute_type: str = "int8"):
-        self.model = WhisperModel(model_size, device=device, compute_type=compute_type)
+    def __init__(self,
+                 model_size: str = "small",
+                 device: str = "cpu",
+                 compute_type: str = "int8",
+                 registry: Optional[WhisperModelRegistry] = None,
+                 num_workers: int = 1,
+                 cpu_threads: int = 0):
+        registry = registry or get_model_registry()
+        self.model_size = model_size
+        self.device = device
+        self.compute_type = compute_type
+        self.num_workers, cpu_threads = resolve_parallelism(num_workers, cpu_threads)
+        key = (model_size, device, compute_type, self.num_workers, cpu_threads)
+        self.model = registry.acquire(*key)
+        # release our reference when closed or garbage collected
+        self._release = weakref.finalize(self, registry.release, *key)
+
+    def close(self) -> None:
+        self._release()
+
+    def fingerprint(self, language: Optional[str] = "en") -> Dict[str, Any]:
+        return asr_fingerprint(self.model_size, self.device, self.compute_type, language)
+
+    def stream(self,
+               audio: Union[str, os.PathLike, AudioBuffer],
+               language: Optional[str] = "en",
+               sample_rate: int = WHISPER_SAMPLE_RATE,
+               initial_prompt: Optional[str] = None,
+               word_timestamps: bool = False,
+               keep: bool = True) -> ASRStream:
+        """
+        Like transcribe(), but yields ASRSegments as they are decoded.
+        """
+        if isinstance(audio, (str, os.PathLike)):
+            model_input: Union[str, np.ndarray] = os.fspath(audio)
+        else:
+            model_input = prepare_for_whisper(audio, sample_rate)
 
-    def transcribe(self, audio_path: str, language: Optional[str] = "en") -> ASRResult:
-        segments, info = self.model.transcribe(
-            audio_path,
+        options = dict(
             language=language,
             vad_filter=True,
-            beam_size=5
+            beam_size=5,
+            initial_prompt=initial_prompt,
+            word_timestamps=word_timestamps,
         )
+        return ASRStream(self.model, model_input, options, self.model_size, keep=keep)
 
-        seg_list = []
-        texts = []
-        avg_logprob_vals = []
-        no_speech_vals = []
-
-        for seg in segments:
-            seg_list.append({
-                "start": float(seg.start),
-                "end": float(seg.end),
-                "text": seg.text.strip()
-            })
-            texts.append(seg.text.strip())
-
-            # These fields may exist depending on build/version; keep safe:
-            if getattr(seg, "avg_logprob", None) is not None:
-                avg_logprob_vals.append(float(seg.avg_logprob))
-            if getattr(seg, "no_speech_prob", None) is not None:
-                no_speech_vals.append(float(seg.no_speech_prob))
+    def transcribe(self,
+                   audio: Union[str, os.PathLike, AudioBuffer],
+                   language: Optional[str] = "en",
+                   sample_rate: int = WHISPER_SAMPLE_RATE,
+                   initial_prompt: Optional[str] = None,
+                   word_timestamps: bool = False) -> ASRResult:
+        """
+        audio: a file path or an in-memory PCM buffer at sample_rate (resampled in memory).
+        initial_prompt conditions the decoder; word_timestamps adds "words" to every segment.
+        """
+        return self.stream(audio, language, sample_rate, initial_prompt, word_timestamps).result()
 
-        return ASRResult(
-            text=" ".join([t for t in texts if t]),
-            language=getattr(info, "language", None),
-            segments=seg_list,
-            avg_logprob=(sum(avg_logprob_vals) / len(avg_logprob_vals)) if avg_logprob_vals else None,
-            no_speech_prob=(sum(no_speech_vals) / len(no_speech_vals)) if no_speech_vals else None,
-        )
+    def transcribe_batch(self,
+                         chunks: Iterable[Union[str, os.PathLike, AudioBuffer]],
+                         language: Optional[str] = "en",
+                         sample_rate: int = WHISPER_SAMPLE_RATE,
+                         max_workers: Optional[int] = None) -> Iterator[ASRResult]:
+        """
+        Transcribe independent chunks in parallel, yielding results in input order.
+        At most 2 x workers chunks are in flight.
+        """
+        workers = max(1, max_workers or self.num_workers)
+        source = iter(chunks)
+        pending: Dict[int, Future] = {}
+        next_submit = 0
+        next_yield = 0
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asr") as pool:
+            try:
+                while True:
+                    while len(pending) < 2 * workers:
+                        try:
+                            chunk = next(source)
+                        except StopIteration:
+                            break
+                        pending[next_submit] = pool.submit(self.transcribe, chunk, language, sample_rate)
+                        next_submit += 1
+
+                    if not pending:
+                        return
+
+                    yield pending.pop(next_yield).result()
+                    next_yield += 1
+            finally:
+                # consumer stopped early (or a chunk failed): drop queued work
+                for fut in pending.values():
+                    fut.cancel()
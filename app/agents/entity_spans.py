@@ -0,0 +1,159 @@
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# NegEx-style triggers, as lowercase token tuples.
+# PRE triggers negate terms that follow them in the same clause ("denies chest pain"),
+# POST triggers negate terms that precede them ("fever was ruled out").
+NEGATION_PRE = (
+    ("no",), ("not",), ("denies",), ("denied",), ("deny",), ("without",), ("never",),
+    ("negative", "for"), ("free", "of"), ("absence", "of"), ("no", "evidence", "of"),
+    ("no", "signs", "of"), ("no", "history", "of"), ("rules", "out"), ("ruled", "out"),
+)
+NEGATION_POST = (
+    ("ruled", "out"), ("was", "ruled", "out"), ("absent",), ("negative",), ("resolved",), ("denied",),
+)
+# Conjunctions that end a negation's scope ("no fever but cough": cough is affirmed)
+NEGATION_TERMINATORS = frozenset({"but", "however", "although", "though", "except", "yet", "aside"})
+
+PRE_WINDOW = 5    # tokens between a pre-trigger and the term
+POST_WINDOW = 3   # tokens between the term and a post-trigger
+
+
+@dataclass
+class EntitySpan:
+    start: int           # character span within its source text
+    end: int
+    source: str          # transcript | soap
+    section: Optional[str]   # S / O / A / P for SOAP spans, else None
+    category: str
+    canonical: str
+    matched: str         # ontology synonym that matched
+    text: str            # surface form as written
+    negated: bool = False
+    confidence: float = 1.0
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "EntitySpan":
+        return cls(**d)
+
+
+def _ends_with(tokens: Sequence[str], end: int, trigger: Tuple[str, ...], lo: int) -> bool:
+    start = end - len(trigger)
+    return start >= lo and tuple(tokens[start:end]) == trigger
+
+
+def _starts_with(tokens: Sequence[str], start: int, trigger: Tuple[str, ...], hi: int) -> bool:
+    end = start + len(trigger)
+    return end <= hi and tuple(tokens[start:end]) == trigger
+
+
+def is_negated(tokens: Sequence[str], breaks: Sequence[bool], token_start: int, token_end: int) -> bool:
+    """
+    NegEx-lite: is the term at tokens[token_start:token_end] negated?
+    Scopes stop at clause breaks and terminating conjunctions.
+    """
+    # backwards from the term to the start of its clause
+    lo = token_start
+    while lo > 0 and token_start - lo < PRE_WINDOW + 3 and not breaks[lo]:
+        if tokens[lo - 1] in NEGATION_TERMINATORS:
+            break
+        lo -= 1
+    for end in range(token_start, max(lo, token_start - PRE_WINDOW), -1):
+        if any(_ends_with(tokens, end, t, lo) for t in NEGATION_PRE):
+            return True
+
+    # forwards to the end of the clause
+    hi = token_end
+    n = len(tokens)
+    while hi < n and hi - token_end < POST_WINDOW + 3 and not breaks[hi]:
+        if tokens[hi] in NEGATION_TERMINATORS:
+            break
+        hi += 1
+    for start in range(token_end, min(hi, token_end + POST_WINDOW)):
+        if any(_starts_with(tokens, start, t, hi) for t in NEGATION_POST):
+            return True
+    return False
+
+
+def span_confidence(canonical: str, matched: str, surface: str) -> float:
+    """
+    Heuristic: canonical name 1.0, synonym 0.9, short single words -0.2.
+    """
+    conf = 1.0 if matched.lower() == canonical.replace("_", " ").lower() else 0.9
+    if " " not in surface.strip() and len(surface) <= 4:
+        conf -= 0.2
+    return round(conf, 2)
+
+
+class SpanIndex:
+    """
+    Interval index over entity spans, per source text.
+    Overlaps are resolved at build time (longest span wins), so queries are bisects.
+    """
+
+    def __init__(self, spans: Iterable[EntitySpan]):
+        by_source: Dict[str, List[EntitySpan]] = {}
+        for s in spans:
+            by_source.setdefault(s.source, []).append(s)
+
+        self._spans: Dict[str, List[EntitySpan]] = {}
+        self._starts: Dict[str, List[int]] = {}
+        self._ends: Dict[str, List[int]] = {}
+        for source, items in by_source.items():
+            kept = self._resolve(items)
+            self._spans[source] = kept
+            self._starts[source] = [s.start for s in kept]
+            self._ends[source] = [s.end for s in kept]
+
+    @staticmethod
+    def _resolve(spans: List[EntitySpan]) -> List[EntitySpan]:
+        # greedy by length: a span is kept unless it overlaps an already kept,
+        # different span. Keeps result disjoint up to identical (start, end).
+        kept: List[EntitySpan] = []
+        taken: List[Tuple[int, int]] = []   # sorted disjoint intervals
+        for s in sorted(spans, key=lambda s: (-(s.end - s.start), s.start)):
+            i = bisect_left(taken, (s.start, s.end))
+            if i < len(taken) and taken[i] == (s.start, s.end):
+                kept.append(s)
+                continue
+            if i > 0 and taken[i - 1][1] > s.start:
+                continue
+            if i < len(taken) and taken[i][0] < s.end:
+                continue
+            taken.insert(i, (s.start, s.end))
+            kept.append(s)
+        kept.sort(key=lambda s: (s.start, s.end))
+        return kept
+
+    def __iter__(self) -> Iterator[EntitySpan]:
+        for source in sorted(self._spans):
+            yield from self._spans[source]
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._spans.values())
+
+    def spans(self, source: Optional[str] = None) -> List[EntitySpan]:
+        if source is None:
+            return list(self)
+        return list(self._spans.get(source, ()))
+
+    def overlapping(self, source: str, start: int, end: int) -> List[EntitySpan]:
+        """
+        Spans of `source` intersecting the character range [start, end).
+        """
+        spans = self._spans.get(source)
+        if not spans:
+            return []
+        lo = bisect_right(self._ends[source], start)
+        hi = bisect_left(self._starts[source], end)
+        return spans[lo:hi]
+
+    def at(self, source: str, offset: int) -> List[EntitySpan]:
+        return self.overlapping(source, offset, offset + 1)
+
+    def in_section(self, section: str) -> List[EntitySpan]:
+        return [s for s in self._spans.get("soap", ()) if s.section == section]
+
+    def by_canonical(self, canonical: str, include_negated: bool = True) -> List[EntitySpan]:
+        return [s for s in self if s.canonical == canonical and (include_negated or not s.negated)]
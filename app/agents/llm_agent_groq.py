@@ -1,64 +1,114 @@
-from groq import Groq
-from groq import BadRequestError
+import threading
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+import httpx
+from groq import AsyncGroq
+from groq import APIConnectionError, APIError, APIStatusError, APITimeoutError
+
+from app.agents.llm_backend import (
+    BaseLLMAgent,
+    LLMChunk,
+    LLMCompletion,
+    LLMError,
+    LLMUsage,
+    parse_retry_after,
+    status_retryable,
+)
 
 FALLBACK_MODELS = [
     "llama-3.3-70b-versatile",
     "llama-3.1-8b-instant",
 ]
 
-class GroqLLMAgent:
-    """
-    LLM Agent using Groq API (LLaMA).
-    Input: transcript text
-    Output: SOAP note in English
-    """
-    def __init__(self, api_key: str, model: str):
-        self.client = Groq(api_key=api_key)
-        self.model = model
+# One pooled client per (api_key, base_url, timeout, max_connections), shared by all agents.
+# Used only from the shared event loop in app.core.aio.
+_clients: Dict[Tuple[str, Optional[str], float, int], AsyncGroq] = {}
+_clients_lock = threading.Lock()
 
-    def _call(self, model: str, messages, temperature=0.2, max_tokens=700):
-        return self.client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=max_tokens,
-        )
 
-    def generate_soap(self, transcript: str):
-        system_prompt = (
-            "You are a clinical documentation assistant. "
-            "Write a clean SOAP note in English. "
-            "Do not add any information that is not in the transcript. "
-            "If something is missing, write 'Not mentioned'."
-        )
+def _shared_client(api_key: str, timeout: float, max_connections: int, base_url: Optional[str] = None) -> AsyncGroq:
+    key = (api_key, base_url, timeout, max_connections)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(timeout, connect=min(5.0, timeout)),
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                ),
+            )
+            # retries are handled by the agent (jittered backoff + model fallback);
+            # base_url None -> GROQ_BASE_URL or the public endpoint
+            client = AsyncGroq(api_key=api_key, base_url=base_url, http_client=http_client,
+                               max_retries=0, timeout=timeout)
+            _clients[key] = client
+        return client
 
-        user_prompt = f"""TRANSCRIPT:
-{transcript}
 
-TASK:
-Create a SOAP note with the following sections:
-S: Subjective
-O: Objective
-A: Assessment
-P: Plan
+def _to_llm_error(err: APIError) -> LLMError:
+    if isinstance(err, (APITimeoutError, APIConnectionError)):
+        return LLMError(str(err), retryable=True)
+    if isinstance(err, APIStatusError):
+        return LLMError(str(err),
+                        retryable=status_retryable(err.status_code),
+                        retry_after=parse_retry_after(err.response.headers.get("retry-after")),
+                        status=err.status_code)
+    return LLMError(str(err))
 
-Return only the SOAP note text.
-"""
 
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ]
+class GroqLLMAgent(BaseLLMAgent):
+    """
+    LLM Agent using Groq API (LLaMA).
+    Input: transcript text
+    Output: SOAP note in English
+    """
+    backend = "groq"
 
-        models_to_try = [self.model] + [m for m in FALLBACK_MODELS if m != self.model]
+    def __init__(self,
+                 api_key: str,
+                 model: str,
+                 timeout: float = 30.0,
+                 max_retries: int = 3,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 8.0,
+                 hedge_after: float = 0.0,
+                 max_connections: int = 20,
+                 base_url: Optional[str] = None):
+        super().__init__(model, timeout, max_retries, backoff_base, backoff_max, hedge_after,
+                         fallback_models=FALLBACK_MODELS)
+        self.client = _shared_client(api_key, timeout, max_connections, base_url)
 
-        last_err = None
-        for m in models_to_try:
-            try:
-                resp = self._call(m, messages)
-                return resp.choices[0].message.content.strip()
-            except BadRequestError as e:
-                last_err = e
-                # try next model
+    async def _call(self,
+                    model: str,
+                    messages: List[Dict[str, str]],
+                    temperature: float = 0.2,
+                    max_tokens: int = 700,
+                    stream: bool = False) -> Union[LLMCompletion, AsyncIterator[LLMChunk]]:
+        try:
+            resp = await self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=stream,
+            )
+        except APIError as e:
+            raise _to_llm_error(e) from e
+        if stream:
+            return self._chunks(resp)
+        return LLMCompletion(resp.choices[0].message.content or "", resp.model or model,
+                             LLMUsage.from_obj(resp.usage))
 
-        raise last_err
+    @staticmethod
+    async def _chunks(stream) -> AsyncIterator[LLMChunk]:
+        try:
+            async for chunk in stream:
+                # Groq reports usage on the last chunk (x_groq.usage)
+                usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                yield LLMChunk(delta or "", getattr(chunk, "model", None), LLMUsage.from_obj(usage))
+        except APIError as e:
+            raise _to_llm_error(e) from e
+        finally:
+            await stream.close()
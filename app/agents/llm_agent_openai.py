@@ -0,0 +1,137 @@
+import json
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple, Union
+
+import httpx
+
+from app.agents.llm_backend import (
+    BaseLLMAgent,
+    LLMChunk,
+    LLMCompletion,
+    LLMError,
+    LLMUsage,
+    parse_retry_after,
+    status_retryable,
+)
+
+# One pooled client per (base_url, api_key, timeout, max_connections), shared by all agents.
+# Used only from the shared event loop in app.core.aio.
+_clients: Dict[Tuple[str, str, float, int], httpx.AsyncClient] = {}
+_clients_lock = threading.Lock()
+
+
+def _shared_client(base_url: str, api_key: str, timeout: float, max_connections: int) -> httpx.AsyncClient:
+    key = (base_url, api_key, timeout, max_connections)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+            client = httpx.AsyncClient(
+                base_url=base_url.rstrip("/"),
+                headers=headers,
+                timeout=httpx.Timeout(timeout, connect=min(5.0, timeout)),
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                ),
+            )
+            _clients[key] = client
+        return client
+
+
+def _status_error(resp: httpx.Response) -> LLMError:
+    try:
+        detail = resp.json().get("error", {}).get("message", "")
+    except ValueError:
+        detail = resp.text[:200]
+    return LLMError(f"HTTP {resp.status_code}: {detail}".rstrip(": "),
+                    retryable=status_retryable(resp.status_code),
+                    retry_after=parse_retry_after(resp.headers.get("retry-after")),
+                    status=resp.status_code)
+
+
+def _chunk_usage(chunk: Dict[str, Any]) -> Optional[LLMUsage]:
+    # OpenAI / vLLM: "usage" on the last chunk (stream_options.include_usage);
+    # Groq-style servers: x_groq.usage
+    return LLMUsage.from_obj(chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage"))
+
+
+class OpenAICompatibleLLMAgent(BaseLLMAgent):
+    """
+    LLM Agent for any OpenAI-compatible chat completions server
+    (vLLM, llama.cpp, TGI, app/bench/mock_llm_server.py).
+    """
+    backend = "openai"
+
+    def __init__(self,
+                 base_url: str,
+                 model: str,
+                 api_key: str = "",
+                 timeout: float = 30.0,
+                 max_retries: int = 3,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 8.0,
+                 hedge_after: float = 0.0,
+                 max_connections: int = 20,
+                 fallback_models: Sequence[str] = ()):
+        super().__init__(model, timeout, max_retries, backoff_base, backoff_max, hedge_after, fallback_models)
+        self.base_url = base_url
+        self.client = _shared_client(base_url, api_key, timeout, max_connections)
+
+    def fingerprint(self) -> Dict[str, Any]:
+        # a different server may serve different weights under the same model name
+        return {**super().fingerprint(), "base_url": self.base_url}
+
+    async def _call(self,
+                    model: str,
+                    messages: List[Dict[str, str]],
+                    temperature: float = 0.2,
+                    max_tokens: int = 700,
+                    stream: bool = False) -> Union[LLMCompletion, AsyncIterator[LLMChunk]]:
+        body: Dict[str, Any] = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": stream,
+        }
+        if stream:
+            body["stream_options"] = {"include_usage": True}
+
+        request = self.client.build_request("POST", "/chat/completions", json=body)
+        try:
+            resp = await self.client.send(request, stream=stream)
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            raise LLMError(f"{type(e).__name__}: {e}", retryable=True) from e
+
+        if resp.status_code >= 400:
+            if stream:
+                await resp.aread()
+                await resp.aclose()
+            raise _status_error(resp)
+        if stream:
+            return self._chunks(resp)
+
+        data = resp.json()
+        message = data["choices"][0]["message"]
+        return LLMCompletion(message.get("content") or "", data.get("model") or model,
+                             LLMUsage.from_obj(data.get("usage")))
+
+    @staticmethod
+    async def _chunks(resp: httpx.Response) -> AsyncIterator[LLMChunk]:
+        try:
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue   # blank separators, ": keep-alive" comments
+                payload = line[5:].strip()
+                if payload == "[DONE]":
+                    break
+                chunk = json.loads(payload)
+                choices = chunk.get("choices") or []
+                delta = (choices[0].get("delta") or {}).get("content") if choices else None
+                yield LLMChunk(delta or "", chunk.get("model"), _chunk_usage(chunk))
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            # the note is partial; not retried here since text was already yielded
+            raise LLMError(f"stream interrupted: {type(e).__name__}: {e}", retryable=True) from e
+        finally:
+            await resp.aclose()
@@ -0,0 +1,379 @@
+import asyncio
+import random
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Union
+
+from app.config.prompts import (
+    build_facts_messages,
+    build_soap_messages,
+    build_update_messages,
+    prompt_fingerprint,
+)
+from app.core.aio import iter_sync, run_sync
+from app.core.metrics import get_metrics
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+LLM_BACKENDS = ("groq", "openai")
+
+FACTS_MAX_TOKENS = 400   # per excerpt in the map step of a long transcript
+
+
+class LLMError(Exception):
+    """
+    Backend-neutral API failure. Backends translate their client's errors
+    into this so retry / failover logic does not depend on an SDK.
+    """
+
+    def __init__(self,
+                 message: str,
+                 retryable: bool = False,
+                 retry_after: Optional[float] = None,
+                 status: Optional[int] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+        self.status = status
+
+
+def status_retryable(status: int) -> bool:
+    return status in RETRYABLE_STATUS or status >= 500
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+@dataclass
+class LLMUsage:
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+    @classmethod
+    def from_obj(cls, usage: Any) -> Optional["LLMUsage"]:
+        """
+        usage as an SDK object or a parsed JSON dict (None stays None).
+        """
+        if usage is None:
+            return None
+        get = usage.get if isinstance(usage, dict) else (lambda k: getattr(usage, k, None))
+        return cls(get("prompt_tokens"), get("completion_tokens"))
+
+
+@dataclass
+class LLMCompletion:
+    text: str
+    model: str
+    usage: Optional[LLMUsage] = None
+
+
+@dataclass
+class LLMChunk:
+    text: str                          # delta, may be empty (e.g. the final usage chunk)
+    model: Optional[str] = None
+    usage: Optional[LLMUsage] = None
+
+
+async def _discard(task: asyncio.Task) -> None:
+    """
+    Drop a losing request: cancel it if still running, close the stream it returned.
+    """
+    task.cancel()
+    await asyncio.wait([task])
+    if task.cancelled() or task.exception() is not None:
+        return
+    aclose = getattr(task.result(), "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+class BaseLLMAgent(ABC):
+    """
+    SOAP generation on top of a chat completions backend.
+    Subclasses implement _call(); this class adds retries, model fallback,
+    hedging (hedge_after) and latency / token metrics.
+    """
+    backend = "base"
+
+    def __init__(self,
+                 model: str,
+                 timeout: float = 30.0,
+                 max_retries: int = 3,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 8.0,
+                 hedge_after: float = 0.0,
+                 fallback_models: Sequence[str] = ()):
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.fallback_models = list(fallback_models)
+
+    @abstractmethod
+    async def _call(self,
+                    model: str,
+                    messages: List[Dict[str, str]],
+                    temperature: float = 0.2,
+                    max_tokens: int = 700,
+                    stream: bool = False) -> Union[LLMCompletion, AsyncIterator[LLMChunk]]:
+        """
+        One request, no retries. Raises LLMError on API failures.
+        With stream=True, returns an async generator of LLMChunks (close it to release the connection).
+        """
+
+    def fingerprint(self) -> Dict[str, Any]:
+        return {
+            "models": self._models_to_try(),
+            "prompt": prompt_fingerprint(),
+            "temperature": 0.2,
+            "max_tokens": 700,
+            "facts_max_tokens": FACTS_MAX_TOKENS,
+        }
+
+    async def _call_with_retry(self, model: str, messages: List[Dict[str, str]], **kwargs) -> Any:
+        attempt = 0
+        while True:
+            try:
+                return await self._call(model, messages, **kwargs)
+            except LLMError as e:
+                if attempt >= self.max_retries or not e.retryable:
+                    raise
+                # full jitter, but never retry sooner than the server asked
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                delay = max(delay, e.retry_after or 0.0)
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    def _models_to_try(self) -> List[str]:
+        return [self.model] + [m for m in self.fallback_models if m != self.model]
+
+    async def _complete(self, messages: List[Dict[str, str]], **kwargs) -> Any:
+        """
+        Staggered race over the model list: the next model starts when one
+        fails or, with hedging, after hedge_after seconds.
+        """
+        models = iter(self._models_to_try())
+        running: Dict[asyncio.Task, str] = {}
+        last_err: Optional[BaseException] = None
+
+        def launch() -> bool:
+            m = next(models, None)
+            if m is None:
+                return False
+            running[asyncio.ensure_future(self._call_with_retry(m, messages, **kwargs))] = m
+            return True
+
+        launch()
+        try:
+            while running:
+                wait_for = self.hedge_after if self.hedge_after > 0 else None
+                done, _ = await asyncio.wait(running.keys(), timeout=wait_for,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    launch()   # hedge: the current model is slow
+                    continue
+
+                ok = [task for task in done if task.exception() is None]
+                for task in done:
+                    del running[task]
+                if ok:
+                    # hedges that finished in the same round lose: close their streams
+                    for task in ok[1:]:
+                        await _discard(task)
+                    return ok[0].result()
+                for task in done:
+                    err = task.exception()
+                    if not isinstance(err, LLMError):
+                        raise err
+                    last_err = err
+                    launch()   # failover: try the next model
+        finally:
+            if running:
+                await asyncio.gather(*(_discard(task) for task in running))
+
+        raise last_err
+
+    def _record_call(self,
+                     stats: Optional[Dict[str, Any]],
+                     model: str,
+                     stream: bool,
+                     ttfb: float,
+                     total: float,
+                     usage: Optional[LLMUsage]) -> None:
+        """
+        Per-call latency and token usage: into the metrics registry and, if
+        given, the caller's stats dict (which ends up in the state log).
+        """
+        prompt_tokens = usage.prompt_tokens if usage else None
+        completion_tokens = usage.completion_tokens if usage else None
+        metrics = get_metrics()
+        metrics.observe("ics_llm_ttfb_seconds", ttfb, model=model, stream=stream)
+        metrics.observe("ics_llm_seconds", total, model=model, stream=stream)
+        if prompt_tokens is not None:
+            metrics.inc("ics_llm_tokens_total", prompt_tokens, model=model, kind="prompt")
+        if completion_tokens is not None:
+            metrics.inc("ics_llm_tokens_total", completion_tokens, model=model, kind="completion")
+        if stats is not None:
+            stats.update({
+                "llm_backend": self.backend,
+                "llm_model": model,
+                "ttfb_ms": round(ttfb * 1000, 3),
+                "llm_ms": round(total * 1000, 3),
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+            })
+
+    async def aextract_facts(self,
+                             excerpts: Sequence[str],
+                             max_concurrency: int = 4,
+                             stats: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        Map step for a long transcript: the clinical facts of each excerpt, in
+        order, with at most max_concurrency requests in flight.
+        """
+        sem = asyncio.Semaphore(max(1, max_concurrency))
+        prompt_tokens = completion_tokens = 0
+
+        async def one(excerpt: str) -> str:
+            nonlocal prompt_tokens, completion_tokens
+            async with sem:
+                t0 = time.perf_counter()
+                resp: LLMCompletion = await self._complete(build_facts_messages(excerpt), max_tokens=FACTS_MAX_TOKENS)
+                total = time.perf_counter() - t0
+            self._record_call(None, resp.model or self.model, False, total, total, resp.usage)
+            if resp.usage:
+                prompt_tokens += resp.usage.prompt_tokens or 0
+                completion_tokens += resp.usage.completion_tokens or 0
+            return resp.text.strip()
+
+        t0 = time.perf_counter()
+        tasks = [asyncio.ensure_future(one(e)) for e in excerpts]
+        try:
+            facts = list(await asyncio.gather(*tasks))
+        finally:
+            # first failure (or our own cancellation): stop spending tokens on the rest
+            for task in tasks:
+                task.cancel()
+        if stats is not None:
+            stats.update({
+                "map_calls": len(excerpts),
+                "map_ms": round((time.perf_counter() - t0) * 1000, 3),
+                "map_prompt_tokens": prompt_tokens,
+                "map_completion_tokens": completion_tokens,
+            })
+        return facts
+
+    def extract_facts(self,
+                      excerpts: Sequence[str],
+                      max_concurrency: int = 4,
+                      timeout: Optional[float] = None,
+                      stats: Optional[Dict[str, Any]] = None) -> List[str]:
+        return run_sync(self.aextract_facts(excerpts, max_concurrency, stats), timeout)
+
+    async def agenerate_soap(self,
+                             transcript: str,
+                             repair: Optional[str] = None,
+                             previous: Optional[str] = None,
+                             stats: Optional[Dict[str, Any]] = None,
+                             facts: Optional[Sequence[str]] = None) -> str:
+        t0 = time.perf_counter()
+        resp: LLMCompletion = await self._complete(build_soap_messages(transcript, repair, previous, facts))
+        total = time.perf_counter() - t0
+        # not streamed: the first byte is the whole answer
+        self._record_call(stats, resp.model or self.model, False, total, total, resp.usage)
+        return resp.text.strip()
+
+    def generate_soap(self,
+                      transcript: str,
+                      repair: Optional[str] = None,
+                      previous: Optional[str] = None,
+                      timeout: Optional[float] = None,
+                      stats: Optional[Dict[str, Any]] = None,
+                      facts: Optional[Sequence[str]] = None) -> str:
+        """
+        repair / previous: supervisor feedback and the rejected note.
+        facts: extract_facts() output to merge from. timeout covers retries.
+        """
+        return run_sync(self.agenerate_soap(transcript, repair, previous, stats, facts), timeout)
+
+    async def astream_soap(self,
+                           transcript: str,
+                           repair: Optional[str] = None,
+                           previous: Optional[str] = None,
+                           stats: Optional[Dict[str, Any]] = None,
+                           facts: Optional[Sequence[str]] = None) -> AsyncIterator[str]:
+        """
+        Yield the SOAP note incrementally (retries and fallback apply until the stream opens).
+        """
+        t0 = time.perf_counter()
+        stream = await self._complete(build_soap_messages(transcript, repair, previous, facts), stream=True)
+        ttfb = None
+        model = self.model
+        usage = None
+        try:
+            async for chunk in stream:
+                model = chunk.model or model
+                usage = chunk.usage or usage
+                if chunk.text:
+                    if ttfb is None:
+                        ttfb = time.perf_counter() - t0
+                    yield chunk.text
+        finally:
+            await stream.aclose()
+            total = time.perf_counter() - t0
+            self._record_call(stats, model, True, ttfb if ttfb is not None else total, total, usage)
+
+    async def aupdate_soap(self,
+                           draft: str,
+                           transcript: str,
+                           stats: Optional[Dict[str, Any]] = None) -> str:
+        """
+        The draft note updated with transcript text it has not seen yet
+        (with no draft, a fresh note from that text).
+        """
+        messages = build_update_messages(draft, transcript) if draft else build_soap_messages(transcript)
+        t0 = time.perf_counter()
+        resp: LLMCompletion = await self._complete(messages)
+        total = time.perf_counter() - t0
+        self._record_call(stats, resp.model or self.model, False, total, total, resp.usage)
+        return resp.text.strip()
+
+    def stream_soap(self,
+                    transcript: str,
+                    repair: Optional[str] = None,
+                    previous: Optional[str] = None,
+                    stats: Optional[Dict[str, Any]] = None,
+                    facts: Optional[Sequence[str]] = None) -> Iterator[str]:
+        return iter_sync(self.astream_soap(transcript, repair, previous, stats, facts))
+
+
+def create_llm_agent(settings: Any) -> BaseLLMAgent:
+    """
+    Backend selected by LLM_BACKEND: groq, or openai (any compatible server at LLM_BASE_URL).
+    """
+    backend = settings.llm_backend.lower()
+    model = settings.llm_model or settings.groq_model
+    common = dict(
+        model=model,
+        timeout=settings.llm_timeout,
+        max_retries=settings.llm_max_retries,
+        hedge_after=settings.llm_hedge_after,
+        max_connections=settings.llm_max_connections,
+    )
+    # imported here so a backend's client library is only needed when it is used
+    if backend == "groq":
+        from app.agents.llm_agent_groq import GroqLLMAgent
+        return GroqLLMAgent(api_key=settings.groq_api_key, base_url=settings.llm_base_url or None, **common)
+    if backend == "openai":
+        if not settings.llm_base_url:
+            raise ValueError("LLM_BACKEND=openai needs LLM_BASE_URL (e.g. http://localhost:8000/v1)")
+        from app.agents.llm_agent_openai import OpenAICompatibleLLMAgent
+        return OpenAICompatibleLLMAgent(base_url=settings.llm_base_url, api_key=settings.llm_api_key, **common)
+    raise ValueError(f"unknown LLM_BACKEND {settings.llm_backend!r}, expected one of {LLM_BACKENDS}")
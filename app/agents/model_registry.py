@@ -0,0 +1,163 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from faster_whisper import WhisperModel
+
+from app.core.metrics import get_metrics
+
+
+# (model_size, device, compute_type, num_workers, cpu_threads)
+ModelKey = Tuple[str, str, str, int, int]
+
+
+@dataclass
+class _Entry:
+    model: Any
+    refcount: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class WhisperModelRegistry:
+    """
+    Process-wide, reference-counted cache of loaded Whisper models.
+    Idle models are evicted LRU beyond max_idle or after idle_ttl seconds.
+    """
+
+    def __init__(self,
+                 max_idle: int = 1,
+                 idle_ttl: float = 0.0,
+                 loader: Optional[Callable[..., Any]] = None):
+        self.max_idle = max_idle
+        self.idle_ttl = idle_ttl
+        self._loader = loader or WhisperModel
+        self._lock = threading.Lock()
+        self._entries: Dict[ModelKey, _Entry] = {}
+        self._loading: Dict[ModelKey, threading.Event] = {}
+
+    def configure(self, max_idle: Optional[int] = None, idle_ttl: Optional[float] = None) -> None:
+        with self._lock:
+            if max_idle is not None:
+                self.max_idle = max_idle
+            if idle_ttl is not None:
+                self.idle_ttl = idle_ttl
+            self._evict_locked()
+
+    def acquire(self,
+                model_size: str,
+                device: str = "cpu",
+                compute_type: str = "int8",
+                num_workers: int = 1,
+                cpu_threads: int = 0) -> Any:
+        """
+        Return the shared model for this key, loading it at most once.
+        """
+        key: ModelKey = (model_size, device, compute_type, num_workers, cpu_threads)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refcount += 1
+                    entry.last_used = time.monotonic()
+                    self._evict_locked()
+                    return entry.model
+
+                pending = self._loading.get(key)
+                if pending is None:
+                    pending = threading.Event()
+                    self._loading[key] = pending
+                    break
+
+            # another thread is loading this key; wait and look again
+            pending.wait()
+
+        try:
+            with get_metrics().timer("ics_asr_model_load_seconds", model=model_size, device=device):
+                model = self._loader(
+                    model_size,
+                    device=device,
+                    compute_type=compute_type,
+                    num_workers=num_workers,
+                    cpu_threads=cpu_threads,
+                )
+        except BaseException:
+            with self._lock:
+                del self._loading[key]
+            pending.set()
+            raise
+
+        with self._lock:
+            self._entries[key] = _Entry(model=model, refcount=1)
+            del self._loading[key]
+            self._evict_locked()
+        pending.set()
+        return model
+
+    def release(self,
+                model_size: str,
+                device: str = "cpu",
+                compute_type: str = "int8",
+                num_workers: int = 1,
+                cpu_threads: int = 0) -> None:
+        key: ModelKey = (model_size, device, compute_type, num_workers, cpu_threads)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.refcount == 0:
+                return
+            entry.refcount -= 1
+            entry.last_used = time.monotonic()
+            if entry.refcount == 0:
+                self._evict_locked()
+
+    def warm_up(self,
+                model_size: str,
+                device: str = "cpu",
+                compute_type: str = "int8",
+                num_workers: int = 1,
+                cpu_threads: int = 0) -> None:
+        """
+        Load a model ahead of the first request (kept as an idle entry).
+        """
+        self.acquire(model_size, device, compute_type, num_workers, cpu_threads)
+        self.release(model_size, device, compute_type, num_workers, cpu_threads)
+
+    def evict_idle(self) -> None:
+        with self._lock:
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        idle: List[ModelKey] = [k for k, e in self._entries.items() if e.refcount == 0]
+
+        if self.idle_ttl > 0:
+            now = time.monotonic()
+            for k in list(idle):
+                if now - self._entries[k].last_used >= self.idle_ttl:
+                    del self._entries[k]
+                    idle.remove(k)
+
+        idle.sort(key=lambda k: self._entries[k].last_used)
+        while len(idle) > self.max_idle:
+            del self._entries[idle.pop(0)]
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "model_size": k[0],
+                    "device": k[1],
+                    "compute_type": k[2],
+                    "num_workers": k[3],
+                    "cpu_threads": k[4],
+                    "refcount": e.refcount,
+                    "idle_seconds": round(time.monotonic() - e.last_used, 1) if e.refcount == 0 else 0.0,
+                }
+                for k, e in self._entries.items()
+            ]
+
+
+_registry = WhisperModelRegistry()
+
+
+def get_model_registry() -> WhisperModelRegistry:
+    return _registry
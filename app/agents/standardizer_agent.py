@@ -1,59 +1,197 @@
-import json
-from dataclasses import dataclass
-from pathlib import Path
-from typing import Dict, List, Any
+import os
+import threading
+import time
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, List, Any, Optional
+
+from app.agents.entity_spans import EntitySpan, SpanIndex, is_negated, span_confidence
+from app.agents.term_matcher import TermMatcher, clause_breaks
+from app.core.soap import split_soap_sections
+from app.kb.ontology_index import load_or_build, tokenize
+
+CATEGORIES = ("symptoms", "medications", "conditions")
+
+# Joins transcript and SOAP note for the single matching pass; the blank line
+# is a clause break, so no term or negation scope crosses it
+_SOURCE_SEP = "\n\n"
 
 
 @dataclass
 class StandardizationResult:
-    entities: Dict[str, List[Dict[str, Any]]]   # {"symptoms":[{...}], "medications":[...], "conditions":[...]}
+    # {"symptoms":[{...}], "medications":[...], "conditions":[...]}, affirmed mentions only
+    entities: Dict[str, List[Dict[str, Any]]]
     normalized_summary: str
+    spans: List[EntitySpan] = field(default_factory=list)   # every mention, incl. negated
+    negated: Dict[str, List[str]] = field(default_factory=dict)  # canonicals only ever mentioned negated
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "StandardizationResult":
+        d = dict(d)
+        d["spans"] = [EntitySpan.from_dict(s) for s in d.get("spans", [])]
+        return cls(**d)
+
+    @cached_property
+    def index(self) -> SpanIndex:
+        return SpanIndex(self.spans)
 
 
 class StandardizerAgent:
     """
     Simple ontology-based standardizer:
     - Extracts mentions from transcript and SOAP note
-    - Maps to canonical ontology keys using substring matching
+    - Maps to canonical ontology keys (compiled, memory-mapped index; hot-reloaded)
     """
 
-    def __init__(self, ontology_path: str):
+    def __init__(self,
+                 ontology_path: str,
+                 index_path: Optional[str] = None,
+                 reload_interval: float = 5.0):
         self.ontology_path = ontology_path
-        self.ontology = json.loads(Path(ontology_path).read_text(encoding="utf-8"))
-
-    def _match_category(self, text: str, category: str) -> List[Dict[str, Any]]:
-        text_l = text.lower()
-        results = []
-        for canonical, synonyms in self.ontology.get(category, {}).items():
-            for s in synonyms:
-                if s.lower() in text_l:
-                    results.append({
-                        "canonical": canonical,
-                        "matched": s,
-                        "category": category
-                    })
-                    break
-        return results
+        self.index_path = index_path
+        self.reload_interval = reload_interval
+        self._reload_lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self._source_stat = self._stat()
+        self.matcher = TermMatcher(load_or_build(ontology_path, index_path))
+
+    @property
+    def ontology_hash(self) -> str:
+        return self.matcher.index.source_sha256
+
+    def fingerprint(self) -> Dict[str, Any]:
+        return {"ontology": self.ontology_hash, "matcher": "aho-corasick-words", "spans": 1}
+
+    def _stat(self):
+        st = os.stat(self.ontology_path)
+        return st.st_size, st.st_mtime_ns
+
+    def maybe_reload(self) -> bool:
+        """
+        Hot reload: swap in a fresh index if the ontology file changed.
+        Returns True if a new index was loaded.
+        """
+        now = time.monotonic()
+        if now - self._last_check < self.reload_interval:
+            return False
+        with self._reload_lock:
+            self._last_check = now
+            stat = self._stat()
+            if stat == self._source_stat:
+                return False
+            self.matcher = TermMatcher(load_or_build(self.ontology_path, self.index_path))
+            self._source_stat = stat
+            return True
+
+    def annotate(self, text: str, source: str = "soap", section: Optional[str] = None) -> List[EntitySpan]:
+        """
+        Every term mention in text as an EntitySpan, with negation and
+        confidence. SOAP section headers are resolved unless section is given.
+        """
+        self.maybe_reload()
+        tokens = tokenize(text)
+        breaks = clause_breaks(text, tokens)
+        words = [t for t, _, _ in tokens]
+
+        sections = split_soap_sections(text) if source == "soap" and section is None else []
+        section_starts = [sec.start for sec in sections]
+
+        spans = []
+        for m in self.matcher.find(text, tokens, breaks):
+            sec = section
+            if sections:
+                i = bisect_right(section_starts, m.start) - 1
+                sec = sections[i].letter if i >= 0 else None
+            surface = text[m.start:m.end]
+            spans.append(EntitySpan(
+                start=m.start,
+                end=m.end,
+                source=source,
+                section=sec,
+                category=m.category,
+                canonical=m.canonical,
+                matched=m.matched,
+                text=surface,
+                negated=is_negated(words, breaks, m.token_start, m.token_end),
+                confidence=span_confidence(m.canonical, m.matched, surface),
+            ))
+        return spans
+
+    def extract(self, text: str, section: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Affirmed entities of a single text (e.g. one SOAP section), one per concept.
+        """
+        return _group(self.annotate(text, section=section))
 
     def standardize(self, transcript: str, soap_note: str) -> StandardizationResult:
-        combined = f"{transcript}\n\n{soap_note}"
-        symptoms = self._match_category(combined, "symptoms")
-        meds = self._match_category(combined, "medications")
-        conds = self._match_category(combined, "conditions")
+        # one matching pass over both texts, spans mapped back to their source
+        spans = self.annotate(f"{transcript}{_SOURCE_SEP}{soap_note}", source="transcript")
+        offset = len(transcript) + len(_SOURCE_SEP)
+        sections = split_soap_sections(soap_note)
+        section_starts = [sec.start for sec in sections]
+        for sp in spans:
+            if sp.start < offset:
+                sp.section = None
+                continue
+            sp.source = "soap"
+            sp.start -= offset
+            sp.end -= offset
+            i = bisect_right(section_starts, sp.start) - 1
+            sp.section = sections[i].letter if i >= 0 else None
 
-        entities = {
-            "symptoms": symptoms,
-            "medications": meds,
-            "conditions": conds
-        }
+        index = SpanIndex(spans)
+        spans = index.spans("transcript") + index.spans("soap")
+        entities = _group(spans)
+        affirmed = {(e["category"], e["canonical"]) for v in entities.values() for e in v}
+        negated: Dict[str, List[str]] = {}
+        for sp in spans:
+            if sp.negated and (sp.category, sp.canonical) not in affirmed:
+                if sp.canonical not in negated.setdefault(sp.category, []):
+                    negated[sp.category].append(sp.canonical)
+
+        symptoms = entities["symptoms"]
+        meds = entities["medications"]
+        conds = entities["conditions"]
 
         # A simple normalized summary (for demo)
         norm_sym = ", ".join(sorted({e["canonical"] for e in symptoms})) or "none"
         norm_med = ", ".join(sorted({e["canonical"] for e in meds})) or "none"
         norm_con = ", ".join(sorted({e["canonical"] for e in conds})) or "none"
+        norm_neg = ", ".join(sorted({c for v in negated.values() for c in v})) or "none"
 
         normalized_summary = (
-            f"Normalized entities → symptoms: {norm_sym}; medications: {norm_med}; conditions: {norm_con}."
+            f"Normalized entities → symptoms: {norm_sym}; medications: {norm_med}; "
+            f"conditions: {norm_con}; negated: {norm_neg}."
         )
 
-        return StandardizationResult(entities=entities, normalized_summary=normalized_summary)
+        result = StandardizationResult(
+            entities=entities,
+            normalized_summary=normalized_summary,
+            spans=spans,
+            negated=negated,
+        )
+        result.index = index
+        return result
+
+
+def _group(spans) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Legacy entity view: first affirmed mention per (category, canonical).
+    """
+    entities: Dict[str, List[Dict[str, Any]]] = {c: [] for c in CATEGORIES}
+    seen = set()
+    for sp in spans:
+        if sp.negated or (sp.category, sp.canonical) in seen:
+            continue
+        seen.add((sp.category, sp.canonical))
+        entities.setdefault(sp.category, []).append({
+            "canonical": sp.canonical,
+            "matched": sp.matched,
+            "category": sp.category,
+            "source": sp.source,
+            "section": sp.section,
+            "start": sp.start,
+            "end": sp.end
+        })
+    return entities
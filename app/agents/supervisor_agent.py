@@ -1,5 +1,7 @@
 from dataclasses import dataclass
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Sequence
+
+from app.core.decision_policy import DEFAULT_RULES_PATH, RuleEngine, RuleResult
 
 
 @dataclass
@@ -12,48 +14,70 @@ class SupervisorDecision:
 class SupervisorAgent:
     """
     Simple supervisor:
-    - Basic checks on SOAP note quality and safety
+    - Checks SOAP note quality and safety with the rules in app/kb/rules.yaml
     - Decides: APPROVE / REGENERATE / HUMAN_REVIEW
     """
 
     def __init__(self,
-                 min_length: int = 200,
-                 max_length: int = 4000,
-                 require_sections: bool = True):
-        self.min_length = min_length
-        self.max_length = max_length
-        self.require_sections = require_sections
-
-    def _has_sections(self, note: str) -> bool:
-        required = ["S:", "O:", "A:", "P:"]
-        return all(r in note for r in required)
-
-    def decide(self, transcript: str, soap_note: str) -> SupervisorDecision:
-        reasons = {}
+                 min_length: Optional[int] = None,
+                 max_length: Optional[int] = None,
+                 require_sections: bool = True,
+                 rules_path: str = DEFAULT_RULES_PATH,
+                 reload_interval: float = 5.0,
+                 std_agent: Any = None):
+        overrides: Dict[str, Dict[str, Any]] = {}
+        if min_length is not None:
+            overrides["too_short"] = {"min": min_length}
+        if max_length is not None:
+            overrides["too_long"] = {"max": max_length}
+        if not require_sections:
+            overrides["missing_sections"] = {"enabled": False}
+        self.rules = RuleEngine(rules_path, reload_interval=reload_interval, overrides=overrides)
+        self.std_agent = std_agent
 
-        n = len(soap_note.strip())
-        reasons["length"] = n
+    def fingerprint(self) -> Dict[str, Any]:
+        return {"rules": self.rules.fingerprint()}
 
-        if n < self.min_length:
-            reasons["problem"] = "SOAP note too short"
-            return SupervisorDecision("REGENERATE", reasons, soap_note)
+    def check_section(self, section: str, text: str) -> Dict[str, Any]:
+        """
+        Early signals for one section of a note that is still streaming in.
+        """
+        body = text.strip()
+        return {
+            "section": section,
+            "length": len(body),
+            "empty": not body or body.lower().startswith("not mentioned"),
+            "uncertainty_markers": _lexicon_hits(self.rules.compiled.evaluate(body)),
+        }
 
-        if n > self.max_length:
-            reasons["problem"] = "SOAP note too long"
-            return SupervisorDecision("REGENERATE", reasons, soap_note)
+    def decide(self, transcript: str, soap_note: str) -> SupervisorDecision:
+        results = self.rules.evaluate(soap_note, transcript, self.std_agent)
+        return self._decision(soap_note, results)
 
-        if self.require_sections and not self._has_sections(soap_note):
-            reasons["problem"] = "Missing SOAP sections (S/O/A/P)"
-            return SupervisorDecision("REGENERATE", reasons, soap_note)
+    def decide_batch(self, transcripts: Sequence[Optional[str]], soap_notes: Sequence[str]) -> List[SupervisorDecision]:
+        """
+        decide() over many notes at once (audits).
+        """
+        batch = self.rules.evaluate_batch(soap_notes, transcripts, self.std_agent)
+        return [self._decision(note, results) for note, results in zip(soap_notes, batch.results)]
 
-        # Simple hallucination guard: if note contains explicit uncertainty markers too much
-        suspicious_markers = ["I assume", "maybe", "probably", "might be", "not sure"]
-        hits = sum(1 for m in suspicious_markers if m.lower() in soap_note.lower())
-        reasons["uncertainty_markers"] = hits
-        if hits >= 3:
-            reasons["problem"] = "Too many uncertainty markers"
-            return SupervisorDecision("HUMAN_REVIEW", reasons, soap_note)
+    def _decision(self, soap_note: str, results: List[RuleResult]) -> SupervisorDecision:
+        reasons: Dict[str, Any] = {
+            "length": len(soap_note.strip()),
+            "uncertainty_markers": _lexicon_hits(results),
+            "scores": {r.id: round(r.score, 3) for r in results},
+        }
+        for result in results:
+            if not result.passed:
+                reasons["problem"] = result.rule.problem
+                reasons["code"] = result.id
+                reasons.update(result.details)
+                return SupervisorDecision(result.rule.action, reasons, soap_note)
 
         # Basic approve
         reasons["status"] = "Passed basic checks"
         return SupervisorDecision("APPROVE", reasons, soap_note)
+
+
+def _lexicon_hits(results: List[RuleResult]) -> int:
+    return sum(r.value for r in results if r.rule.type == "lexicon")
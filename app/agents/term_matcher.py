@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.kb.ontology_index import OntologyIndex, tokenize
+
+
+@dataclass
+class TermMatch:
+    start: int          # character span in the matched text
+    end: int
+    category: str
+    canonical: str
+    matched: str        # ontology synonym that matched
+    token_start: int = 0    # token span [token_start, token_end) in tokenize(text)
+    token_end: int = 0
+
+
+# punctuation between two tokens that ends a clause; terms never match across it
+CLAUSE_BREAKS = frozenset(".;:!?\n()[]|")
+
+
+def clause_breaks(text: str, tokens: List[Tuple[str, int, int]]) -> List[bool]:
+    """
+    breaks[i] is True if a clause boundary lies between token i-1 and token i.
+    """
+    breaks = []
+    prev_end = 0
+    for _, start, end in tokens:
+        breaks.append(any(c in CLAUSE_BREAKS for c in text[prev_end:start]))
+        prev_end = end
+    return breaks
+
+
+class TermMatcher:
+    """
+    Word-level Aho-Corasick matching over a compiled OntologyIndex.
+    """
+
+    def __init__(self, index: OntologyIndex):
+        self.index = index
+
+    @classmethod
+    def from_terms(cls, terms: Iterable[Tuple[str, str, str]]) -> "TermMatcher":
+        """
+        terms: (category, canonical, synonym) triples
+        """
+        ontology: Dict[str, Dict[str, List[str]]] = {}
+        for category, canonical, synonym in terms:
+            ontology.setdefault(category, {}).setdefault(canonical, []).append(synonym)
+        return cls.from_ontology(ontology)
+
+    @classmethod
+    def from_ontology(cls, ontology: Dict[str, Dict[str, List[str]]]) -> "TermMatcher":
+        return cls(OntologyIndex.build(ontology))
+
+    def find_all(self,
+                 text: str,
+                 tokens: Optional[List[Tuple[str, int, int]]] = None,
+                 breaks: Optional[List[bool]] = None) -> List[TermMatch]:
+        """
+        Every term occurrence, in order of end position; never across a clause break.
+        """
+        tokens = tokens if tokens is not None else tokenize(text)
+        breaks = breaks if breaks is not None else clause_breaks(text, tokens)
+        ids = self.index.token_ids([t for t, _, _ in tokens])
+        matches = []
+        state = 0
+        for i, tid in enumerate(ids):
+            if breaks[i]:
+                state = 0
+            if tid < 0:
+                state = 0
+                continue
+            state = self.index.step(state, tid)
+            if not self.index.has_outputs(state):
+                continue
+            end = tokens[i][2]
+            for category, canonical, synonym, n in self.index.outputs(state):
+                matches.append(TermMatch(tokens[i - n + 1][1], end, category, canonical, synonym, i - n + 1, i + 1))
+        return matches
+
+    def find(self,
+             text: str,
+             tokens: Optional[List[Tuple[str, int, int]]] = None,
+             breaks: Optional[List[bool]] = None) -> List[TermMatch]:
+        """
+        Non-overlapping matches, longest first at each position
+        ("high temperature" wins over "temperature"), in text order.
+        """
+        chosen: List[TermMatch] = []
+        for m in sorted(self.find_all(text, tokens, breaks), key=lambda m: (m.start, -(m.end - m.start))):
+            if chosen and m.start < chosen[-1].end:
+                prev = chosen[-1]
+                # the same span may legitimately map to several categories
+                if (m.start, m.end) != (prev.start, prev.end):
+                    continue
+            chosen.append(m)
+        return chosen
+
+    def stats(self) -> Dict[str, Any]:
+        return self.index.stats()
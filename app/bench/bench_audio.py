@@ -0,0 +1,89 @@
+"""
+Audio path benchmark on synthetic recordings: WAV chunking, VAD,
+resampling and streaming-session overhead (with a fake ASR agent).
+"""
+import os
+import tempfile
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.agents.asr_agent import ASRResult
+from app.bench.harness import case, measure, synthetic_speech, write_wav
+from app.core.audio import prepare_for_whisper
+from app.core.vad import EnergyVAD
+from app.ui.pseudo_streaming import read_wav_chunks
+from app.ui.streaming_asr import StreamingASRSession
+
+
+class _Frame:
+    """
+    Stand-in for av.AudioFrame (mono s16, as delivered by the browser).
+    """
+
+    def __init__(self, pcm: np.ndarray):
+        self._pcm = pcm
+
+    def to_ndarray(self) -> np.ndarray:
+        return self._pcm[None, :]
+
+
+class _FakeASR:
+    """
+    Returns one word per 0.4 s of window audio, with word timestamps.
+    """
+
+    def transcribe(self, audio: np.ndarray, language: Optional[str] = "en", sample_rate: int = 16000,
+                   initial_prompt: Optional[str] = None, word_timestamps: bool = False) -> ASRResult:
+        seconds = audio.shape[0] / sample_rate
+        words = [{"start": t, "end": t + 0.3, "word": f"w{int(t * 10)}", "probability": 0.9}
+                 for t in np.arange(0.0, max(0.0, seconds - 0.4), 0.4)]
+        seg = {"start": 0.0, "end": seconds, "text": " ".join(w["word"] for w in words), "words": words}
+        return ASRResult(seg["text"], language, [seg], None, None)
+
+
+def _stream_session(pcm48k: np.ndarray, chunk_seconds: float) -> StreamingASRSession:
+    sess = StreamingASRSession(sample_rate=48000, chunk_seconds=chunk_seconds)
+    asr = _FakeASR()
+    frame = 960   # 20 ms at 48 kHz
+    for i in range(0, pcm48k.shape[0] - frame + 1, frame):
+        sess.push_frame(_Frame(pcm48k[i:i + frame]))
+        sess.process_incremental(asr)
+    sess.finish()
+    return sess
+
+
+def suite(quick: bool = False) -> List[Dict[str, Any]]:
+    repeat = 5 if quick else 20
+    durations = (30,) if quick else (30, 300)
+    cases = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for seconds in durations:
+            pcm16k = synthetic_speech(seconds, 16000)
+            pcm48k = synthetic_speech(seconds, 48000)
+            mono = write_wav(os.path.join(tmp, f"mono_{seconds}.wav"), pcm16k, 16000)
+            stereo = write_wav(os.path.join(tmp, f"stereo_{seconds}.wav"), pcm48k, 48000, channels=2)
+
+            for label, path in (("mono16k", mono), ("stereo48k", stereo)):
+                cases.append(case(f"read_wav_chunks/{label}/seconds={seconds}",
+                                  measure(lambda: read_wav_chunks(path, 2.5), repeat=repeat, items=seconds)))
+
+            segs = EnergyVAD().segment(pcm16k, 16000)
+            cases.append(case(f"vad_segment/mono16k/seconds={seconds}",
+                              measure(lambda: EnergyVAD().segment(pcm16k, 16000), repeat=repeat, items=seconds),
+                              chunks=len(segs),
+                              speech_fraction=round(sum(s.duration for s in segs) / seconds, 3)))
+
+            stereo_pcm = np.repeat(pcm48k[:, None], 2, axis=1)
+            cases.append(case(f"prepare_for_whisper/stereo48k/seconds={seconds}",
+                              measure(lambda: prepare_for_whisper(stereo_pcm, 48000), repeat=repeat, items=seconds)))
+
+        # streaming: 60 s of audio, fake decoder; items = audio seconds
+        pcm48k = synthetic_speech(60 if quick else 180, 48000)
+        seconds = pcm48k.shape[0] / 48000
+        for chunk in (0.5, 1.0):
+            cases.append(case(f"streaming_session/chunk={chunk}/seconds={int(seconds)}",
+                              measure(lambda: _stream_session(pcm48k, chunk), repeat=max(3, repeat // 4),
+                                      warmup=1, items=seconds)))
+    return cases
@@ -0,0 +1,66 @@
+"""
+End-to-end pipeline benchmark against the local mock LLM server and a tiny
+Whisper model (run_full is skipped if the model cannot be loaded).
+"""
+import os
+import tempfile
+from typing import Any, Dict, List
+
+from app.agents.asr_agent import ASRResult
+from app.bench.harness import case, measure, synthetic_speech, write_wav
+from app.bench.mock_llm_server import MockLLMServer
+from app.config.settings import Settings
+from app.core.pipeline import ClinicalDocPipeline
+
+TRANSCRIPT = (
+    "Doctor: What brings you in today? Patient: I've had a sore throat and a cough for three days, "
+    "and a bit of a fever at night. No headache. Doctor: Any medication? Patient: Some tylenol."
+)
+
+
+def _settings(whisper_model: str, llm_base_url: str) -> Settings:
+    return Settings(
+        llm_backend="openai",
+        llm_base_url=llm_base_url,
+        llm_model="mock",
+        asr_model_size=whisper_model,
+        asr_warmup=False,
+        cache_enabled=False,
+        llm_regen_max_attempts=1,
+        llm_hedge_after=0.0,
+        metrics_path="",
+    )
+
+
+def suite(quick: bool = False,
+          llm_latency: float = 0.05,
+          tokens_per_s: float = 0.0,
+          whisper_model: str = "tiny") -> List[Dict[str, Any]]:
+    repeat = 5 if quick else 20
+    cases: List[Dict[str, Any]] = []
+    llm = dict(llm_latency_ms=llm_latency * 1000, tokens_per_s=tokens_per_s)
+
+    with MockLLMServer(latency=llm_latency, tokens_per_s=tokens_per_s, seed=0) as server:
+        pipeline = ClinicalDocPipeline(_settings(whisper_model, server.openai_url))
+        agent = pipeline.llm_agent
+
+        cases.append(case("llm/generate", measure(lambda: agent.generate_soap(TRANSCRIPT), repeat=repeat), **llm))
+        cases.append(case("llm/stream", measure(lambda: "".join(agent.stream_soap(TRANSCRIPT)), repeat=repeat),
+                          **llm))
+
+        asr = ASRResult(TRANSCRIPT, "en", [], None, None)
+        cases.append(case("run_from_asr", measure(lambda: pipeline.run_from_asr(asr), repeat=repeat), **llm))
+
+        try:
+            pipeline.asr_agent
+        except Exception as e:
+            cases.append(case("run_full", skipped=f"whisper '{whisper_model}' unavailable: {e}"))
+            return cases
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for seconds in ((10,) if quick else (10, 60)):
+                wav = write_wav(os.path.join(tmp, f"speech_{seconds}.wav"), synthetic_speech(seconds), 16000)
+                stats = measure(lambda: pipeline.run_full(wav), repeat=max(3, repeat // 4), warmup=1,
+                                items=seconds, track_memory=False)
+                cases.append(case(f"run_full/seconds={seconds}", stats, whisper_model=whisper_model, **llm))
+    return cases
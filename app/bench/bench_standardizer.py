@@ -0,0 +1,160 @@
+"""
+Standardizer matcher benchmark: scaling with ontology size and text length.
+
+    python -m app.bench.bench_standardizer [--terms 100000] [--max-words 64000]
+"""
+import argparse
+import json
+import random
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from app.agents.standardizer_agent import StandardizerAgent
+from app.agents.term_matcher import TermMatcher
+from app.bench.harness import case, measure
+from app.kb.ontology_index import OntologyIndex
+
+STUB_ONTOLOGY = os.path.join(os.path.dirname(__file__), "..", "kb", "ontology_stub.json")
+
+CLINICAL_SENTENCES = [
+    "Patient reports a sore throat and mild fever since yesterday.",
+    "She denies headache but has been coughing at night.",
+    "No dizziness. Took tylenol twice with little relief.",
+    "History of migraine, currently on ibuprofen as needed.",
+    "Feels tired, temperature was not measured at home.",
+]
+
+
+def synthetic_ontology(n_terms: int, seed: int = 0) -> Dict[str, Dict[str, List[str]]]:
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ne", "ra", "to", "su", "vi", "de", "po", "zu", "ha"]
+
+    def word() -> str:
+        return "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+
+    ontology: Dict[str, Dict[str, List[str]]] = {"symptoms": {}, "medications": {}, "conditions": {}}
+    categories = list(ontology)
+    for i in range(n_terms // 3):
+        synonyms = [" ".join(word() for _ in range(rng.randint(1, 3))) for _ in range(3)]
+        ontology[categories[i % 3]][f"concept_{i}"] = synonyms
+    return ontology
+
+
+def synthetic_text(ontology: Dict[str, Dict[str, List[str]]], n_words: int, seed: int = 1) -> str:
+    rng = random.Random(seed)
+    filler = ["the", "patient", "reports", "since", "yesterday", "and", "denies", "with", "mild"]
+    terms = [s for concepts in ontology.values() for syns in concepts.values() for s in syns]
+    words: List[str] = []
+    while len(words) < n_words:
+        if rng.random() < 0.1:
+            words.extend(rng.choice(terms).split())
+        else:
+            words.append(rng.choice(filler))
+    return " ".join(words[:n_words])
+
+
+def naive_scan(ontology: Dict[str, Dict[str, List[str]]], text: str) -> int:
+    text_l = text.lower()
+    hits = 0
+    for concepts in ontology.values():
+        for synonyms in concepts.values():
+            for s in synonyms:
+                if s.lower() in text_l:
+                    hits += 1
+                    break
+    return hits
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def run(n_terms: int = 100_000, max_words: int = 64_000, repeat: int = 5) -> Dict[str, Any]:
+    ontology = synthetic_ontology(n_terms)
+
+    t0 = time.perf_counter()
+    index = OntologyIndex.build(ontology)
+    build_s = time.perf_counter() - t0
+
+    # what a worker process pays at start-up: mapping the compiled index
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.idx")
+        index.save(path)
+        t0 = time.perf_counter()
+        OntologyIndex.load(path)
+        load_s = time.perf_counter() - t0
+    matcher = TermMatcher(index)
+
+    rows = []
+    n_words = 1000
+    while n_words <= max_words:
+        text = synthetic_text(ontology, n_words)
+        t = _time(lambda: matcher.find(text), repeat)
+        row = {
+            "words": n_words,
+            "chars": len(text),
+            "automaton_ms": round(t * 1000, 3),
+            "ns_per_word": round(t / n_words * 1e9, 1),
+        }
+        if n_words <= 4000:
+            row["naive_ms"] = round(_time(lambda: naive_scan(ontology, text), 1) * 1000, 3)
+        rows.append(row)
+        n_words *= 2
+
+    return {
+        "benchmark": "standardizer_matcher",
+        "matcher": matcher.stats(),
+        "build_s": round(build_s, 3),
+        "mmap_load_ms": round(load_s * 1000, 3),
+        "results": rows,
+    }
+
+
+def suite(quick: bool = False) -> List[Dict[str, Any]]:
+    repeat = 5 if quick else 20
+    term_sizes = (1_000, 10_000) if quick else (1_000, 10_000, 100_000)
+    word_sizes = (1_000, 8_000) if quick else (1_000, 8_000, 64_000)
+
+    cases = []
+    for n_terms in term_sizes:
+        ontology = synthetic_ontology(n_terms)
+        t0 = time.perf_counter()
+        matcher = TermMatcher(OntologyIndex.build(ontology))
+        build_ms = round((time.perf_counter() - t0) * 1000, 3)
+        for n_words in word_sizes:
+            text = synthetic_text(ontology, n_words)
+            stats = measure(lambda: matcher.find(text), repeat=repeat, items=n_words)
+            cases.append(case(f"find/terms={n_terms}/words={n_words}", stats, build_ms=build_ms))
+
+    # the real agent: tokenize + match + negation + section attribution
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = StandardizerAgent(STUB_ONTOLOGY, index_path=os.path.join(tmp, "stub.idx"))
+        rng = random.Random(2)
+        for n_sentences in (10, 200):
+            transcript = " ".join(rng.choice(CLINICAL_SENTENCES) for _ in range(n_sentences))
+            soap = "S: " + transcript[: len(transcript) // 2] + "\nA: cold\nP: paracetamol"
+            stats = measure(lambda: agent.standardize(transcript, soap), repeat=repeat,
+                            items=len(transcript.split()) + len(soap.split()))
+            cases.append(case(f"standardize/sentences={n_sentences}", stats))
+    return cases
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--terms", type=int, default=100_000)
+    ap.add_argument("--max-words", type=int, default=64_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    print(json.dumps(run(args.terms, args.max_words, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Supervisor benchmark: decide(), check_section() and decide_batch().
+"""
+import random
+from typing import Any, Dict, List
+
+from app.agents.supervisor_agent import SupervisorAgent
+from app.bench.harness import case, measure
+
+FILLER = [
+    "Patient reports intermittent cough", "no fever", "vitals within normal limits",
+    "likely viral upper respiratory infection", "maybe allergic component",
+    "advise fluids and rest", "return if symptoms worsen", "follow up in one week",
+]
+
+
+def synthetic_note(n_sentences: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+
+    def body() -> str:
+        return ". ".join(rng.choice(FILLER) for _ in range(max(1, n_sentences // 4))) + "."
+
+    return f"S: {body()}\nO: {body()}\nA: {body()}\nP: {body()}"
+
+
+def suite(quick: bool = False) -> List[Dict[str, Any]]:
+    repeat = 50 if quick else 500
+    sup = SupervisorAgent(min_length=150, max_length=100_000)
+    cases = []
+    for n_sentences in (8, 80, 800):
+        note = synthetic_note(n_sentences)
+        transcript = note.replace("\n", " ")
+        cases.append(case(f"decide/sentences={n_sentences}",
+                          measure(lambda: sup.decide(transcript, note), repeat=repeat),
+                          chars=len(note)))
+        section = note.split("\n")[2]
+        cases.append(case(f"check_section/sentences={n_sentences}",
+                          measure(lambda: sup.check_section("A", section), repeat=repeat)))
+
+    notes = [synthetic_note(40, seed=i) for i in range(1000)]
+    transcripts = [None] * len(notes)
+    cases.append(case("decide_batch/notes=1000",
+                      measure(lambda: sup.decide_batch(transcripts, notes), repeat=max(3, repeat // 50),
+                              items=len(notes)),
+                      notes=len(notes)))
+    return cases
@@ -0,0 +1,127 @@
+"""
+Shared pieces of the benchmark suite: timings, synthetic audio, result comparison.
+"""
+import gc
+import math
+import tracemalloc
+import time
+import wave
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# metrics where a larger value is better; everything else is "lower is better"
+HIGHER_IS_BETTER = ("throughput_per_s",)
+COMPARED = ("p50_ms", "p95_ms", "p99_ms", "throughput_per_s", "peak_mem_kb")
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """
+    Linear-interpolated percentile, q in [0, 100].
+    """
+    if not samples:
+        return 0.0
+    xs = sorted(samples)
+    k = (len(xs) - 1) * q / 100.0
+    lo = math.floor(k)
+    hi = math.ceil(k)
+    return xs[lo] + (xs[hi] - xs[lo]) * (k - lo)
+
+
+def measure(fn: Callable[[], Any],
+            repeat: int = 20,
+            warmup: int = 2,
+            items: float = 1.0,
+            track_memory: bool = True) -> Dict[str, Any]:
+    """
+    Time fn() repeat times after warmup calls; items per call give throughput.
+    Peak memory is measured (tracemalloc) on one extra call.
+    """
+    for _ in range(warmup):
+        fn()
+
+    gc.collect()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+
+    p50 = percentile(samples, 50)
+    stats = {
+        "n": repeat,
+        "p50_ms": round(p50 * 1000, 4),
+        "p95_ms": round(percentile(samples, 95) * 1000, 4),
+        "p99_ms": round(percentile(samples, 99) * 1000, 4),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 4),
+        "throughput_per_s": round(items / p50, 3) if p50 > 0 else None,
+    }
+
+    if track_memory:
+        tracemalloc.start()
+        try:
+            fn()
+            stats["peak_mem_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+    return stats
+
+
+def synthetic_speech(seconds: float, sample_rate: int = 16000, seed: int = 0) -> np.ndarray:
+    """
+    Deterministic speech-like mono int16 signal (voiced syllables, pauses, noise).
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sample_rate)
+    t = np.arange(n) / sample_rate
+    f0 = 120 + 30 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+    # a pause of ~0.4 s every ~2 s
+    envelope *= (np.sin(2 * np.pi * 0.5 * t + rng.uniform(0, np.pi)) > -0.6)
+    signal = 0.3 * voiced * envelope + 0.01 * rng.standard_normal(n)
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16)
+
+
+def write_wav(path: str, pcm: np.ndarray, sample_rate: int, channels: int = 1) -> str:
+    """
+    pcm: int16 mono; written as `channels` identical channels.
+    """
+    data = np.repeat(pcm[:, None], channels, axis=1) if channels > 1 else pcm
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(np.ascontiguousarray(data, dtype="<i2").tobytes())
+    return path
+
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], threshold: float = 0.10) -> List[Dict[str, Any]]:
+    """
+    Diff two result files case by case (positive change = worse).
+    """
+    rows = []
+    for suite, cases in new.get("suites", {}).items():
+        base_cases = {c["case"]: c for c in base.get("suites", {}).get(suite, [])}
+        for case in cases:
+            old = base_cases.get(case["case"])
+            if old is None or "skipped" in case or "skipped" in old:
+                continue
+            row: Dict[str, Any] = {"suite": suite, "case": case["case"], "regression": False}
+            for key in COMPARED:
+                a, b = old.get(key), case.get(key)
+                if not a or b is None:
+                    continue
+                change = (b - a) / a
+                if key in HIGHER_IS_BETTER:
+                    change = -change
+                row[key] = round(change, 4)
+                if change > threshold:
+                    row["regression"] = True
+            rows.append(row)
+    return rows
+
+
+def case(name: str, stats: Optional[Dict[str, Any]] = None, **extra: Any) -> Dict[str, Any]:
+    return {"case": name, **extra, **(stats or {})}
@@ -0,0 +1,349 @@
+"""
+Local stand-in for an OpenAI-compatible chat completions API, with configurable
+latency and faults, for benchmarks without network access or an API key.
+
+    python -m app.bench.mock_llm_server --port 8001 --latency uniform:0.2,0.8 --tokens-per-s 60
+"""
+import argparse
+import json
+import math
+import random
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple, Union
+
+STUB_SOAP_NOTE = (
+    "S: Patient reports a sore throat and cough for three days, with mild fever at night. "
+    "Denies headache.\n"
+    "O: Temperature 37.9 C. Pharynx erythematous, lungs clear.\n"
+    "A: Likely viral upper respiratory infection.\n"
+    "P: Paracetamol as needed, fluids and rest. Return if symptoms worsen or persist beyond a week."
+)
+
+
+class LatencyModel:
+    """
+    Seconds to first token, sampled per request, e.g.
+    fixed:0.2  uniform:0.1,0.5  normal:0.3,0.1  lognormal:0.3,0.5  exp:0.3
+    """
+    ARITY = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exp": 1}
+
+    def __init__(self, kind: str = "fixed", *params: float):
+        if kind not in self.ARITY:
+            raise ValueError(f"unknown latency distribution {kind!r}, expected one of {sorted(self.ARITY)}")
+        if len(params) != self.ARITY[kind]:
+            raise ValueError(f"{kind} takes {self.ARITY[kind]} parameter(s), got {len(params)}")
+        self.kind = kind
+        self.params = tuple(float(p) for p in params)
+
+    @classmethod
+    def parse(cls, spec: Union[str, float, "LatencyModel"]) -> "LatencyModel":
+        if isinstance(spec, LatencyModel):
+            return spec
+        if isinstance(spec, (int, float)):
+            return cls("fixed", spec)
+        kind, _, args = spec.partition(":")
+        if not args:
+            return cls("fixed", float(kind))
+        return cls(kind.strip(), *(float(a) for a in args.split(",")))
+
+    def sample(self, rng: random.Random) -> float:
+        p = self.params
+        if self.kind == "fixed":
+            value = p[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            value = rng.gauss(p[0], p[1])
+        elif self.kind == "lognormal":
+            value = rng.lognormvariate(math.log(p[0]), p[1]) if p[0] > 0 else 0.0
+        else:
+            value = rng.expovariate(1.0 / p[0]) if p[0] > 0 else 0.0
+        return max(0.0, value)
+
+    def __repr__(self) -> str:
+        return f"{self.kind}:{','.join(f'{p:g}' for p in self.params)}"
+
+
+@dataclass
+class MockLLMConfig:
+    latency: Union[str, float, LatencyModel] = 0.0      # time to first token
+    tokens_per_s: float = 0.0                           # 0 = the whole note at once
+    error_rate: float = 0.0                             # fraction answered with an HTTP error
+    error_statuses: Tuple[int, ...] = (429, 500, 503)
+    retry_after: float = 1.0                            # Retry-After seconds sent with 429
+    stall_rate: float = 0.0                             # fraction that hang for stall_seconds, then drop
+    stall_seconds: float = 60.0
+    disconnect_rate: float = 0.0                        # fraction of streams cut mid-note
+    note: str = STUB_SOAP_NOTE
+    seed: Optional[int] = None
+
+    def __post_init__(self):
+        self.latency = LatencyModel.parse(self.latency)
+        self.error_statuses = tuple(self.error_statuses)
+
+
+@dataclass
+class _Plan:
+    fault: Optional[str]     # None | "error" | "stall" | "disconnect"
+    ttfb: float
+    status: int = 200
+    cut_at: int = 0          # tokens sent before a disconnect
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "MockLLMServer._Server"
+    protocol_version = "HTTP/1.1"    # keep-alive, like a real inference server
+
+    def setup(self) -> None:
+        super().setup()
+        # headers and body go out in separate writes; without this, Nagle plus
+        # delayed ACKs add ~40 ms to every keep-alive response
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, *args) -> None:   # keep benchmark output clean
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    def do_GET(self) -> None:
+        path = self.path.rstrip("/")
+        if path.endswith("/stats"):
+            self._send_json(200, self.server.snapshot())
+        elif path.endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock"}]})
+        else:
+            self._send_json(404, {"error": {"message": f"no route {self.path}", "type": "not_found"}})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length) if length else b""
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"no route {self.path}", "type": "not_found"}})
+            return
+        body = json.loads(raw or b"{}")
+        stream = bool(body.get("stream"))
+        cfg = self.server.config
+        words = cfg.note.split(" ")
+        plan = self.server.plan(stream, len(words))
+
+        if plan.fault == "error":
+            headers = {"Retry-After": f"{cfg.retry_after:g}"} if plan.status == 429 else None
+            self._send_json(plan.status, {"error": {"message": "injected failure", "type": "mock_error",
+                                                    "code": plan.status}}, headers)
+            return
+        if plan.fault == "stall":
+            self.server.stopping.wait(cfg.stall_seconds)
+            self.close_connection = True   # drop without an answer
+            return
+
+        self.server.stopping.wait(plan.ttfb)
+        model = body.get("model", "mock")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        usage = {
+            "prompt_tokens": sum(len(str(m.get("content", "")).split()) for m in body.get("messages", [])),
+            "completion_tokens": len(words),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        rate = cfg.tokens_per_s
+
+        if not stream:
+            if rate > 0:
+                self.server.stopping.wait(len(words) / rate)
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": cfg.note},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        def event(payload: Dict[str, Any]) -> bytes:
+            return f"data: {json.dumps(payload)}\n\n".encode()
+
+        def chunk(delta: Dict[str, Any], finish: Optional[str] = None, **extra: Any) -> bytes:
+            return event({"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                          "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+                          **extra})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            t0 = time.perf_counter()
+            for i, w in enumerate(words):
+                if plan.fault == "disconnect" and i == plan.cut_at:
+                    self.close_connection = True   # no terminating chunk: the client sees a cut stream
+                    return
+                if rate > 0:
+                    # pace against the start, so sleep overshoot does not accumulate
+                    lag = t0 + i / rate - time.perf_counter()
+                    if lag > 0:
+                        time.sleep(lag)
+                self._write_chunk(chunk({"content": w if i == 0 else " " + w}))
+            # Groq reports usage on the last chunk, OpenAI in an extra one when asked to
+            tail = chunk({}, "stop", x_groq={"usage": usage})
+            if (body.get("stream_options") or {}).get("include_usage"):
+                tail += event({"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                               "model": model, "choices": [], "usage": usage})
+            self._write_chunk(tail + b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True   # client went away (e.g. cancelled hedge)
+
+
+class MockLLMServer:
+    """
+    Runs the mock on host:port (a free port unless given) in a daemon thread.
+    Keyword arguments are MockLLMConfig fields.
+    """
+
+    class _Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 128   # load tests open many connections at once
+        config: MockLLMConfig
+
+        def setup_mock(self, config: MockLLMConfig) -> None:
+            self.config = config
+            self.stopping = threading.Event()
+            self._rng = random.Random(config.seed)
+            self._lock = threading.Lock()
+            self._stats: Dict[str, Any] = {"requests": 0, "streamed": 0, "ok": 0, "errors": {},
+                                           "stalls": 0, "disconnects": 0}
+
+        def plan(self, stream: bool, n_tokens: int) -> _Plan:
+            cfg = self.config
+            with self._lock:   # one seeded RNG, so a run is reproducible for a given request order
+                stats = self._stats
+                stats["requests"] += 1
+                stats["streamed"] += int(stream)
+                roll = self._rng.random()
+                if roll < cfg.error_rate and cfg.error_statuses:
+                    status = self._rng.choice(cfg.error_statuses)
+                    stats["errors"][str(status)] = stats["errors"].get(str(status), 0) + 1
+                    return _Plan("error", 0.0, status)
+                if roll < cfg.error_rate + cfg.stall_rate:
+                    stats["stalls"] += 1
+                    return _Plan("stall", 0.0)
+                ttfb = cfg.latency.sample(self._rng)
+                if stream and self._rng.random() < cfg.disconnect_rate:
+                    stats["disconnects"] += 1
+                    return _Plan("disconnect", ttfb, cut_at=self._rng.randrange(max(1, n_tokens)))
+                stats["ok"] += 1
+                return _Plan(None, ttfb)
+
+        def snapshot(self) -> Dict[str, Any]:
+            with self._lock:
+                return {**self._stats, "errors": dict(self._stats["errors"]),
+                        "config": {"latency": repr(self.config.latency), "tokens_per_s": self.config.tokens_per_s,
+                                   "error_rate": self.config.error_rate, "stall_rate": self.config.stall_rate,
+                                   "disconnect_rate": self.config.disconnect_rate}}
+
+    def __init__(self, port: int = 0, host: str = "127.0.0.1", **config: Any):
+        self.config = MockLLMConfig(**config)
+        self._httpd = self._Server((host, port), _Handler)
+        self._httpd.setup_mock(self.config)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def openai_url(self) -> str:
+        """
+        LLM_BASE_URL for the openai backend.
+        """
+        return self.url + "/v1"
+
+    def stats(self) -> Dict[str, Any]:
+        return self._httpd.snapshot()
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.stopping.set()   # wake stalled / sleeping handlers
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="OpenAI-compatible mock LLM server for offline load tests.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8001)
+    ap.add_argument("--latency", default="0", help="time to first token, e.g. 0.3, uniform:0.1,0.5, lognormal:0.3,0.5")
+    ap.add_argument("--tokens-per-s", type=float, default=0.0, help="streaming / generation rate (0 = instant)")
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--error-status", default="429,500,503", help="comma-separated statuses to inject")
+    ap.add_argument("--retry-after", type=float, default=1.0)
+    ap.add_argument("--stall-rate", type=float, default=0.0)
+    ap.add_argument("--stall-seconds", type=float, default=60.0)
+    ap.add_argument("--disconnect-rate", type=float, default=0.0)
+    ap.add_argument("--note-file", help="text file with the note to answer (default: a fixed SOAP note)")
+    ap.add_argument("--seed", type=int)
+    args = ap.parse_args()
+
+    note = STUB_SOAP_NOTE
+    if args.note_file:
+        with open(args.note_file, encoding="utf-8") as f:
+            note = f.read().strip()
+
+    server = MockLLMServer(
+        port=args.port,
+        host=args.host,
+        latency=args.latency,
+        tokens_per_s=args.tokens_per_s,
+        error_rate=args.error_rate,
+        error_statuses=tuple(int(s) for s in args.error_status.split(",") if s.strip()),
+        retry_after=args.retry_after,
+        stall_rate=args.stall_rate,
+        stall_seconds=args.stall_seconds,
+        disconnect_rate=args.disconnect_rate,
+        note=note,
+        seed=args.seed,
+    )
+    print(f"mock LLM on {server.openai_url} (latency {server.config.latency!r}, "
+          f"{args.tokens_per_s:g} tok/s, errors {args.error_rate:.0%}) - Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import hashlib
+from typing import Any, Dict, List, Optional, Sequence
+
+SOAP_SYSTEM_PROMPT = (
+    "You are a clinical documentation assistant. "
+    "Write a clean SOAP note in English. "
+    "Do not add any information that is not in the transcript. "
+    "If something is missing, write 'Not mentioned'."
+)
+
+SOAP_USER_TEMPLATE = """TRANSCRIPT:
+{transcript}
+
+TASK:
+Create a SOAP note with the following sections:
+S: Subjective
+O: Objective
+A: Assessment
+P: Plan
+
+Return only the SOAP note text.
+"""
+
+# Long transcripts (map-reduce): facts are extracted per excerpt, then merged into one note
+FACTS_SYSTEM_PROMPT = (
+    "You are a clinical documentation assistant. "
+    "Extract clinical facts from an excerpt of a longer consultation transcript. "
+    "Do not add any information that is not in the excerpt."
+)
+
+FACTS_USER_TEMPLATE = """TRANSCRIPT EXCERPT:
+{excerpt}
+
+TASK:
+List every clinically relevant fact in this excerpt (symptoms and history,
+examination findings and measurements, assessments, medications, plans),
+one per line starting with "- ". Keep numbers, doses and dates exactly as said.
+Return only the list, or "- none" if there is nothing clinical.
+"""
+
+SOAP_FACTS_TEMPLATE = """CLINICAL FACTS (extracted in order from consecutive parts of the transcript):
+{facts}
+
+TASK:
+Create a SOAP note from these facts with the following sections:
+S: Subjective
+O: Objective
+A: Assessment
+P: Plan
+
+Merge duplicates; where facts conflict, the later one is current.
+Return only the SOAP note text.
+"""
+
+# Live drafting: the running note is updated with each newly committed part of the transcript
+SOAP_UPDATE_TEMPLATE = """CURRENT SOAP NOTE (drafted from the consultation so far):
+{draft}
+
+NEW TRANSCRIPT (continues the consultation):
+{transcript}
+
+TASK:
+Update the SOAP note with the new transcript. Keep the S:, O:, A:, P: headers
+and everything that is still correct; where the new transcript contradicts the
+note, the new transcript is current. Return only the complete SOAP note text.
+"""
+
+
+# {rejected}: whether the rejected note is in the conversation (an empty attempt is not)
+SOAP_REPAIR_TEMPLATE = """{rejected}
+
+FIX:
+{repair}
+
+Rewrite the complete SOAP note from the transcript with these fixes.
+Keep the S:, O:, A:, P: headers. Return only the SOAP note text.
+"""
+
+# Targeted instructions per supervisor problem code (SupervisorDecision.reasons["code"])
+REPAIR_INSTRUCTIONS = {
+    "too_short": "The note is too short ({length} characters, minimum {min_length}). "
+                 "Cover every finding from the transcript in the relevant section.",
+    "too_long": "The note is too long ({length} characters, maximum {max_length}). "
+                "Remove repetition and anything not stated in the transcript.",
+    "missing_sections": "These sections are missing: {missing}. "
+                        "Add them, writing 'Not mentioned' where the transcript has nothing.",
+    "uncertainty": "Remove speculative wording (e.g. 'maybe', 'probably'); "
+                   "state only what the transcript supports.",
+    "unsupported_entities": "These are not mentioned in the transcript: {unsupported}. "
+                            "Remove them unless the transcript supports them.",
+    "unsupported_claims": "These statements are not supported by the transcript: {claims}. "
+                          "Remove them or restate only what the transcript says.",
+}
+
+
+REPAIR_REJECTED = "The SOAP note above was rejected by the reviewer."
+REPAIR_REJECTED_EMPTY = "The previous attempt produced no usable SOAP note."
+
+
+class _Defaults(dict):
+    def __missing__(self, key):
+        return "?"
+
+
+def repair_instructions(reasons: Dict[str, Any]) -> str:
+    """
+    Turn a supervisor decision's reasons into repair instructions for the LLM.
+    """
+    template = REPAIR_INSTRUCTIONS.get(reasons.get("code", ""))
+    if template is None:
+        return reasons.get("problem", "Fix the issues in the note.")
+    values = dict(reasons)
+    values["missing"] = ", ".join(reasons.get("missing_sections", []))
+    values["unsupported"] = ", ".join(reasons.get("unsupported_entities", []))
+    values["claims"] = " | ".join(reasons.get("unsupported_claims", []))
+    return template.format_map(_Defaults(values))
+
+
+def build_facts_messages(excerpt: str) -> List[Dict[str, str]]:
+    """
+    Chat messages for the map step of a long transcript: the facts in one excerpt.
+    """
+    return [
+        {"role": "system", "content": FACTS_SYSTEM_PROMPT},
+        {"role": "user", "content": FACTS_USER_TEMPLATE.format(excerpt=excerpt)},
+    ]
+
+
+def build_update_messages(draft: str, transcript: str) -> List[Dict[str, str]]:
+    """
+    Chat messages to update a draft SOAP note with new transcript text.
+    """
+    return [
+        {"role": "system", "content": SOAP_SYSTEM_PROMPT},
+        {"role": "user", "content": SOAP_UPDATE_TEMPLATE.format(draft=draft, transcript=transcript)},
+    ]
+
+
+def build_soap_messages(transcript: str,
+                        repair: Optional[str] = None,
+                        previous: Optional[str] = None,
+                        facts: Optional[Sequence[str]] = None) -> List[Dict[str, str]]:
+    """
+    Chat messages for a SOAP note; with repair (and the rejected previous
+    note) a targeted revision, with facts a note merged from them.
+    """
+    if facts is not None:
+        user = SOAP_FACTS_TEMPLATE.format(facts="\n".join(f.strip() for f in facts if f.strip()))
+    else:
+        user = SOAP_USER_TEMPLATE.format(transcript=transcript)
+    messages = [
+        {"role": "system", "content": SOAP_SYSTEM_PROMPT},
+        {"role": "user", "content": user},
+    ]
+    if repair:
+        rejected = REPAIR_REJECTED_EMPTY
+        if previous and previous.strip():
+            messages.append({"role": "assistant", "content": previous})
+            rejected = REPAIR_REJECTED
+        messages.append({"role": "user", "content": SOAP_REPAIR_TEMPLATE.format(rejected=rejected, repair=repair)})
+    return messages
+
+
+def prompt_fingerprint() -> str:
+    """
+    Changes whenever the SOAP prompts change (used in result cache keys).
+    """
+    prompts = (SOAP_SYSTEM_PROMPT + SOAP_USER_TEMPLATE + SOAP_REPAIR_TEMPLATE + REPAIR_REJECTED + REPAIR_REJECTED_EMPTY
+               + FACTS_SYSTEM_PROMPT + FACTS_USER_TEMPLATE + SOAP_FACTS_TEMPLATE + SOAP_UPDATE_TEMPLATE)
+    return hashlib.sha256(prompts.encode("utf-8")).hexdigest()[:16]
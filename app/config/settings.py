@@ -7,11 +7,66 @@ load_dotenv()
 
 @dataclass
 class Settings:
+    # LLM backend: groq | openai (any OpenAI-compatible server at LLM_BASE_URL)
+    llm_backend: str = os.getenv("LLM_BACKEND", "groq")
+    llm_base_url: str = os.getenv("LLM_BASE_URL", "")     # groq: optional endpoint override
+    llm_api_key: str = os.getenv("LLM_API_KEY", "")       # openai backend only
+    llm_model: str = os.getenv("LLM_MODEL", "")           # empty = GROQ_MODEL
     # Groq
     groq_api_key: str = os.getenv("GROQ_API_KEY", "")
     groq_model: str = os.getenv("GROQ_MODEL", "llama3-70b-8192")
+    llm_timeout: float = float(os.getenv("LLM_TIMEOUT", "30"))
+    llm_max_retries: int = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    llm_hedge_after: float = float(os.getenv("LLM_HEDGE_AFTER", "0"))   # seconds, 0 = no hedging
+    llm_max_connections: int = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+    # Supervisor REGENERATE loop: total SOAP attempts, and wall-clock budget of the LLM stage (0 = unbounded)
+    llm_regen_max_attempts: int = int(os.getenv("LLM_REGEN_MAX_ATTEMPTS", "3"))
+    llm_regen_deadline: float = float(os.getenv("LLM_REGEN_DEADLINE", "45"))   # seconds
+    # Map-reduce transcripts longer than LLM_MAP_REDUCE_CHARS (0 = never)
+    llm_map_reduce_chars: int = int(os.getenv("LLM_MAP_REDUCE_CHARS", "12000"))
+    llm_chunk_chars: int = int(os.getenv("LLM_CHUNK_CHARS", "4000"))
+    llm_map_concurrency: int = int(os.getenv("LLM_MAP_CONCURRENCY", "4"))
 
     # ASR (faster-whisper)
     asr_model_size: str = os.getenv("ASR_MODEL_SIZE", "small")
     asr_device: str = os.getenv("ASR_DEVICE", "cpu")
     asr_compute_type: str = os.getenv("ASR_COMPUTE_TYPE", "int8")
+    # parallel decoding (0 = auto from the core count)
+    asr_num_workers: int = int(os.getenv("ASR_NUM_WORKERS", "0"))
+    asr_cpu_threads: int = int(os.getenv("ASR_CPU_THREADS", "0"))
+
+    # Live recording tab: saved as 16 kHz mono (wav | flac | ogg | opus)
+    live_format: str = os.getenv("LIVE_FORMAT", "wav")
+    live_max_seconds: float = float(os.getenv("LIVE_MAX_SECONDS", "7200"))
+
+    # Whisper model cache
+    asr_cache_max_idle: int = int(os.getenv("ASR_CACHE_MAX_IDLE", "1"))
+    asr_cache_idle_ttl: float = float(os.getenv("ASR_CACHE_IDLE_TTL", "0"))
+    asr_warmup: bool = os.getenv("ASR_WARMUP", "1") == "1"
+
+    # Content-addressed result cache (SQLite)
+    cache_enabled: bool = os.getenv("CACHE_ENABLED", "1") == "1"
+    cache_path: str = os.getenv("CACHE_PATH", "app/storage/ics_cache.sqlite3")
+    cache_max_mb: int = int(os.getenv("CACHE_MAX_MB", "256"))      # per tier
+    cache_ttl: float = float(os.getenv("CACHE_TTL", "604800"))     # seconds, 0 = no expiry
+
+    # Ontology (compiled to <ontology>.idx and memory-mapped)
+    ontology_path: str = os.getenv("ONTOLOGY_PATH", "app/kb/ontology_stub.json")
+    ontology_reload_interval: float = float(os.getenv("ONTOLOGY_RELOAD_INTERVAL", "5"))
+
+    # Supervisor rules (YAML, reloaded when the file changes)
+    rules_path: str = os.getenv("RULES_PATH", "app/kb/rules.yaml")
+    rules_reload_interval: float = float(os.getenv("RULES_RELOAD_INTERVAL", "5"))
+
+    # Background job queue (SQLite); workers: python run_workers.py
+    jobs_enabled: bool = os.getenv("JOBS_ENABLED", "0") == "1"
+    jobs_path: str = os.getenv("JOBS_PATH", "app/storage/ics_jobs.sqlite3")
+    jobs_asr_workers: int = int(os.getenv("JOBS_ASR_WORKERS", "1"))     # processes
+    jobs_llm_workers: int = int(os.getenv("JOBS_LLM_WORKERS", "4"))     # threads
+    jobs_lease: float = float(os.getenv("JOBS_LEASE", "900"))           # seconds before a stuck job is retried
+    jobs_max_attempts: int = int(os.getenv("JOBS_MAX_ATTEMPTS", "3"))
+    jobs_poll_interval: float = float(os.getenv("JOBS_POLL_INTERVAL", "0.5"))
+
+    # Instrumentation (app/core/metrics.py); METRICS_PATH: Prometheus text file rewritten after each run
+    metrics_enabled: bool = os.getenv("METRICS_ENABLED", "1") == "1"
+    metrics_path: str = os.getenv("METRICS_PATH", "")
@@ -0,0 +1,121 @@
+from typing import Optional, Union
+
+import numpy as np
+
+# faster-whisper consumes 16 kHz mono float32
+WHISPER_SAMPLE_RATE = 16000
+
+AudioBuffer = Union[np.ndarray, memoryview, bytes, bytearray]
+
+
+def pcm_to_float32(pcm: AudioBuffer) -> np.ndarray:
+    """
+    Convert PCM samples (array, memoryview or int16 bytes) to float32 in [-1, 1].
+    """
+    if isinstance(pcm, (bytes, bytearray)):
+        pcm = np.frombuffer(pcm, dtype="<i2")
+    elif isinstance(pcm, memoryview):
+        fmt = pcm.format.lstrip("@=<")
+        if fmt in ("B", "b", "c"):
+            pcm = np.frombuffer(pcm, dtype="<i2")
+        else:
+            pcm = np.frombuffer(pcm, dtype=np.dtype(fmt))
+
+    if pcm.dtype == np.float32:
+        return pcm
+    if np.issubdtype(pcm.dtype, np.floating):
+        return pcm.astype(np.float32)
+    if pcm.dtype == np.uint8:
+        return (pcm.astype(np.float32) - 128.0) / 128.0
+    if np.issubdtype(pcm.dtype, np.integer):
+        scale = float(2 ** (8 * pcm.dtype.itemsize - 1))
+        return pcm.astype(np.float32) / scale
+
+    raise TypeError(f"Unsupported PCM dtype: {pcm.dtype}")
+
+
+def to_mono(pcm: np.ndarray) -> np.ndarray:
+    """
+    Downmix (samples, channels) to (samples,). 1-D input is returned as is.
+    """
+    if pcm.ndim == 1:
+        return pcm
+    if pcm.shape[1] == 1:
+        return pcm[:, 0]
+    return pcm.mean(axis=1, dtype=np.float32)
+
+
+def resample(pcm: np.ndarray, src_rate: int, dst_rate: int = WHISPER_SAMPLE_RATE) -> np.ndarray:
+    """
+    In-memory resampling of mono float32 audio
+    (block averaging for integer ratios, linear interpolation otherwise).
+    """
+    if src_rate == dst_rate or pcm.size == 0:
+        return pcm
+
+    if src_rate > dst_rate and src_rate % dst_rate == 0:
+        factor = src_rate // dst_rate
+        n = (pcm.shape[0] // factor) * factor
+        return pcm[:n].reshape(-1, factor).mean(axis=1, dtype=np.float32)
+
+    n_out = int(round(pcm.shape[0] * dst_rate / float(src_rate)))
+    x_out = np.arange(n_out, dtype=np.float64) * (src_rate / float(dst_rate))
+    return np.interp(x_out, np.arange(pcm.shape[0]), pcm).astype(np.float32)
+
+
+def prepare_for_whisper(pcm: AudioBuffer, sample_rate: int = WHISPER_SAMPLE_RATE) -> np.ndarray:
+    """
+    PCM buffer (any supported dtype, mono or (samples, channels)) -> 16 kHz mono float32.
+    """
+    audio = to_mono(pcm_to_float32(pcm))
+    audio = resample(audio, sample_rate, WHISPER_SAMPLE_RATE)
+    return np.ascontiguousarray(audio, dtype=np.float32)
+
+
+class StreamResampler:
+    """
+    Stateful resample() for mono float32 audio that arrives in pieces;
+    the remainder of each chunk is carried into the next call.
+    """
+
+    def __init__(self, src_rate: int, dst_rate: int = WHISPER_SAMPLE_RATE):
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self.factor = src_rate // dst_rate if src_rate > dst_rate and src_rate % dst_rate == 0 else 0
+        self._step = src_rate / float(dst_rate)
+        self._rest = np.zeros(0, dtype=np.float32)   # factor path: samples of an unfinished block
+        self._prev: Optional[np.float32] = None      # interp path: last input sample
+        self._t = 0.0                                # interp path: next output position, relative to _prev
+        self._n_in = 0
+        self._n_out = 0
+
+    def process(self, pcm: np.ndarray) -> np.ndarray:
+        if self.src_rate == self.dst_rate or pcm.size == 0:
+            return pcm
+        self._n_in += pcm.shape[0]
+
+        if self.factor:
+            x = np.concatenate((self._rest, pcm)) if self._rest.size else pcm
+            n = (x.shape[0] // self.factor) * self.factor
+            self._rest = x[n:].copy()
+            return x[:n].reshape(-1, self.factor).mean(axis=1, dtype=np.float32)
+
+        x = pcm if self._prev is None else np.concatenate(([self._prev], pcm))
+        last = x.shape[0] - 1
+        n_out = int(np.floor((last - self._t) / self._step)) + 1 if self._t <= last else 0
+        positions = self._t + np.arange(n_out, dtype=np.float64) * self._step
+        self._t += n_out * self._step - last
+        self._prev = x[-1]
+        self._n_out += n_out
+        return np.interp(positions, np.arange(x.shape[0]), x).astype(np.float32)
+
+    def flush(self) -> np.ndarray:
+        """
+        End of stream: the output resample() would still produce past the
+        last input sample (interpolation path only), so the total length matches it.
+        """
+        if self.factor or self._prev is None:
+            return np.zeros(0, dtype=np.float32)
+        missing = int(round(self._n_in * self.dst_rate / float(self.src_rate))) - self._n_out
+        self._n_out += max(0, missing)
+        return np.full(max(0, missing), self._prev, dtype=np.float32)
@@ -0,0 +1,95 @@
+import threading
+from typing import Any, Optional
+
+import numpy as np
+import soundfile as sf
+
+from app.core.audio import WHISPER_SAMPLE_RATE, StreamResampler
+from app.core.ring_buffer import convert_into, frame_planes
+
+# format name -> (libsndfile container, subtype)
+AUDIO_FORMATS = {
+    "wav": ("WAV", "PCM_16"),
+    "flac": ("FLAC", "PCM_16"),
+    "ogg": ("OGG", "VORBIS"),
+    "opus": ("OGG", "OPUS"),
+}
+
+FORMAT_EXTENSIONS = {"wav": ".wav", "flac": ".flac", "ogg": ".ogg", "opus": ".opus"}
+
+
+class StreamingAudioWriter:
+    """
+    Writes audio to a file as it arrives, as mono at out_rate (wav | flac | ogg | opus).
+    The file is complete once close() returns.
+    """
+
+    def __init__(self,
+                 path: str,
+                 in_rate: int,
+                 out_rate: int = WHISPER_SAMPLE_RATE,
+                 fmt: str = "wav"):
+        if fmt not in AUDIO_FORMATS:
+            raise ValueError(f"unknown audio format {fmt!r}, expected one of {sorted(AUDIO_FORMATS)}")
+        container, subtype = AUDIO_FORMATS[fmt]
+        self.path = path
+        self.fmt = fmt
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.samples_written = 0   # at out_rate
+        self._resampler = StreamResampler(in_rate, out_rate)
+        self._scratch = np.zeros(0, dtype=np.float32)   # mono conversion buffer, grown to the largest frame
+        self._lock = threading.Lock()
+        self._file: Optional[sf.SoundFile] = sf.SoundFile(
+            path, "w", samplerate=out_rate, channels=1, format=container, subtype=subtype)
+
+    @property
+    def seconds_written(self) -> float:
+        return self.samples_written / float(self.out_rate)
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+    def write_frame(self, frame: Any) -> int:
+        """
+        Append an av.AudioFrame (any layout, s16 / float formats).
+        """
+        return self.write(frame_planes(frame))
+
+    def write(self, pcm: np.ndarray) -> int:
+        """
+        Append PCM at in_rate: (samples,) or (channels, samples), int or float.
+        Returns the number of samples written at out_rate.
+        """
+        planes = pcm[None, :] if pcm.ndim == 1 else pcm
+        n = planes.shape[1]
+        with self._lock:
+            if self._file is None:
+                raise ValueError(f"{self.path} is closed")
+            if self._scratch.shape[0] < n:
+                self._scratch = np.zeros(n, dtype=np.float32)
+            mono = self._scratch[:n]
+            convert_into(mono, planes)
+            out = self._resampler.process(mono)
+            if out.size:
+                self._file.write(out)
+                self.samples_written += out.shape[0]
+            return out.shape[0]
+
+    def close(self) -> str:
+        with self._lock:
+            if self._file is not None:
+                tail = self._resampler.flush()
+                if tail.size:
+                    self._file.write(tail)
+                    self.samples_written += tail.shape[0]
+                self._file.close()
+                self._file = None
+        return self.path
+
+    def __enter__(self) -> "StreamingAudioWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,223 @@
+import json
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from app.agents.asr_agent import ASRResult
+from app.core.pipeline import ClinicalDocPipeline
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".flac", ".ogg")
+
+_DONE = object()   # end-of-stream marker between stages
+
+
+@dataclass
+class BatchItem:
+    index: int
+    audio_path: str
+    force_human_review: bool = False
+    asr: Optional[ASRResult] = None
+    asr_cached: bool = False
+    asr_timings: Dict[str, float] = field(default_factory=dict)   # ms, see ClinicalDocPipeline.transcribe
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+def discover_inputs(source: str) -> List[BatchItem]:
+    """
+    source: a directory (every audio file below it), or a .jsonl / text manifest
+    (paths relative to the manifest).
+    """
+    src = Path(source)
+    if src.is_dir():
+        paths = sorted(p for p in src.rglob("*") if p.suffix.lower() in AUDIO_EXTENSIONS)
+        return [BatchItem(i, str(p)) for i, p in enumerate(paths)]
+
+    items = []
+    for line in src.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            rec = json.loads(line)
+            path, force = rec["audio_path"], bool(rec.get("force_human_review", False))
+        else:
+            path, force = line, False
+        if not Path(path).is_absolute():
+            path = str(src.parent / path)
+        items.append(BatchItem(len(items), path, force))
+    return items
+
+
+def completed_paths(output_path: str) -> Set[str]:
+    """
+    audio paths already written successfully to a JSONL output (for --resume).
+    """
+    done = set()
+    out = Path(output_path)
+    if not out.exists():
+        return done
+    with open(out, encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue   # a line cut short by an interrupted run
+            if rec.get("status") == "done":
+                done.add(rec["audio_path"])
+    return done
+
+
+class BatchRunner:
+    """
+    Stage-pipelined batch processing:
+    inputs -> [ASR x asr_workers] -> bounded queue -> [LLM+STD+SUP x llm_workers] -> results
+    """
+
+    def __init__(self,
+                 pipeline: ClinicalDocPipeline,
+                 asr_workers: int = 1,
+                 llm_workers: int = 4,
+                 queue_size: int = 8):
+        self.pipeline = pipeline
+        self.asr_workers = max(1, asr_workers)
+        self.llm_workers = max(1, llm_workers)
+        self.queue_size = max(1, queue_size)
+
+    def run(self, items: List[BatchItem]) -> Iterator[Dict[str, Any]]:
+        """
+        Yield one result record per item, in completion order.
+        Closing the iterator early stops the workers after their current item.
+        """
+        inbox: "queue.Queue" = queue.Queue()
+        transcripts: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        results: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+
+        for item in items:
+            inbox.put(item)
+        for _ in range(self.asr_workers):
+            inbox.put(_DONE)
+
+        def put(q: "queue.Queue", value: Any) -> bool:
+            # blocking put that gives up once the run is stopped
+            while not stop.is_set():
+                try:
+                    q.put(value, timeout=0.2)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def asr_stage() -> None:
+            while not stop.is_set():
+                item = inbox.get()
+                if item is _DONE:
+                    break
+                t0 = time.perf_counter()
+                try:
+                    item.asr, item.asr_cached = self.pipeline.transcribe(item.audio_path, item.asr_timings)
+                except Exception as e:
+                    item.timings["asr_s"] = time.perf_counter() - t0
+                    put(results, _record(item, error=e))
+                    continue
+                item.timings["asr_s"] = time.perf_counter() - t0
+                if not put(transcripts, item):
+                    break
+
+        def llm_stage() -> None:
+            while not stop.is_set():
+                try:
+                    item = transcripts.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    break
+                t0 = time.perf_counter()
+                try:
+                    out = self.pipeline.run_from_asr(
+                        item.asr, item.force_human_review, item.asr_cached, item.asr_timings)
+                    rec = _record(item, output=asdict(out))
+                except Exception as e:
+                    rec = _record(item, error=e)
+                rec["llm_s"] = round(time.perf_counter() - t0, 3)
+                if not put(results, rec):
+                    break
+
+        asr_threads = [threading.Thread(target=asr_stage, name=f"batch-asr-{i}", daemon=True)
+                       for i in range(self.asr_workers)]
+        llm_threads = [threading.Thread(target=llm_stage, name=f"batch-llm-{i}", daemon=True)
+                       for i in range(self.llm_workers)]
+        for t in asr_threads + llm_threads:
+            t.start()
+
+        def close_llm_stage() -> None:
+            for t in asr_threads:
+                t.join()
+            for _ in llm_threads:
+                put(transcripts, _DONE)
+            for t in llm_threads:
+                t.join()
+            put(results, _DONE)
+
+        threading.Thread(target=close_llm_stage, name="batch-drain", daemon=True).start()
+
+        try:
+            while True:
+                rec = results.get()
+                if rec is _DONE:
+                    return
+                yield rec
+        finally:
+            stop.set()
+
+
+def _record(item: BatchItem, output: Optional[Dict[str, Any]] = None, error: Optional[Exception] = None) -> Dict[str, Any]:
+    rec: Dict[str, Any] = {
+        "index": item.index,
+        "audio_path": item.audio_path,
+        "status": "done" if error is None else "failed",
+        "asr_s": round(item.timings.get("asr_s", 0.0), 3),
+    }
+    if error is not None:
+        rec["error"] = f"{type(error).__name__}: {error}"
+    if output is not None:
+        rec["final_decision"] = output["sup"]["action"]
+        rec["output"] = output
+    return rec
+
+
+def run_batch(pipeline: ClinicalDocPipeline,
+              items: List[BatchItem],
+              output_path: str,
+              asr_workers: int = 1,
+              llm_workers: int = 4,
+              queue_size: int = 8,
+              resume: bool = False) -> Dict[str, Any]:
+    """
+    Process items and append one JSON line per file to output_path.
+    Returns a summary (counts, wall time, summed stage times).
+    """
+    if resume:
+        done = completed_paths(output_path)
+        items = [it for it in items if it.audio_path not in done]
+
+    runner = BatchRunner(pipeline, asr_workers, llm_workers, queue_size)
+    summary = {"files": len(items), "done": 0, "failed": 0, "asr_s": 0.0, "llm_s": 0.0}
+    t0 = time.perf_counter()
+
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as f:
+        for rec in runner.run(items):
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            f.flush()
+            summary[rec["status"]] += 1
+            summary["asr_s"] += rec.get("asr_s", 0.0)
+            summary["llm_s"] += rec.get("llm_s", 0.0)
+
+    summary["wall_s"] = round(time.perf_counter() - t0, 3)
+    summary["asr_s"] = round(summary["asr_s"], 3)
+    summary["llm_s"] = round(summary["llm_s"], 3)
+    return summary
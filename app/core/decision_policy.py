@@ -0,0 +1,377 @@
+"""
+Declarative supervisor rules, loaded from app/kb/rules.yaml.
+Text checks of all rules compile into one regex; batches are scanned in one pass.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import yaml
+
+from app.core.grounding import GroundingChecker
+from app.core.metrics import get_metrics
+
+DEFAULT_RULES_PATH = "app/kb/rules.yaml"
+
+RULE_TYPES = ("length", "sections", "lexicon", "entities", "grounding")
+ACTIONS = ("REGENERATE", "HUMAN_REVIEW")
+
+# Used when the rules file is missing or empty: the supervisor's original checks
+DEFAULT_RULES: List[Dict[str, Any]] = [
+    {"id": "too_short", "type": "length", "min": 200, "action": "REGENERATE",
+     "problem": "SOAP note too short"},
+    {"id": "too_long", "type": "length", "max": 4000, "action": "REGENERATE",
+     "problem": "SOAP note too long"},
+    {"id": "missing_sections", "type": "sections", "required": ["S:", "O:", "A:", "P:"],
+     "action": "REGENERATE", "problem": "Missing SOAP sections (S/O/A/P)"},
+    {"id": "uncertainty", "type": "lexicon",
+     "terms": ["I assume", "maybe", "probably", "might be", "not sure"], "threshold": 3,
+     "action": "HUMAN_REVIEW", "problem": "Too many uncertainty markers"},
+]
+
+# separates notes in a batch scan; never part of a marker or term
+_BATCH_SEP = "\x00"
+
+
+@dataclass
+class Rule:
+    id: str
+    type: str
+    action: str
+    problem: str
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Rule":
+        d = dict(d)
+        rule_id = str(d.pop("id", "") or "")
+        rule_type = d.pop("type", None)
+        if not rule_id or rule_type not in RULE_TYPES:
+            raise ValueError(f"rule {rule_id or '?'}: type must be one of {RULE_TYPES}")
+        action = d.pop("action", "REGENERATE")
+        if action not in ACTIONS:
+            raise ValueError(f"rule {rule_id}: action must be one of {ACTIONS}")
+        problem = d.pop("problem", rule_id)
+        return cls(rule_id, rule_type, action, problem, d)
+
+
+@dataclass
+class RuleResult:
+    id: str
+    passed: bool
+    score: float                 # 1.0 = fully passes, towards 0 the further off
+    value: Any                   # what was measured (length, hits, ...)
+    details: Dict[str, Any] = field(default_factory=dict)   # merged into the decision's reasons on failure
+    rule: Optional[Rule] = field(default=None, repr=False)
+
+
+@dataclass
+class RuleBatch:
+    rule_ids: List[str]
+    scores: np.ndarray           # (notes, rules) float32
+    passed: np.ndarray           # (notes, rules) bool
+    results: List[List[RuleResult]]
+
+    def failed(self) -> np.ndarray:
+        """
+        Index of the first failing rule per note, -1 if all pass.
+        """
+        failing = ~self.passed
+        first = failing.argmax(axis=1)
+        return np.where(failing.any(axis=1), first, -1)
+
+
+def _term_pattern(term: str) -> str:
+    return r"\s+".join(re.escape(part) for part in term.split())
+
+
+def _is_word(c: str) -> bool:
+    return c.isalnum() or c == "_"
+
+
+def _whole_word(text: str, start: int, end: int) -> bool:
+    # the match does not continue a word on either side (as \b would)
+    if start > 0 and _is_word(text[start - 1]) and _is_word(text[start]):
+        return False
+    return not (end < len(text) and _is_word(text[end]) and _is_word(text[end - 1]))
+
+
+class CompiledRules:
+    """
+    An immutable, compiled rule set.
+    Entity and grounding rules need the transcript (and an annotator); without it they pass.
+    """
+
+    def __init__(self, rules: Sequence[Rule]):
+        self.rules = [r for r in rules if r.params.get("enabled", True)]
+        self.ids = [r.id for r in self.rules]
+
+        # matched text -> (rule index, term index); markers are case-sensitive
+        # literals, lexicon terms case-insensitive substrings (whole_words:
+        # checked per match, so rules of either kind share one alternative)
+        self._exact: Dict[str, List[Tuple[int, int]]] = {}
+        self._folded: Dict[str, List[Tuple[int, int, bool]]] = {}
+        self._grounding: Dict[int, GroundingChecker] = {}
+        alternatives: Dict[str, str] = {}
+        first_chars = set()
+        for i, rule in enumerate(self.rules):
+            if rule.type == "sections":
+                for j, marker in enumerate(rule.params.get("required", [])):
+                    self._exact.setdefault(marker, []).append((i, j))
+                    alternatives.setdefault(marker, re.escape(marker))
+                    first_chars.add(marker[:1])
+            elif rule.type == "lexicon":
+                whole_words = bool(rule.params.get("whole_words", False))
+                for j, term in enumerate(rule.params.get("terms", [])):
+                    key = " ".join(term.lower().split())
+                    self._folded.setdefault(key, []).append((i, j, whole_words))
+                    alternatives.setdefault("\x01" + key, f"(?i:{_term_pattern(term)})")
+                    first_chars.update((key[:1], key[:1].upper()))
+            elif rule.type == "grounding":
+                self._grounding[i] = GroundingChecker(
+                    min_support=float(rule.params.get("min_support", 0.5)),
+                    ignore_terms=rule.params.get("ignore_terms", ()),
+                )
+        # longest first, so a term is never shadowed by one of its prefixes
+        ordered = sorted(alternatives.items(), key=lambda kv: -len(kv[0]))
+        self.pattern = None
+        if ordered:
+            # the first-character lookahead lets the scan skip most positions
+            # without trying every alternative (about 2x faster on long notes)
+            chars = "".join(re.escape(c) for c in sorted(first_chars) if c)
+            self.pattern = re.compile(f"(?=[{chars}])(?:" + "|".join(p for _, p in ordered) + ")")
+
+    def _hits(self, text: str, offsets: Optional[np.ndarray] = None) -> List[Dict[int, set]]:
+        """
+        One scan of text: per note (offsets: note start positions in a
+        batch), rule index -> set of term indexes found.
+        """
+        n = 1 if offsets is None else len(offsets)
+        hits: List[Dict[int, set]] = [{} for _ in range(n)]
+        if self.pattern is None:
+            return hits
+        found = [(m.start(), m.end(), m.group()) for m in self.pattern.finditer(text)]
+        if offsets is None:
+            owners = [0] * len(found)
+        else:
+            starts = np.fromiter((start for start, _, _ in found), dtype=np.int64, count=len(found))
+            owners = (np.searchsorted(offsets, starts, side="right") - 1).tolist()
+        exact, folded = self._exact, self._folded
+        for note, (start, end, text_hit) in zip(owners, found):
+            for i, j in exact.get(text_hit, ()):
+                hits[note].setdefault(i, set()).add(j)
+            for i, j, whole_words in folded.get(" ".join(text_hit.lower().split()), ()):
+                if not whole_words or _whole_word(text, start, end):
+                    hits[note].setdefault(i, set()).add(j)
+        return hits
+
+    def _entity_result(self,
+                       rule: Rule,
+                       note: str,
+                       transcript: Optional[str],
+                       annotator: Any,
+                       mentioned_cache: Optional[Dict[str, set]] = None) -> RuleResult:
+        if annotator is None or transcript is None:
+            return RuleResult(rule.id, True, 1.0, None)
+        mentioned = mentioned_cache.get(transcript) if mentioned_cache is not None else None
+        if mentioned is None:
+            # any transcript mention counts (negated too): plain matching, no span annotation
+            mentioned = {m.canonical for m in annotator.matcher.find_all(transcript)}
+            if mentioned_cache is not None:
+                mentioned_cache[transcript] = mentioned
+        categories = set(rule.params.get("categories") or ())
+        claimed = []
+        for sp in annotator.annotate(note):
+            if sp.negated or (categories and sp.category not in categories):
+                continue
+            if sp.canonical not in claimed:
+                claimed.append(sp.canonical)
+        unsupported = [c for c in claimed if c not in mentioned]
+        limit = int(rule.params.get("max_unsupported", 0))
+        score = 1.0 - len(unsupported) / len(claimed) if claimed else 1.0
+        return RuleResult(rule.id, len(unsupported) <= limit, score, len(unsupported),
+                          {"unsupported_entities": unsupported})
+
+    @staticmethod
+    def _grounding_result(rule: Rule,
+                          checker: GroundingChecker,
+                          note: str,
+                          transcript: Optional[str],
+                          annotator: Any) -> RuleResult:
+        if transcript is None:
+            return RuleResult(rule.id, True, 1.0, None)
+        report = checker.check(transcript, note, annotator)
+        unsupported = report.unsupported
+        numbers = report.unsupported_numbers
+        # paraphrase is normal: tolerate a few weakly supported sentences, not invented numbers
+        limit = max(int(rule.params.get("max_unsupported", 1)),
+                    int(float(rule.params.get("max_unsupported_fraction", 0.0)) * len(report.sentences)))
+        passed = len(unsupported) <= limit and len(numbers) <= int(rule.params.get("max_unsupported_numbers", 0))
+        return RuleResult(rule.id, passed, report.score, len(unsupported), {
+            "grounding_score": report.score,
+            "unsupported_claims": [s.text for s in unsupported],
+            "unsupported_numbers": numbers,
+        })
+
+    def _result(self, rule: Rule, i: int, note: str, length: int, hits: Dict[int, set],
+                transcript: Optional[str], annotator: Any,
+                mentioned_cache: Optional[Dict[str, set]] = None) -> RuleResult:
+        result = self._measure(rule, i, note, length, hits, transcript, annotator, mentioned_cache)
+        result.rule = rule
+        return result
+
+    def _measure(self, rule: Rule, i: int, note: str, length: int, hits: Dict[int, set],
+                 transcript: Optional[str], annotator: Any,
+                 mentioned_cache: Optional[Dict[str, set]]) -> RuleResult:
+        p = rule.params
+        if rule.type == "length":
+            lo, hi = int(p.get("min", 0)), int(p.get("max", 0))
+            bounds = {k: v for k, v in (("min_length", lo), ("max_length", hi)) if v > 0}
+            if lo > 0 and length < lo:
+                return RuleResult(rule.id, False, length / lo, length, bounds)
+            if hi > 0 and length > hi:
+                return RuleResult(rule.id, False, hi / length, length, bounds)
+            return RuleResult(rule.id, True, 1.0, length, bounds)
+        if rule.type == "sections":
+            required = p.get("required", [])
+            found = hits.get(i, set())
+            missing = [m for j, m in enumerate(required) if j not in found]
+            score = 1.0 - len(missing) / len(required) if required else 1.0
+            return RuleResult(rule.id, not missing, score, len(required) - len(missing),
+                              {"missing_sections": missing})
+        if rule.type == "lexicon":
+            terms = p.get("terms", [])
+            found = sorted(hits.get(i, set()))
+            threshold = max(1, int(p.get("threshold", 1)))
+            return RuleResult(rule.id, len(found) < threshold, max(0.0, 1.0 - len(found) / threshold), len(found),
+                              {"markers": [terms[j] for j in found]})
+        if rule.type == "grounding":
+            return self._grounding_result(rule, self._grounding[i], note, transcript, annotator)
+        return self._entity_result(rule, note, transcript, annotator, mentioned_cache)
+
+    def evaluate(self, note: str, transcript: Optional[str] = None, annotator: Any = None) -> List[RuleResult]:
+        hits = self._hits(note)[0]
+        length = len(note.strip())
+        return [self._result(rule, i, note, length, hits, transcript, annotator)
+                for i, rule in enumerate(self.rules)]
+
+    def evaluate_batch(self,
+                       notes: Sequence[str],
+                       transcripts: Optional[Sequence[Optional[str]]] = None,
+                       annotator: Any = None) -> RuleBatch:
+        """
+        All rules over many notes (e.g. an audit): one regex scan for the whole batch.
+        """
+        starts = np.zeros(len(notes), dtype=np.int64)
+        if len(notes) > 1:
+            np.cumsum([len(n) + len(_BATCH_SEP) for n in notes[:-1]], out=starts[1:])
+        hits = self._hits(_BATCH_SEP.join(notes), starts) if notes else []
+
+        # regenerate attempts / audits often share a transcript: match it once
+        mentioned: Dict[str, set] = {}
+        results = []
+        for k, note in enumerate(notes):
+            transcript = transcripts[k] if transcripts is not None else None
+            length = len(note.strip())
+            results.append([self._result(rule, i, note, length, hits[k], transcript, annotator, mentioned)
+                            for i, rule in enumerate(self.rules)])
+        scores = np.array([[r.score for r in row] for row in results], dtype=np.float32).reshape(len(notes), len(self.rules))
+        passed = np.array([[r.passed for r in row] for row in results], dtype=bool).reshape(len(notes), len(self.rules))
+        return RuleBatch(self.ids, scores, passed, results)
+
+
+def load_rules(path: str) -> List[Rule]:
+    """
+    Rules from a YAML file ({"rules": [...]} or a bare list); DEFAULT_RULES
+    if the file is missing or empty.
+    """
+    data = None
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+    if isinstance(data, dict):
+        data = data.get("rules")
+    if not data:
+        data = DEFAULT_RULES
+    if not isinstance(data, list):
+        raise ValueError(f"{path}: expected a list of rules")
+    return [Rule.from_dict(d) for d in data]
+
+
+class RuleEngine:
+    """
+    Compiled rules from a YAML file, hot-reloaded (checked every reload_interval s).
+    A file that fails to load keeps the previous rules (see last_error).
+    """
+
+    def __init__(self,
+                 path: str = DEFAULT_RULES_PATH,
+                 reload_interval: float = 5.0,
+                 overrides: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.overrides = overrides or {}
+        self.last_error: Optional[str] = None
+        self._reload_lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self._source_stat = self._stat()
+        self.compiled = self._compile()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _compile(self) -> CompiledRules:
+        rules = load_rules(self.path)
+        for rule in rules:
+            rule.params.update(self.overrides.get(rule.id, {}))
+        return CompiledRules(rules)
+
+    def fingerprint(self) -> str:
+        spec = repr([(r.id, r.type, r.action, sorted(r.params.items())) for r in self.compiled.rules])
+        return hashlib.sha256(spec.encode("utf-8")).hexdigest()[:16]
+
+    def maybe_reload(self) -> bool:
+        """
+        Returns True if new rules were loaded.
+        """
+        now = time.monotonic()
+        if now - self._last_check < self.reload_interval:
+            return False
+        with self._reload_lock:
+            self._last_check = now
+            stat = self._stat()
+            if stat == self._source_stat:
+                return False
+            self._source_stat = stat
+            try:
+                self.compiled = self._compile()
+            except (OSError, ValueError, yaml.YAMLError) as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                return False
+            self.last_error = None
+            return True
+
+    def evaluate(self, note: str, transcript: Optional[str] = None, annotator: Any = None) -> List[RuleResult]:
+        self.maybe_reload()
+        results = self.compiled.evaluate(note, transcript, annotator)
+        metrics = get_metrics()
+        for r in results:
+            if not r.passed:
+                metrics.inc("ics_rule_failures_total", rule=r.id)
+        return results
+
+    def evaluate_batch(self,
+                       notes: Sequence[str],
+                       transcripts: Optional[Sequence[Optional[str]]] = None,
+                       annotator: Any = None) -> RuleBatch:
+        self.maybe_reload()
+        return self.compiled.evaluate_batch(notes, transcripts, annotator)
@@ -23,12 +23,12 @@ def build_state_diagram() -> Digraph:
     dot.attr("node", shape="box", style="rounded", fontsize="12")
     dot.edge("S0", "S_ASR", label="u_asr")
     dot.edge("S_ASR", "S_LLM", label="u_llm")
-    dot.edge("S_LLM", "S_STD", label="u_std")
-    dot.edge("S_STD", "S_SUP", label="u_sup")
+    dot.edge("S_LLM", "S_SUP", label="u_sup")
     dot.edge("S_SUP", "D1", label="evaluate")
 
-    dot.edge("D1", "S_final", label="APPROVE")
-    dot.edge("D1", "S_LLM", label="REGENERATE (retry)")
-    dot.edge("D1", "S_final", label="HUMAN_REVIEW")
+    dot.edge("D1", "S_LLM", label="REGENERATE (repair)")
+    dot.edge("D1", "S_STD", label="APPROVE")
+    dot.edge("D1", "S_STD", label="HUMAN_REVIEW")
+    dot.edge("S_STD", "S_final", label="u_finalize")
 
     return dot
@@ -0,0 +1,233 @@
+"""
+Transcript grounding: is every sentence of a SOAP note supported by the transcript?
+The transcript is indexed once; each sentence is scored with set lookups.
+"""
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, FrozenSet, Iterable, List, Set, Tuple
+
+from app.kb.ontology_index import tokenize as _word_tokens
+
+# Function words and note-writing vocabulary: not claims about the patient
+STOPWORDS = frozenset("""
+a an the and or but if then than so of in on at to for from by with without within into onto
+as is are was were be been being am do does did has have had having will would shall should
+can could may might must it its this that these those there here he she they them his her their
+him we you your our i me my mine not no nor also very just only some any all each both either
+per via about over under after before during while since until again further once up down out
+off who whom which what when where why how s t
+patient patients pt reports reported report reporting states stated says said presents presented
+presenting complains complaint complaints denies denied history noted notes note mentioned
+subjective objective assessment plan impression diagnosis recommended recommend recommends
+advised advise discussed discuss counseled continue continued follow followup return visit
+today currently current likely consistent possible possibly suggest suggests suggestive
+symptom symptoms worsen worsens worsening improve improves improving needed prn monitor
+""".split())
+
+# spoken numbers in the transcript also support the digits a note writes
+NUMBER_WORDS = {
+    w: str(i) for i, w in enumerate(
+        "zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen "
+        "fifteen sixteen seventeen eighteen nineteen twenty".split())
+}
+NUMBER_WORDS.update({w: str(10 * i) for i, w in enumerate("thirty forty fifty sixty seventy eighty ninety".split(), 3)})
+NUMBER_WORDS.update({"hundred": "100", "thousand": "1000", "once": "1", "twice": "2"})
+
+# sentences end at . ! ? or a line break, but not at a decimal point ("38.5")
+_SENTENCE_RE = re.compile(r"(?:[^.!?\n]|\.(?=\d))+[.!?]*")
+# a section header at the start of a sentence ("S:", "**Plan:**", "A (Assessment):")
+_HEADER_RE = re.compile(r"[\s#*_>\-]*(?:[SOAP]|(?i:subjective|objective|assessment|plan))\b[^:\n]{0,20}:[\s*_]*")
+_NOT_MENTIONED_RE = re.compile(r"^\W*not (?:mentioned|documented|discussed|reported)\W*$", re.I)
+
+
+def normalize(token: str) -> str:
+    """
+    Crude, fast normalization so inflections meet: lowercase, no possessive,
+    plurals and -ing / -ed folded ("coughing", "coughs" -> "cough").
+    """
+    t = token.lower()
+    if t.endswith("'s"):
+        t = t[:-2]
+    if len(t) > 5 and t.endswith("ing"):
+        t = t[:-3]
+    elif len(t) > 4 and t.endswith("ied"):
+        t = t[:-3] + "y"
+    elif len(t) > 4 and t.endswith("ed"):
+        t = t[:-2]
+    elif len(t) > 4 and t.endswith("ies"):
+        t = t[:-3] + "y"
+    elif len(t) > 3 and t.endswith("s") and not t.endswith("ss"):
+        t = t[:-1]
+    return t
+
+
+def tokenize(text: str) -> List[Tuple[str, int, int]]:
+    """
+    Ontology word tokens, with decimals kept whole ("38.5", not "38" and "5").
+    """
+    tokens: List[Tuple[str, int, int]] = []
+    for token, start, end in _word_tokens(text):
+        if (tokens and token[:1].isdigit() and tokens[-1][0][-1:].isdigit()
+                and start == tokens[-1][2] + 1 and text[start - 1] == "."):
+            prev, prev_start, _ = tokens.pop()
+            token, start = f"{prev}.{token}", prev_start
+        tokens.append((token, start, end))
+    return tokens
+
+
+def _is_number(token: str) -> bool:
+    return token[:1].isdigit()
+
+
+_STOP = frozenset(normalize(w) for w in STOPWORDS)
+
+
+@dataclass
+class TranscriptIndex:
+    terms: FrozenSet[str]                    # normalized tokens
+    canonicals: FrozenSet[str]               # ontology concepts mentioned (negated or not)
+
+    @classmethod
+    def build(cls, transcript: str, annotator: Any = None) -> "TranscriptIndex":
+        terms: Set[str] = set()
+        for token, _, _ in tokenize(transcript):
+            norm = normalize(token)
+            terms.add(norm)
+            if norm in NUMBER_WORDS:
+                terms.add(NUMBER_WORDS[norm])
+        canonicals: FrozenSet[str] = frozenset()
+        if annotator is not None:
+            canonicals = frozenset(m.canonical for m in annotator.matcher.find_all(transcript))
+        return cls(frozenset(terms), canonicals)
+
+
+@dataclass
+class SentenceSupport:
+    text: str
+    start: int                     # character span in the note
+    end: int
+    support: float                 # share of content words found in the transcript
+    unsupported_terms: List[str] = field(default_factory=list)
+    unsupported_numbers: List[str] = field(default_factory=list)
+    supported: bool = True
+
+
+@dataclass
+class GroundingReport:
+    score: float                   # mean support over the checked sentences (1.0 if none)
+    sentences: List[SentenceSupport]
+
+    @property
+    def unsupported(self) -> List[SentenceSupport]:
+        return [s for s in self.sentences if not s.supported]
+
+    @property
+    def unsupported_numbers(self) -> List[str]:
+        return [n for s in self.sentences for n in s.unsupported_numbers]
+
+
+class GroundingChecker:
+    """
+    Scores note sentences against a transcript.
+    annotator: a StandardizerAgent, for ontology synonyms (optional).
+    """
+
+    def __init__(self,
+                 min_support: float = 0.5,
+                 ignore_terms: Iterable[str] = (),
+                 cache_size: int = 16):
+        self.min_support = min_support
+        self.stopwords = _STOP | frozenset(normalize(t) for t in ignore_terms)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, str], TranscriptIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def index(self, transcript: str, annotator: Any = None) -> TranscriptIndex:
+        # keyed on the ontology too, so a reloaded ontology rebuilds the canonicals
+        key = (transcript, getattr(annotator, "ontology_hash", "") if annotator is not None else None)
+        with self._lock:
+            idx = self._cache.get(key)
+            if idx is not None:
+                self._cache.move_to_end(key)
+                return idx
+        idx = TranscriptIndex.build(transcript, annotator)
+        with self._lock:
+            self._cache[key] = idx
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return idx
+
+    @staticmethod
+    def _grounded_spans(note: str, idx: TranscriptIndex, annotator: Any) -> List[Tuple[int, int]]:
+        """
+        Character spans of note ontology mentions whose concept the
+        transcript mentions, merged into sorted, disjoint intervals.
+        """
+        if annotator is None or not idx.canonicals:
+            return []
+        spans = sorted((m.start, m.end) for m in annotator.matcher.find_all(note) if m.canonical in idx.canonicals)
+        merged: List[Tuple[int, int]] = []
+        for start, end in spans:
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    def check(self, transcript: str, note: str, annotator: Any = None) -> GroundingReport:
+        idx = self.index(transcript, annotator)
+        grounded = self._grounded_spans(note, idx, annotator)
+        tokens = tokenize(note)
+        sentences: List[SentenceSupport] = []
+        t = 0   # tokens and sentences are both in text order: one merge-style walk
+        g = 0
+        for m in _SENTENCE_RE.finditer(note):
+            start, end = m.start(), m.end()
+            header = _HEADER_RE.match(note, start, end)
+            body_start = header.end() if header else start
+            body = note[body_start:end].strip()
+            while t < len(tokens) and tokens[t][1] < body_start:
+                t += 1
+            if not body or _NOT_MENTIONED_RE.match(body):
+                continue
+
+            content = 0
+            missing: List[str] = []
+            numbers: List[str] = []
+            supported = 0
+            while t < len(tokens) and tokens[t][2] <= end:
+                token, ts, _ = tokens[t]
+                t += 1
+                norm = normalize(token)
+                if norm in self.stopwords:
+                    continue
+                content += 1
+                if norm in idx.terms:
+                    supported += 1
+                    continue
+                while g < len(grounded) and grounded[g][1] <= ts:
+                    g += 1
+                if g < len(grounded) and grounded[g][0] <= ts:
+                    supported += 1
+                elif _is_number(token):
+                    numbers.append(token)
+                else:
+                    missing.append(token)
+            if not content:
+                continue
+
+            support = supported / content
+            sentences.append(SentenceSupport(
+                text=body,
+                start=body_start,
+                end=end,
+                support=round(support, 3),
+                unsupported_terms=missing,
+                unsupported_numbers=numbers,
+                supported=support >= self.min_support and not numbers,
+            ))
+
+        score = sum(s.support for s in sentences) / len(sentences) if sentences else 1.0
+        return GroundingReport(round(score, 3), sentences)
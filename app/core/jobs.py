@@ -0,0 +1,149 @@
+import logging
+import multiprocessing as mp
+import os
+import signal
+import threading
+import traceback
+from dataclasses import asdict
+from typing import Dict, List, Optional, Tuple
+
+from app.agents.asr_agent import ASRResult
+from app.config.settings import Settings
+from app.core.pipeline import PipelineOutput, get_pipeline
+from app.storage.db import Job, JobQueue
+
+log = logging.getLogger(__name__)
+
+_queues: Dict[Tuple[str, float, int], JobQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def get_job_queue(settings: Optional[Settings] = None) -> JobQueue:
+    """
+    Process-wide JobQueue for settings.jobs_path.
+    """
+    settings = settings or Settings()
+    key = (settings.jobs_path, settings.jobs_lease, settings.jobs_max_attempts)
+    with _queues_lock:
+        queue = _queues.get(key)
+        if queue is None:
+            queue = JobQueue(settings.jobs_path, lease=settings.jobs_lease, max_attempts=settings.jobs_max_attempts)
+            _queues[key] = queue
+        return queue
+
+
+def submit_job(settings: Settings, audio_path: str, force_human_review: bool = False) -> str:
+    return get_job_queue(settings).submit(
+        os.path.abspath(audio_path),
+        {"force_human_review": force_human_review},
+    )
+
+
+def job_output(job: Job) -> Optional[PipelineOutput]:
+    return PipelineOutput.from_dict(job.result) if job.result is not None else None
+
+
+def _run_stage(queue: JobQueue, job: Job, worker: str, fn) -> None:
+    try:
+        fn(job)
+    except Exception:
+        log.exception("job %s failed in %s", job.id, job.status)
+        queue.fail(job, worker, traceback.format_exc(limit=5))
+
+
+def asr_worker_loop(settings: Settings, worker: str, stop: "threading.Event") -> None:
+    """
+    ASR tier: CPU-bound, one worker per process (each holds its own Whisper
+    model; ASR_NUM_WORKERS / ASR_CPU_THREADS size it within the process).
+    """
+    queue = get_job_queue(settings)
+    pipeline = get_pipeline(settings)
+
+    def run(job: Job) -> None:
+        timings: Dict[str, float] = {}
+        asr, hit = pipeline.transcribe(job.audio_path, timings)
+        queue.advance(job, worker, "llm", {"asr": asdict(asr), "cached": hit, "timings": timings})
+
+    while not stop.is_set():
+        job = queue.claim("asr", worker)
+        if job is None:
+            stop.wait(settings.jobs_poll_interval)
+            continue
+        _run_stage(queue, job, worker, run)
+
+
+def llm_worker_loop(settings: Settings, worker: str, stop: "threading.Event") -> None:
+    """
+    LLM tier: I/O-bound, many threads per process sharing one pipeline and the
+    pooled async LLM client. Runs LLM + supervisor (+ regenerate) + standardizer.
+    """
+    queue = get_job_queue(settings)
+    pipeline = get_pipeline(settings)
+
+    def run(job: Job) -> None:
+        out = pipeline.run_from_asr(
+            ASRResult(**job.payload["asr"]),
+            force_human_review=job.options.get("force_human_review", False),
+            asr_cached=job.payload.get("cached", False),
+            asr_timings=job.payload.get("timings"),
+        )
+        out.meta["job_id"] = job.id
+        queue.finish(job, worker, asdict(out))
+
+    while not stop.is_set():
+        job = queue.claim("llm", worker)
+        if job is None:
+            stop.wait(settings.jobs_poll_interval)
+            continue
+        _run_stage(queue, job, worker, run)
+
+
+def _asr_process_main(settings: Settings, worker: str, stop: "mp.synchronize.Event") -> None:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)   # the parent handles Ctrl-C and sets stop
+    asr_worker_loop(settings, worker, stop)
+
+
+def run_workers(settings: Settings, asr_workers: int, llm_workers: int) -> None:
+    """
+    Start asr_workers processes and llm_workers threads, and block until interrupted.
+    """
+    ctx = mp.get_context("spawn")
+    stop_procs = ctx.Event()
+    stop_threads = threading.Event()
+    host = f"{os.uname().nodename}:{os.getpid()}"
+
+    procs: List[mp.Process] = []
+    for i in range(asr_workers):
+        p = ctx.Process(
+            target=_asr_process_main,
+            args=(settings, f"{host}/asr-{i}", stop_procs),
+            name=f"ics-asr-{i}",
+            daemon=True,
+        )
+        p.start()
+        procs.append(p)
+
+    threads: List[threading.Thread] = []
+    for i in range(llm_workers):
+        t = threading.Thread(
+            target=llm_worker_loop,
+            args=(settings, f"{host}/llm-{i}", stop_threads),
+            name=f"ics-llm-{i}",
+            daemon=True,
+        )
+        t.start()
+        threads.append(t)
+
+    log.info("job workers running: %d ASR processes, %d LLM threads", asr_workers, llm_workers)
+    try:
+        while any(p.is_alive() for p in procs) or any(t.is_alive() for t in threads):
+            stop_threads.wait(1.0)
+    except KeyboardInterrupt:
+        log.info("stopping job workers")
+    finally:
+        stop_procs.set()
+        stop_threads.set()
+        for p in procs:
+            p.join(timeout=10)
+        for t in threads:
+            t.join(timeout=10)
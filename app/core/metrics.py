@@ -0,0 +1,288 @@
+import os
+import resource
+import sys
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import psutil
+except ImportError:   # optional: /proc and getrusage are used instead
+    psutil = None
+
+# Histogram buckets in seconds, from sub-step timings to long LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in items)
+    return "{" + body + "}"
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Bucket upper bound containing quantile q (coarse, like histogram_quantile).
+        """
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        acc = 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+
+class _Timer:
+    """
+    Context manager measuring perf_counter time into a histogram.
+    .elapsed (seconds) is available after the block.
+    """
+    __slots__ = ("metrics", "name", "labels", "start", "elapsed")
+
+    def __init__(self, metrics: "Metrics", name: str, labels: Dict[str, Any]):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.elapsed = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.elapsed = time.perf_counter() - self.start
+        self.metrics.observe(self.name, self.elapsed, **self.labels)
+
+
+class _NullTimer:
+    __slots__ = ()
+    elapsed = 0.0
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """
+    In-process counters, gauges and histograms with Prometheus text export.
+    When disabled every call is a no-op.
+    """
+
+    def __init__(self, enabled: bool = True, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set_counter(self, name: str, value: float, **labels: Any) -> None:
+        """
+        Set a counter to an absolute value sampled elsewhere (e.g. process CPU seconds).
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters.setdefault(name, {})[_labels(labels)] = value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels(labels)] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(self.buckets)
+            hist.observe(value)
+
+    def timer(self, name: str, **labels: Any):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def sample_process(self) -> Dict[str, float]:
+        """
+        Record (and return) resident memory and CPU seconds of this process.
+        """
+        if not self.enabled:
+            return {}
+        sample = process_sample()
+        for name, value in sample.items():
+            if name.endswith("_total"):
+                self.set_counter(name, value)
+            else:
+                self.set_gauge(name, value)
+        return sample
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Plain-dict view: counters / gauges by label string, histograms with
+        count, sum and coarse p50/p95/p99.
+        """
+        with self._lock:
+            return {
+                "counters": {n: {_fmt_labels(k): v for k, v in s.items()} for n, s in self._counters.items()},
+                "gauges": {n: {_fmt_labels(k): v for k, v in s.items()} for n, s in self._gauges.items()},
+                "histograms": {
+                    n: {
+                        _fmt_labels(k): {
+                            "count": h.count,
+                            "sum": round(h.sum, 6),
+                            "p50": h.quantile(0.50),
+                            "p95": h.quantile(0.95),
+                            "p99": h.quantile(0.99),
+                        }
+                        for k, h in s.items()
+                    }
+                    for n, s in self._histograms.items()
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        Prometheus text exposition format (version 0.0.4).
+        """
+        lines: List[str] = []
+        with self._lock:
+            for kind, families in (("counter", self._counters), ("gauge", self._gauges)):
+                for name in sorted(families):
+                    self._header(lines, name, kind)
+                    for key, value in sorted(families[name].items()):
+                        lines.append(f"{name}{_fmt_labels(key)} {float(value)!r}")
+            for name in sorted(self._histograms):
+                self._header(lines, name, "histogram")
+                for key, h in sorted(self._histograms[name].items()):
+                    acc = 0
+                    for bound, c in zip(h.buckets, h.counts):
+                        acc += c
+                        lines.append(f"{name}_bucket{_fmt_labels(key, ('le', f'{bound:g}'))} {acc}")
+                    lines.append(f"{name}_bucket{_fmt_labels(key, ('le', '+Inf'))} {h.count}")
+                    lines.append(f"{name}_sum{_fmt_labels(key)} {h.sum!r}")
+                    lines.append(f"{name}_count{_fmt_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, lines: List[str], name: str, kind: str) -> None:
+        if name in self._help:
+            lines.append(f"# HELP {name} {self._help[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    def write(self, path: str) -> None:
+        """
+        Write the Prometheus text to path atomically (e.g. for node_exporter's
+        textfile collector, or to diff between runs).
+        """
+        self.sample_process()
+        out = Path(path)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        tmp = out.with_name(out.name + f".{os.getpid()}.tmp")
+        tmp.write_text(self.to_prometheus(), encoding="utf-8")
+        os.replace(tmp, out)
+
+
+def process_sample() -> Dict[str, float]:
+    """
+    RSS (bytes), peak RSS (bytes) and user/system CPU seconds of this process.
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    if psutil is not None:
+        rss = psutil.Process().memory_info().rss
+    else:
+        try:
+            with open("/proc/self/statm") as f:
+                rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            rss = peak
+    return {
+        "ics_process_resident_memory_bytes": float(rss),
+        "ics_process_peak_resident_memory_bytes": float(peak),
+        "ics_process_cpu_user_seconds_total": usage.ru_utime,
+        "ics_process_cpu_system_seconds_total": usage.ru_stime,
+    }
+
+
+_metrics = Metrics()
+_metrics.describe("ics_stage_seconds", "Wall time of each pipeline stage (state transition)")
+_metrics.describe("ics_asr_model_load_seconds", "Whisper model load time")
+_metrics.describe("ics_asr_decode_seconds", "Whisper decode time per request")
+_metrics.describe("ics_asr_audio_seconds_total", "Audio seconds transcribed")
+_metrics.describe("ics_vad_audio_seconds_total", "Audio seconds seen by the VAD segmenter, by kind (speech / silence)")
+_metrics.describe("ics_llm_ttfb_seconds", "Time to first byte / token of an LLM call")
+_metrics.describe("ics_llm_seconds", "Total LLM call time")
+_metrics.describe("ics_llm_tokens_total", "LLM tokens by kind (prompt / completion)")
+_metrics.describe("ics_draft_updates_total", "Live SOAP draft updates by outcome (ok / error)")
+_metrics.describe("ics_rule_failures_total", "Supervisor rule failures by rule id")
+_metrics.describe("ics_cache_requests_total", "Result cache lookups by tier and outcome")
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+def configure(enabled: Optional[bool] = None) -> Metrics:
+    if enabled is not None:
+        _metrics.enabled = enabled
+    return _metrics
@@ -1,12 +1,21 @@
-from dataclasses import dataclass
-from typing import Dict, Any
+import re
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import asdict, astuple, dataclass
+from typing import Dict, Any, Generator, Iterator, List, Optional, Sequence, Tuple
 
 from app.config.settings import Settings
-from app.agents.asr_agent import ASRAgent, ASRResult
-from app.agents.llm_agent_groq import GroqLLMAgent
+from app.agents.asr_agent import ASRAgent, ASRResult, asr_fingerprint, resolve_parallelism
+from app.agents.model_registry import get_model_registry
+from app.agents.llm_backend import create_llm_agent
 from app.agents.standardizer_agent import StandardizerAgent, StandardizationResult
 from app.agents.supervisor_agent import SupervisorAgent, SupervisorDecision
+from app.config.prompts import repair_instructions
+from app.core.metrics import configure as configure_metrics, get_metrics
+from app.core.soap import SOAPSection, SOAPSectionStream
 from app.core.state_machine import StateMachine
+from app.storage.db import ResultCache, TierPolicy, content_key, sha256_file
 
 
 @dataclass
@@ -17,44 +26,373 @@ class PipelineOutput:
     sup: SupervisorDecision
     meta: Dict[str, Any]
 
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "PipelineOutput":
+        """
+        Inverse of dataclasses.asdict (e.g. a result handed over by a job worker).
+        """
+        return cls(
+            asr=ASRResult(**d["asr"]),
+            soap_note=d["soap_note"],
+            std=StandardizationResult.from_dict(d["std"]),
+            sup=SupervisorDecision(**d["sup"]),
+            meta=d["meta"],
+        )
+
+
+@dataclass
+class PipelineEvent:
+    kind: str    # segment | asr | token | section | regenerate | done
+    data: Any
+
 
 class ClinicalDocPipeline:
     def __init__(self, settings: Settings):
         self.settings = settings
+        configure_metrics(enabled=settings.metrics_enabled)
 
-        self.asr_agent = ASRAgent(
-            model_size=settings.asr_model_size,
-            device=settings.asr_device,
-            compute_type=settings.asr_compute_type,
-        )
+        # Whisper is loaded on first use, so LLM-only job workers never load it
+        self._asr_agent: Optional[ASRAgent] = None
+        self._asr_lock = threading.Lock()
+
+        self.llm_agent = create_llm_agent(settings)
 
-        self.llm_agent = GroqLLMAgent(
-            api_key=settings.groq_api_key,
-            model=settings.groq_model
+
+        self.std_agent = StandardizerAgent(
+            settings.ontology_path,
+            reload_interval=settings.ontology_reload_interval,
+        )
+        self.sup_agent = SupervisorAgent(
+            rules_path=settings.rules_path,
+            reload_interval=settings.rules_reload_interval,
+            std_agent=self.std_agent,
         )
 
+        # Supervisor output is never cached: it is cheap, and rule changes
+        # should take effect while the expensive stages are reused
+        self.cache: Optional[ResultCache] = None
+        if settings.cache_enabled:
+            policy = TierPolicy(max_bytes=settings.cache_max_mb * 1024 * 1024, ttl=settings.cache_ttl)
+            self.cache = ResultCache(settings.cache_path,
+                                     {"asr": policy, "facts": policy, "soap": policy, "std": policy})
+
+    @property
+    def asr_agent(self) -> ASRAgent:
+        with self._asr_lock:
+            if self._asr_agent is None:
+                self._asr_agent = ASRAgent(
+                    model_size=self.settings.asr_model_size,
+                    device=self.settings.asr_device,
+                    compute_type=self.settings.asr_compute_type,
+                    num_workers=self.settings.asr_num_workers,
+                    cpu_threads=self.settings.asr_cpu_threads,
+                )
+            return self._asr_agent
+
+    def _cache_get(self, tier: str, key: Optional[str]) -> Optional[Any]:
+        if not (self.cache and key):
+            return None
+        value = self.cache.get(tier, key)
+        get_metrics().inc("ics_cache_requests_total", tier=tier, outcome="miss" if value is None else "hit")
+        return value
+
+    def _cache_put(self, tier: str, key: Optional[str], value: Any) -> None:
+        if self.cache and key:
+            self.cache.put(tier, key, value)
+
+    def _asr_key(self, audio_path: str, language: Optional[str] = "en") -> Optional[str]:
+        # from the settings, so a cache hit never loads the Whisper model
+        if not self.cache:
+            return None
+        s = self.settings
+        fp = asr_fingerprint(s.asr_model_size, s.asr_device, s.asr_compute_type, language)
+        return content_key("asr", sha256_file(audio_path), fp)
 
-        self.std_agent = StandardizerAgent("app/kb/ontology_stub.json")
-        self.sup_agent = SupervisorAgent(min_length=150)
+    def _facts_key(self, excerpt: str) -> Optional[str]:
+        if not self.cache:
+            return None
+        return content_key("facts", excerpt, self.llm_agent.fingerprint())
+
+    def _soap_key(self,
+                  transcript: str,
+                  repair: Optional[str] = None,
+                  previous: Optional[str] = None,
+                  facts: Optional[Sequence[str]] = None) -> Optional[str]:
+        if not self.cache:
+            return None
+        # a note merged from facts depends on them, not on the transcript
+        source = transcript if facts is None else list(facts)
+        if repair is None:
+            return content_key("soap", source, self.llm_agent.fingerprint())
+        return content_key("soap", source, repair, previous, self.llm_agent.fingerprint())
+
+    def _std_key(self, transcript: str, soap: str) -> Optional[str]:
+        if not self.cache:
+            return None
+        return content_key("std", transcript, soap, self.std_agent.fingerprint())
+
+    def transcribe(self,
+                   audio_path: str,
+                   timings: Optional[Dict[str, float]] = None) -> Tuple[ASRResult, bool]:
+        """
+        ASR stage on its own (cache first). Returns (result, cache hit).
+        timings receives model_load_ms and decode_ms on a miss.
+        """
+        return _drain(self._transcribe(audio_path, timings))
+
+    def _transcribe(self,
+                    audio_path: str,
+                    timings: Optional[Dict[str, float]] = None) -> Generator[PipelineEvent, None, Tuple[ASRResult, bool]]:
+        """
+        transcribe(), yielding a "segment" event per ASRSegment as it is
+        decoded (nothing on a cache hit).
+        """
+        timings = timings if timings is not None else {}
+        key = self._asr_key(audio_path)
+        hit = self._cache_get("asr", key)
+        if hit is not None:
+            return ASRResult(**hit), True
+
+        t0 = time.perf_counter()
+        agent = self.asr_agent
+        timings["model_load_ms"] = _ms_since(t0)
+        t0 = time.perf_counter()
+        stream = agent.stream(audio_path, language="en")
+        for seg in stream:
+            yield PipelineEvent("segment", seg)
+        asr = stream.result()
+        timings["decode_ms"] = _ms_since(t0)
+        self._cache_put("asr", key, asdict(asr))
+        return asr, False
 
     def run_full(self, audio_path: str, force_human_review: bool = False) -> PipelineOutput:
         sm = StateMachine()
+        timings: Dict[str, float] = {}
+        asr, asr_hit = self.transcribe(audio_path, timings)
+        return self._run_after_asr(sm, asr, force_human_review, asr_hit, timings)
+
+    def run_from_asr(self,
+                     asr: ASRResult,
+                     force_human_review: bool = False,
+                     asr_cached: bool = False,
+                     asr_timings: Optional[Dict[str, float]] = None) -> PipelineOutput:
+        """
+        Everything after ASR, for a transcript produced elsewhere (e.g. by an
+        ASR job worker in another process).
+        """
+        return self._run_after_asr(StateMachine(), asr, force_human_review, asr_cached, asr_timings or {})
+
+    def _run_after_asr(self,
+                       sm: StateMachine,
+                       asr: ASRResult,
+                       force_human_review: bool,
+                       asr_cached: bool,
+                       asr_timings: Dict[str, float]) -> PipelineOutput:
+        sm.transition("S_ASR", "u_asr", {"segments": len(asr.segments), "cached": asr_cached, **asr_timings})
+
+        # LLM + Supervisor, regenerating within the retry budget
+        soap, sup = _drain(self._generate_and_review(sm, asr.text, stream=False, segments=asr.segments))
+
+        return self._finish(sm, asr, soap, sup, force_human_review)
+
+    def run_full_streaming(self, audio_path: str, force_human_review: bool = False) -> Iterator[PipelineEvent]:
+        """
+        Same control flow as run_full, yielding PipelineEvents:
+        segment, asr, token, section, regenerate, done.
+        """
+        sm = StateMachine()
 
         # ASR
-        asr = self.asr_agent.transcribe(audio_path=audio_path, language="en")
-        sm.transition("S_ASR", "u_asr", {"segments": len(asr.segments)})
+        timings: Dict[str, float] = {}
+        asr, asr_hit = yield from self._transcribe(audio_path, timings)
+        sm.transition("S_ASR", "u_asr", {"segments": len(asr.segments), "cached": asr_hit, **timings})
+        yield PipelineEvent("asr", asr)
+
+        # LLM (streamed) + Supervisor, regenerating within the retry budget
+        soap, sup = yield from self._generate_and_review(sm, asr.text, stream=True, segments=asr.segments)
+
+        yield PipelineEvent("done", self._finish(sm, asr, soap, sup, force_human_review))
 
-        # LLM
-        soap = self.llm_agent.generate_soap(asr.text)
-        sm.transition("S_LLM", "u_llm", {"llm_model": self.settings.groq_model})
+    def _generate_and_review(self,
+                             sm: StateMachine,
+                             transcript: str,
+                             stream: bool,
+                             segments: Optional[List[Dict[str, Any]]] = None,
+                             ) -> Generator[PipelineEvent, None, Tuple[str, SupervisorDecision]]:
+        """
+        S_LLM -> S_SUP, and back to S_LLM while the supervisor answers REGENERATE.
+        Bounded by llm_regen_max_attempts and llm_regen_deadline, then escalated to HUMAN_REVIEW.
+        """
+        max_attempts = max(1, self.settings.llm_regen_max_attempts)
+        deadline = self.settings.llm_regen_deadline
+        started = time.monotonic()
+        until = started + deadline if deadline > 0 else None
 
-        # Standardizer
-        std = self.std_agent.standardize(asr.text, soap)
-        sm.transition("S_STD", "u_std", {"entities": {k: len(v) for k, v in std.entities.items()}})
+        attempt = 1
+        t0 = time.monotonic()
+        stats: Dict[str, Any] = {"llm_model": self.llm_agent.model}
+        try:
+            facts = self._map_facts(sm, transcript, segments, deadline=until)
+            soap, hit = yield from self._generate(transcript, stream=stream, deadline=until, stats=stats, facts=facts)
+        except FutureTimeout:
+            sup = SupervisorDecision("HUMAN_REVIEW", {
+                "problem": "No SOAP note within LLM_REGEN_DEADLINE",
+                "code": "deadline",
+                "regenerate_exhausted": "deadline",
+                "attempts": 0,
+            }, "")
+            sm.transition("S_SUP", "u_escalate", {"decision": sup.action, "reasons": sup.reasons})
+            return "", sup
+        cost = time.monotonic() - t0
+        sm.transition("S_LLM", "u_llm", {**stats, "streamed": stream, "attempt": attempt, "cached": hit})
+        sup = self.sup_agent.decide(transcript, soap)
+        sm.transition("S_SUP", "u_sup", {"decision": sup.action, "reasons": sup.reasons, "attempt": attempt})
 
-        # Supervisor
-        sup = self.sup_agent.decide(asr.text, soap)
-        sm.transition("S_SUP", "u_sup", {"decision": sup.action, "reasons": sup.reasons})
+        while sup.action == "REGENERATE":
+            elapsed = time.monotonic() - started
+            remaining = deadline - elapsed if deadline > 0 else None
+            exhausted = None
+            if attempt >= max_attempts:
+                exhausted = "max_attempts"
+            elif remaining is not None and remaining < cost:
+                exhausted = "deadline"
+            if exhausted is None:
+                repair = repair_instructions(sup.reasons)
+                sm.transition("S_LLM", "u_regenerate", {
+                    "attempt": attempt + 1,
+                    "repair": repair,
+                    "elapsed_s": round(elapsed, 3),
+                })
+                if stream:
+                    yield PipelineEvent("regenerate", {"attempt": attempt + 1, "reasons": sup.reasons})
+                t0 = time.monotonic()
+                stats = {"llm_model": self.llm_agent.model}
+                try:
+                    new_soap, hit = yield from self._generate(
+                        transcript, repair, soap, stream=stream,
+                        deadline=until,
+                        stats=stats,
+                        facts=facts,
+                    )
+                except FutureTimeout:
+                    exhausted = "deadline"
+            if exhausted is not None:
+                sup.action = "HUMAN_REVIEW"
+                sup.reasons["regenerate_exhausted"] = exhausted
+                sup.reasons["attempts"] = attempt
+                sm.transition("S_SUP", "u_escalate", {"decision": sup.action, "reasons": sup.reasons})
+                break
+
+            attempt += 1
+            cost = time.monotonic() - t0 if not hit else cost
+            soap = new_soap
+            sm.transition("S_LLM", "u_llm", {**stats, "streamed": stream, "attempt": attempt, "cached": hit})
+            sup = self.sup_agent.decide(transcript, soap)
+            sm.transition("S_SUP", "u_sup", {"decision": sup.action, "reasons": sup.reasons, "attempt": attempt})
+
+        return soap, sup
+
+    def _generate(self,
+                  transcript: str,
+                  repair: Optional[str] = None,
+                  previous: Optional[str] = None,
+                  stream: bool = False,
+                  deadline: Optional[float] = None,
+                  stats: Optional[Dict[str, Any]] = None,
+                  facts: Optional[Sequence[str]] = None) -> Generator[PipelineEvent, None, Tuple[str, bool]]:
+        """
+        One SOAP generation (cache first); when streaming, yields token and section events.
+        Raises concurrent.futures.TimeoutError past deadline (time.monotonic()).
+        """
+        key = self._soap_key(transcript, repair, previous, facts)
+        cached = self._cache_get("soap", key)
+        if cached is not None and not stream:
+            return cached, True
+
+        if stream:
+            deltas = [cached] if cached is not None else self.llm_agent.stream_soap(
+                transcript, repair, previous, stats, facts)
+            sections = SOAPSectionStream()
+            try:
+                for delta in deltas:
+                    if deadline is not None and time.monotonic() > deadline:
+                        raise FutureTimeout()
+                    yield PipelineEvent("token", delta)
+                    for sec in sections.feed(delta):
+                        yield PipelineEvent("section", self._section_preview(sections.text, sec))
+            finally:
+                close = getattr(deltas, "close", None)
+                if close is not None:
+                    close()
+            for sec in sections.close():
+                yield PipelineEvent("section", self._section_preview(sections.text, sec))
+            soap = sections.text.strip()
+        else:
+            timeout = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+            soap = self.llm_agent.generate_soap(transcript, repair, previous, timeout=timeout, stats=stats, facts=facts)
+
+        if cached is None:
+            self._cache_put("soap", key, soap)
+        return soap, cached is not None
+
+    def _map_facts(self,
+                   sm: StateMachine,
+                   transcript: str,
+                   segments: Optional[List[Dict[str, Any]]],
+                   deadline: Optional[float] = None) -> Optional[List[str]]:
+        """
+        Map step for long transcripts (None if it fits one prompt): facts per excerpt.
+        Raises concurrent.futures.TimeoutError past deadline (time.monotonic()).
+        """
+        limit = self.settings.llm_map_reduce_chars
+        if limit <= 0 or len(transcript) <= limit:
+            return None
+        excerpts = transcript_chunks(transcript, segments, self.settings.llm_chunk_chars)
+        keys = [self._facts_key(e) for e in excerpts]
+        facts: List[Optional[str]] = [self._cache_get("facts", k) for k in keys]
+        missing = [i for i, f in enumerate(facts) if f is None]
+
+        stats: Dict[str, Any] = {"map_calls": 0}
+        if missing:
+            timeout = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+            new = self.llm_agent.extract_facts([excerpts[i] for i in missing],
+                                               max_concurrency=self.settings.llm_map_concurrency,
+                                               timeout=timeout,
+                                               stats=stats)
+            for i, f in zip(missing, new):
+                facts[i] = f
+                self._cache_put("facts", keys[i], f)
+        sm.transition("S_LLM", "u_map", {**stats, "excerpts": len(excerpts), "cached": len(excerpts) - len(missing)})
+        return facts
+
+    def _section_preview(self, note: str, sec: SOAPSection) -> Dict[str, Any]:
+        body = sec.body(note)
+        return {
+            "section": sec.letter,
+            "text": body,
+            "entities": self.std_agent.extract(body, section=sec.letter),
+            "checks": self.sup_agent.check_section(sec.letter, body),
+        }
+
+    def _finish(self,
+                sm: StateMachine,
+                asr: ASRResult,
+                soap: str,
+                sup: SupervisorDecision,
+                force_human_review: bool) -> PipelineOutput:
+        # Standardizer (once, on the accepted note)
+        std_key = self._std_key(asr.text, soap)
+        hit = self._cache_get("std", std_key)
+        if hit is not None:
+            std = StandardizationResult.from_dict(hit)
+        else:
+            std = self.std_agent.standardize(asr.text, soap)
+            self._cache_put("std", std_key, asdict(std))
+        sm.transition("S_STD", "u_std", {
+            "entities": {k: len(v) for k, v in std.entities.items()},
+            "negated": sum(len(v) for v in std.negated.values()),
+            "cached": hit is not None,
+        })
 
         # Force Human Review (manual override)
         if force_human_review:
@@ -70,9 +408,99 @@ class ClinicalDocPipeline:
         meta = {
             "stage": "DONE",
             "asr_model": self.settings.asr_model_size,
-            "llm_model": self.settings.groq_model,
+            "llm_model": self.llm_agent.model,
             "final_decision": sup.action,
+            "total_ms": sm.total_ms(),
             "state_log": [e.__dict__ for e in sm.log]
         }
 
+        metrics = get_metrics()
+        if metrics.enabled:
+            meta["resources"] = metrics.sample_process()
+            metrics.inc("ics_pipeline_runs_total", decision=sup.action)
+            if self.settings.metrics_path:
+                metrics.write(self.settings.metrics_path)
+
         return PipelineOutput(asr=asr, soap_note=soap, std=std, sup=sup, meta=meta)
+
+
+def _ms_since(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 3)
+
+
+def transcript_chunks(transcript: str,
+                      segments: Optional[List[Dict[str, Any]]],
+                      max_chars: int) -> List[str]:
+    """
+    Split a transcript into excerpts of about max_chars on segment boundaries.
+    """
+    if segments:
+        pieces = [seg.get("text", "").strip() for seg in segments]
+    else:
+        pieces = re.split(r"(?<=[.!?])\s+", transcript.strip())
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for piece in pieces:
+        if not piece:
+            continue
+        if current and size + len(piece) > max_chars:
+            chunks.append(" ".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += len(piece) + 1
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _drain(gen: Generator[Any, None, Any]) -> Any:
+    """
+    Run a generator to completion, discarding what it yields; returns its return value.
+    """
+    while True:
+        try:
+            next(gen)
+        except StopIteration as stop:
+            return stop.value
+
+
+_pipelines: Dict[Tuple, ClinicalDocPipeline] = {}
+_pipelines_lock = threading.Lock()
+
+
+def _configure_registry(settings: Settings) -> None:
+    get_model_registry().configure(
+        max_idle=settings.asr_cache_max_idle,
+        idle_ttl=settings.asr_cache_idle_ttl,
+    )
+
+
+def get_pipeline(settings: Optional[Settings] = None) -> ClinicalDocPipeline:
+    """
+    Process-wide pipeline factory, one per distinct Settings.
+    """
+    settings = settings or Settings()
+    key = astuple(settings)
+    with _pipelines_lock:
+        pipeline = _pipelines.get(key)
+        if pipeline is None:
+            _configure_registry(settings)
+            pipeline = ClinicalDocPipeline(settings)
+            _pipelines[key] = pipeline
+        return pipeline
+
+
+def warm_up(settings: Optional[Settings] = None) -> None:
+    """
+    Startup hook: load the Whisper model into the shared registry before the
+    first request arrives.
+    """
+    settings = settings or Settings()
+    _configure_registry(settings)
+    get_model_registry().warm_up(
+        settings.asr_model_size,
+        settings.asr_device,
+        settings.asr_compute_type,
+        *resolve_parallelism(settings.asr_num_workers, settings.asr_cpu_threads),
+    )
@@ -0,0 +1,175 @@
+import threading
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+
+def frame_planes(frame: Any) -> np.ndarray:
+    """
+    av.AudioFrame -> (channels, samples) array, a view where possible.
+    """
+    pcm = frame.to_ndarray()
+    if pcm.ndim == 1:
+        return pcm[None, :]
+    layout = getattr(frame, "layout", None)
+    fmt = getattr(frame, "format", None)
+    if layout is None or fmt is None or fmt.is_planar:
+        return pcm
+    channels = getattr(layout, "nb_channels", None) or len(layout.channels)
+    if channels > 1 and pcm.shape[0] == 1:
+        return pcm.reshape(-1, channels).T
+    return pcm
+
+
+def convert_into(dst: np.ndarray, planes: np.ndarray) -> None:
+    """
+    Downmix (channels, n) planes into dst, converting to its dtype.
+    """
+    if planes.shape[0] == 1:
+        src = planes[0]
+    elif np.issubdtype(planes.dtype, np.integer):
+        # integer mean without float temporaries: sum in int32, then divide into dst
+        src = planes.sum(axis=0, dtype=np.int32)
+        if dst.dtype == np.int16:
+            np.floor_divide(src, planes.shape[0], out=dst, casting="unsafe")
+            return
+        src = src // planes.shape[0]
+    else:
+        src = planes.mean(axis=0, dtype=np.float32)
+
+    if dst.dtype == np.int16:
+        if np.issubdtype(src.dtype, np.floating):
+            # browsers usually deliver float32 in [-1, 1]
+            src = np.clip(src, -1.0, 1.0)
+            np.multiply(src, 32767.0, out=dst, casting="unsafe")
+        else:
+            np.copyto(dst, src, casting="unsafe")
+    else:
+        if np.issubdtype(src.dtype, np.integer):
+            np.multiply(src, 1.0 / 32768.0, out=dst, casting="unsafe")
+        else:
+            np.copyto(dst, src, casting="unsafe")
+
+
+class AudioRingBuffer:
+    """
+    Fixed-capacity mono PCM ring buffer for live capture.
+    Positions are absolute sample indexes; contiguous=True makes every view zero-copy.
+    """
+
+    def __init__(self,
+                 capacity_seconds: float,
+                 sample_rate: int = 48000,
+                 dtype: Any = np.int16,
+                 contiguous: bool = False):
+        self.sample_rate = sample_rate
+        self.capacity = max(1, int(capacity_seconds * sample_rate))
+        self.contiguous = contiguous
+        self._buf = np.zeros(self.capacity * (2 if contiguous else 1), dtype=dtype)
+        self.lock = threading.RLock()
+        self.total = 0      # samples written since start / clear()
+        self.dropped = 0    # samples overwritten because the capacity was exceeded
+
+    # -- state ---------------------------------------------------------------
+    @property
+    def fill(self) -> int:
+        return min(self.total, self.capacity)
+
+    @property
+    def start(self) -> int:
+        """
+        Absolute index of the oldest sample still held.
+        """
+        return self.total - self.fill
+
+    @property
+    def duration(self) -> float:
+        return self.fill / float(self.sample_rate)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.total = 0
+            self.dropped = 0
+
+    # -- writing -------------------------------------------------------------
+    def write_frame(self, frame: Any) -> int:
+        """
+        Append an av.AudioFrame (any channel layout, s16 / float formats).
+        Returns the number of samples written.
+        """
+        return self.write(frame_planes(frame))
+
+    def write(self, pcm: np.ndarray) -> int:
+        """
+        Append PCM: (samples,) or (channels, samples), int or float.
+        """
+        planes = pcm[None, :] if pcm.ndim == 1 else pcm
+        n = planes.shape[1]
+        if n == 0:
+            return 0
+        with self.lock:
+            cap = self.capacity
+            fill = self.fill
+            if n > cap:
+                # only the newest `capacity` samples can be kept
+                skip = n - cap
+                self.dropped += skip
+                self.total += skip
+                planes = planes[:, skip:]
+                n = cap
+            self.dropped += max(0, fill + n - cap)
+
+            pos = self.total % cap
+            first = min(n, cap - pos)
+            convert_into(self._buf[pos:pos + first], planes[:, :first])
+            if first < n:
+                convert_into(self._buf[:n - first], planes[:, first:])
+            if self.contiguous:
+                self._buf[cap + pos:cap + pos + first] = self._buf[pos:pos + first]
+                if first < n:
+                    self._buf[cap:cap + n - first] = self._buf[:n - first]
+            self.total += n
+        return n
+
+    # -- reading -------------------------------------------------------------
+    def _span(self, start: Optional[int], end: Optional[int]) -> Tuple[int, int]:
+        end = self.total if end is None else min(end, self.total)
+        start = self.start if start is None else max(start, self.start)
+        return start, max(start, end)
+
+    def segments(self, start: Optional[int] = None, end: Optional[int] = None) -> Tuple[np.ndarray, ...]:
+        """
+        Samples [start, end) (absolute, clamped to what is held) as one or
+        two zero-copy views, oldest first.
+        """
+        with self.lock:
+            start, end = self._span(start, end)
+            n = end - start
+            if n == 0:
+                return ()
+            cap = self.capacity
+            pos = start % cap
+            if self.contiguous or pos + n <= cap:
+                return (self._buf[pos:pos + n],)
+            return self._buf[pos:], self._buf[:n - (cap - pos)]
+
+    def view(self, start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+        """
+        Samples [start, end) as one array: zero-copy unless the span wraps
+        around a non-contiguous buffer.
+        """
+        parts = self.segments(start, end)
+        if not parts:
+            return self._buf[:0]
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts)
+
+    def latest(self, seconds: Optional[float] = None) -> np.ndarray:
+        """
+        The most recent `seconds` of audio (everything held if None).
+        """
+        with self.lock:
+            if seconds is None:
+                return self.view()
+            return self.view(self.total - int(seconds * self.sample_rate))
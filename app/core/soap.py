@@ -0,0 +1,83 @@
+import re
+from dataclasses import dataclass
+from typing import List
+
+SECTION_ORDER = ("S", "O", "A", "P")
+
+# "S:", "**S: Subjective**", "S (Subjective):", "S - Subjective:", "Subjective:", "## Plan"
+_HEADER_RE = re.compile(
+    r"^[ \t>#*_]*"
+    r"(?:(?P<word>(?i:subjective|objective|assessment|plan))"
+    r"|(?P<letter>[SOAP])(?:[ \t]*[(\-–][ \t]*[A-Za-z]+\)?)?)"
+    r"[ \t*_]*(?::(?:[ \t]*(?i:subjective|objective|assessment|plan)\b)?[ \t*_:]*|$)",
+    re.M,
+)
+
+
+@dataclass
+class SOAPSection:
+    letter: str       # S | O | A | P
+    start: int        # offset of the header line
+    body_start: int   # offset right after the header
+    end: int          # offset where the next section (or the note) ends
+
+    def body(self, note: str) -> str:
+        return note[self.body_start:self.end].strip(" \t\n*_")
+
+
+def split_soap_sections(note: str) -> List[SOAPSection]:
+    """
+    Locate S/O/A/P section headers and return the sections in note order.
+    """
+    headers = []
+    for m in _HEADER_RE.finditer(note):
+        letter = (m.group("word") or m.group("letter"))[0].upper()
+        headers.append((letter, m.start(), m.end()))
+
+    sections = []
+    for i, (letter, start, body_start) in enumerate(headers):
+        end = headers[i + 1][1] if i + 1 < len(headers) else len(note)
+        sections.append(SOAPSection(letter, start, body_start, end))
+    return sections
+
+
+class SOAPSectionStream:
+    """
+    Incremental section detector for a streamed SOAP note.
+    feed() returns the sections completed so far; close() returns the rest.
+    Only lines completed since the previous call are scanned for headers.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._headers: List[tuple] = []   # (letter, start, body_start)
+        self._scanned = 0                 # offset of the first line not yet scanned
+        self._emitted = 0
+
+    def feed(self, delta: str) -> List[SOAPSection]:
+        self.text += delta
+        cut = self.text.rfind("\n", self._scanned)
+        if cut < 0:
+            return []
+        self._scan(cut + 1)
+        # the last detected section may still be growing
+        return self._take(len(self._headers) - 1)
+
+    def close(self) -> List[SOAPSection]:
+        self._scan(len(self.text))
+        return self._take(len(self._headers))
+
+    def _scan(self, end: int) -> None:
+        for m in _HEADER_RE.finditer(self.text, self._scanned, end):
+            letter = (m.group("word") or m.group("letter"))[0].upper()
+            self._headers.append((letter, m.start(), m.end()))
+        self._scanned = end
+
+    def _take(self, upto: int) -> List[SOAPSection]:
+        new = []
+        for i in range(self._emitted, upto):
+            letter, start, body_start = self._headers[i]
+            end = self._headers[i + 1][1] if i + 1 < len(self._headers) else len(self.text)
+            new.append(SOAPSection(letter, start, body_start, end))
+        self._emitted = max(self._emitted, upto)
+        return new
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+
+from app.core.aio import get_loop
+from app.core.metrics import get_metrics
+from app.core.soap import split_soap_sections
+
+
+class IncrementalSOAPDrafter:
+    """
+    Keeps a draft SOAP note up to date while a live transcript grows.
+    feed() adds committed text; poll() starts a background update once enough is new.
+    """
+
+    def __init__(self, llm_agent: Any, min_new_words: int = 40, debounce_s: float = 4.0):
+        self.llm_agent = llm_agent
+        self.min_new_words = min_new_words
+        self.debounce_s = debounce_s
+        self.draft = ""
+        self.updates = 0
+        self.error: Optional[str] = None
+        self.stats: Dict[str, Any] = {}      # LLM stats of the last update
+        self._lock = threading.Lock()
+        self._transcript = ""                # committed text so far
+        self._drafted = 0                    # characters of _transcript the draft covers
+        self._new_words = 0
+        self._last_feed = time.monotonic()
+        self._not_before = 0.0               # retry backoff after a failed update
+        self._future: Optional[Future] = None
+
+    @property
+    def transcript(self) -> str:
+        return self._transcript
+
+    @property
+    def pending(self) -> str:
+        """
+        Committed text the draft does not cover yet.
+        """
+        return self._transcript[self._drafted:].strip()
+
+    @property
+    def busy(self) -> bool:
+        return self._future is not None and not self._future.done()
+
+    @property
+    def sections(self) -> Dict[str, str]:
+        draft = self.draft
+        return {sec.letter: sec.body(draft) for sec in split_soap_sections(draft)}
+
+    def feed(self, text: str) -> None:
+        text = text.strip()
+        if not text:
+            return
+        with self._lock:
+            self._transcript = f"{self._transcript} {text}" if self._transcript else text
+            self._new_words += len(text.split())
+            self._last_feed = time.monotonic()
+
+    def poll(self) -> bool:
+        """
+        Start an update if one is due. Returns True if one was started.
+        """
+        with self._lock:
+            if self.busy or not self.pending:
+                return False
+            now = time.monotonic()
+            if now < self._not_before:
+                return False
+            if self._new_words < self.min_new_words and now - self._last_feed < self.debounce_s:
+                return False
+            self._start()
+            return True
+
+    def _start(self) -> None:
+        # caller holds the lock
+        upto = len(self._transcript)
+        words = self._new_words
+        coro = self._update(self.draft, self.pending, upto, words)
+        self._future = asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+    async def _update(self, draft: str, text: str, upto: int, words: int) -> None:
+        stats: Dict[str, Any] = {}
+        metrics = get_metrics()
+        try:
+            note = await self.llm_agent.aupdate_soap(draft, text, stats)
+        except Exception as e:
+            with self._lock:
+                self.error = f"{type(e).__name__}: {e}"
+                self._not_before = time.monotonic() + self.debounce_s
+            metrics.inc("ics_draft_updates_total", outcome="error")
+            return
+        with self._lock:
+            self.draft = note
+            self._drafted = upto
+            self._new_words -= words
+            self.updates += 1
+            self.error = None
+            self.stats = stats
+        metrics.inc("ics_draft_updates_total", outcome="ok")
+
+    def finish(self, timeout: Optional[float] = None) -> str:
+        """
+        Draft whatever is left and return the note (timeout per update).
+        """
+        future = self._future
+        if future is not None:
+            future.result(timeout)
+        with self._lock:
+            if self.pending:
+                self._not_before = 0.0
+                self._start()
+            future = self._future
+        if future is not None:
+            future.result(timeout)
+        return self.draft
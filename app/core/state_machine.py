@@ -1,7 +1,10 @@
+import time
 from dataclasses import dataclass
 from typing import List, Dict, Any
 from datetime import datetime
 
+from app.core.metrics import get_metrics
+
 
 @dataclass
 class LogEvent:
@@ -10,25 +13,38 @@ class LogEvent:
     to_state: str
     action: str
     details: Dict[str, Any]
+    t_ms: float = 0.0          # monotonic ms since the machine started
+    duration_ms: float = 0.0   # time spent reaching to_state (since the previous transition)
 
 
 class StateMachine:
     """
-    Minimal ICS state tracker with decision logs.
+    Minimal ICS state tracker with decision logs and per-stage timings.
     """
     def __init__(self):
         self.state = "S0"
         self.log: List[LogEvent] = []
+        self._t0 = time.perf_counter()
+        self._last = self._t0
 
     def transition(self, to_state: str, action: str, details: Dict[str, Any] = None):
         if details is None:
             details = {}
+        now = time.perf_counter()
+        duration = now - self._last
         evt = LogEvent(
             time=datetime.now().isoformat(timespec="seconds"),
             from_state=self.state,
             to_state=to_state,
             action=action,
-            details=details
+            details=details,
+            t_ms=round((now - self._t0) * 1000, 3),
+            duration_ms=round(duration * 1000, 3),
         )
         self.log.append(evt)
         self.state = to_state
+        self._last = now
+        get_metrics().observe("ics_stage_seconds", duration, stage=to_state, action=action)
+
+    def total_ms(self) -> float:
+        return round((self._last - self._t0) * 1000, 3)
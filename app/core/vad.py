@@ -0,0 +1,216 @@
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.core.metrics import get_metrics
+
+
+@dataclass
+class SpeechSegment:
+    start: int           # sample index, inclusive
+    end: int             # sample index, exclusive
+    sample_rate: int
+
+    @property
+    def start_s(self) -> float:
+        return self.start / float(self.sample_rate)
+
+    @property
+    def end_s(self) -> float:
+        return self.end / float(self.sample_rate)
+
+    @property
+    def duration(self) -> float:
+        return (self.end - self.start) / float(self.sample_rate)
+
+
+def frame_db(pcm: np.ndarray, sample_rate: int, frame_ms: float = 30.0) -> np.ndarray:
+    """
+    RMS level per frame in dBFS, for mono PCM (int or float). The trailing
+    partial frame is ignored.
+    """
+    hop = max(1, int(sample_rate * frame_ms / 1000.0))
+    n = pcm.shape[0] // hop
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    x = pcm[:n * hop].reshape(n, hop)
+    if np.issubdtype(x.dtype, np.integer):
+        scale = float(2 ** (8 * x.dtype.itemsize - 1))
+        power = np.einsum("ij,ij->i", x, x, dtype=np.float64) / (hop * scale * scale)
+    else:
+        power = np.einsum("ij,ij->i", x, x, dtype=np.float64) / hop
+    return (10.0 * np.log10(power + 1e-12)).astype(np.float32)
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    [start, end) index pairs of the True runs in a bool array.
+    """
+    if mask.size == 0:
+        return []
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+    return list(zip(edges[0::2].tolist(), edges[1::2].tolist()))
+
+
+class EnergyVAD:
+    """
+    Lightweight energy-based voice activity detection with an adaptive noise floor.
+    """
+
+    def __init__(self,
+                 frame_ms: float = 30.0,
+                 abs_threshold_db: float = -50.0,
+                 margin_db: float = 10.0,
+                 min_speech_ms: float = 200.0,
+                 min_silence_ms: float = 400.0,
+                 pad_ms: float = 200.0,
+                 min_chunk_s: float = 1.0,
+                 max_chunk_s: float = 20.0,
+                 max_merge_gap_s: float = 1.0):
+        self.frame_ms = frame_ms
+        self.abs_threshold_db = abs_threshold_db
+        self.margin_db = margin_db
+        self.min_speech_ms = min_speech_ms
+        self.min_silence_ms = min_silence_ms
+        self.pad_ms = pad_ms
+        self.min_chunk_s = min_chunk_s
+        self.max_chunk_s = max_chunk_s
+        self.max_merge_gap_s = max_merge_gap_s
+        self.noise_db: Optional[float] = None
+
+    def _frames(self, ms: float) -> int:
+        return max(1, int(round(ms / self.frame_ms)))
+
+    def _hop(self, sample_rate: int) -> int:
+        return max(1, int(sample_rate * self.frame_ms / 1000.0))
+
+    def _update_noise(self, db: np.ndarray) -> float:
+        floor = float(np.percentile(db, 10))
+        if self.noise_db is None or floor < self.noise_db:
+            self.noise_db = floor
+        else:
+            self.noise_db += 0.1 * (floor - self.noise_db)
+        return max(self.abs_threshold_db, self.noise_db + self.margin_db)
+
+    def speech_mask(self, pcm: np.ndarray, sample_rate: int) -> np.ndarray:
+        """
+        Per-frame speech flags after bridging short pauses and dropping
+        short bursts.
+        """
+        db = frame_db(pcm, sample_rate, self.frame_ms)
+        if db.size == 0:
+            return np.zeros(0, dtype=bool)
+        mask = db > self._update_noise(db)
+
+        min_silence = self._frames(self.min_silence_ms)
+        runs = _runs(~mask)
+        for s, e in runs:
+            # interior pauses only; leading / trailing silence stays silence
+            if s > 0 and e < mask.size and e - s < min_silence:
+                mask[s:e] = True
+        min_speech = self._frames(self.min_speech_ms)
+        for s, e in _runs(mask):
+            if e - s < min_speech:
+                mask[s:e] = False
+        return mask
+
+    def regions(self, pcm: np.ndarray, sample_rate: int) -> List[SpeechSegment]:
+        """
+        Padded speech regions, in samples.
+        """
+        hop = self._hop(sample_rate)
+        pad = int(sample_rate * self.pad_ms / 1000.0)
+        n = pcm.shape[0]
+        out: List[SpeechSegment] = []
+        for s, e in _runs(self.speech_mask(pcm, sample_rate)):
+            start, end = max(0, s * hop - pad), min(n, e * hop + pad)
+            if out and start <= out[-1].end:
+                out[-1].end = end   # padding made two regions touch
+            else:
+                out.append(SpeechSegment(start, end, sample_rate))
+        return out
+
+    def segment(self, pcm: np.ndarray, sample_rate: int) -> List[SpeechSegment]:
+        """
+        Speech-only chunks of min_chunk_s..max_chunk_s for batch decoding.
+        """
+        max_len = int(self.max_chunk_s * sample_rate)
+        min_len = int(self.min_chunk_s * sample_rate)
+        max_gap = int(self.max_merge_gap_s * sample_rate)
+
+        chunks: List[SpeechSegment] = []
+        for region in self.regions(pcm, sample_rate):
+            prev = chunks[-1] if chunks else None
+            if (prev is not None and prev.end - prev.start < min_len
+                    and region.start - prev.end <= max_gap and region.end - prev.start <= max_len):
+                prev.end = region.end
+            else:
+                chunks.append(region)
+
+        out: List[SpeechSegment] = []
+        for chunk in chunks:
+            start = chunk.start
+            while chunk.end - start > max_len:
+                cut = self._quietest(pcm, sample_rate, start + min_len, start + max_len)
+                out.append(SpeechSegment(start, cut, sample_rate))
+                start = cut
+            out.append(SpeechSegment(start, chunk.end, sample_rate))
+
+        speech = sum(c.end - c.start for c in out) / float(sample_rate)
+        total = pcm.shape[0] / float(sample_rate)
+        metrics = get_metrics()
+        metrics.inc("ics_vad_audio_seconds_total", speech, kind="speech")
+        metrics.inc("ics_vad_audio_seconds_total", max(0.0, total - speech), kind="silence")
+        return out
+
+    def _quietest(self, pcm: np.ndarray, sample_rate: int, lo: int, hi: int) -> int:
+        """
+        Sample index of the start of the quietest frame in [lo, hi).
+        """
+        hop = self._hop(sample_rate)
+        db = frame_db(pcm[lo:hi], sample_rate, self.frame_ms)
+        if db.size == 0:
+            return hi
+        return lo + int(np.argmin(db)) * hop
+
+    # -- incremental (live) use ----------------------------------------------
+    def has_speech(self, pcm: np.ndarray, sample_rate: int) -> bool:
+        return bool(self.speech_mask(pcm, sample_rate).any())
+
+    def next_chunk(self,
+                   pcm: np.ndarray,
+                   sample_rate: int,
+                   force: bool = False) -> Tuple[int, Optional[SpeechSegment]]:
+        """
+        Split pending live audio. Returns (consumed, speech):
+        (0, None) keep buffering, (n, None) drop n samples of silence,
+        (n, seg) consume n samples and decode pcm[seg.start:seg.end].
+        """
+        mask = self.speech_mask(pcm, sample_rate)
+        hop = self._hop(sample_rate)
+        pad = int(sample_rate * self.pad_ms / 1000.0)
+        if not mask.any():
+            # keep a pad's worth, a word may be starting at the edge
+            return max(0, mask.size * hop - pad), None
+
+        cut = None
+        min_frames = int(self.min_chunk_s * 1000.0 / self.frame_ms)
+        min_silence = self._frames(self.min_silence_ms)
+        first_speech = int(np.argmax(mask))
+        for s, e in reversed(_runs(~mask)):
+            mid = (s + e) // 2
+            if s > first_speech and e - s >= min_silence and mid >= min_frames:
+                cut = mid * hop
+                break
+        if cut is None:
+            if not force:
+                return 0, None
+            cut = self._quietest(pcm, sample_rate, min(pcm.shape[0], min_frames * hop), pcm.shape[0])
+
+        speech = np.flatnonzero(mask[:max(1, cut // hop)])
+        if speech.size == 0:
+            return cut, None
+        start = max(0, int(speech[0]) * hop - pad)
+        end = min(cut, (int(speech[-1]) + 1) * hop + pad)
+        return cut, SpeechSegment(start, end, sample_rate)
@@ -0,0 +1,138 @@
+import os
+import struct
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+from app.core.audio import pcm_to_float32
+from app.core.vad import EnergyVAD
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+@dataclass
+class AudioChunk:
+    pcm: np.ndarray       # (samples,) or (samples, channels), native WAV dtype
+    sample_rate: int
+    start_s: float
+    end_s: float
+
+
+def _frames_to_array(frames: bytes, sampwidth: int, nch: int) -> np.ndarray:
+    """
+    Raw WAV frames -> NumPy PCM (no copy for 8/16/32-bit; 24-bit is widened to int32).
+    """
+    if sampwidth == 1:
+        pcm = np.frombuffer(frames, dtype=np.uint8)
+    elif sampwidth == 2:
+        pcm = np.frombuffer(frames, dtype="<i2")
+    elif sampwidth == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        pcm = (raw[:, 0].astype(np.int32) << 8 | raw[:, 1].astype(np.int32) << 16
+               | raw[:, 2].astype(np.int32) << 24)
+    elif sampwidth == 4:
+        pcm = np.frombuffer(frames, dtype="<i4")
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {sampwidth}")
+
+    return pcm.reshape(-1, nch) if nch > 1 else pcm
+
+
+class WavView:
+    """
+    A WAV file's samples, memory-mapped read-only; chunks are zero-copy slices.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        fmt, data_offset, data_size = self._parse_header(path)
+        audio_format, channels, sample_rate, _, block_align, bits = struct.unpack("<HHIIHH", fmt[:16])
+        if audio_format == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+            audio_format = struct.unpack("<H", fmt[24:26])[0]   # first bytes of the sub-format GUID
+
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.sampwidth = block_align // channels
+        file_size = os.path.getsize(path)
+        if data_size in (0, 0xFFFFFFFF) or data_offset + data_size > file_size:
+            data_size = file_size - data_offset
+        self.frames = data_size // block_align
+
+        if audio_format == WAVE_FORMAT_IEEE_FLOAT and self.sampwidth == 4:
+            dtype = np.dtype("<f4")
+        elif audio_format == WAVE_FORMAT_PCM and self.sampwidth in (1, 2, 4):
+            dtype = np.dtype({1: "u1", 2: "<i2", 4: "<i4"}[self.sampwidth])
+        elif audio_format == WAVE_FORMAT_PCM and self.sampwidth == 3:
+            dtype = None
+        else:
+            raise ValueError(f"Unsupported WAV encoding: format 0x{audio_format:04x}, {bits} bits")
+
+        if self.frames == 0:
+            pcm = np.zeros((0, channels) if channels > 1 else 0, dtype=dtype or np.int32)
+        elif dtype is None:
+            with open(path, "rb") as f:
+                f.seek(data_offset)
+                pcm = _frames_to_array(f.read(self.frames * block_align), 3, channels)
+        else:
+            shape = (self.frames, channels) if channels > 1 else (self.frames,)
+            pcm = np.memmap(path, dtype=dtype, mode="r", offset=data_offset, shape=shape)
+        self.pcm: np.ndarray = pcm
+
+    @staticmethod
+    def _parse_header(path: str):
+        with open(path, "rb") as f:
+            riff = f.read(12)
+            if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+                raise ValueError(f"{path} is not a RIFF/WAVE file")
+            fmt = None
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    raise ValueError(f"{path}: no data chunk")
+                chunk_id, size = header[:4], struct.unpack("<I", header[4:])[0]
+                if chunk_id == b"fmt ":
+                    fmt = f.read(size)
+                elif chunk_id == b"data":
+                    if fmt is None:
+                        raise ValueError(f"{path}: data chunk before fmt chunk")
+                    return fmt, f.tell(), size
+                else:
+                    f.seek(size, os.SEEK_CUR)
+                if size % 2:
+                    f.seek(1, os.SEEK_CUR)   # RIFF chunks are word-aligned
+
+    @property
+    def duration(self) -> float:
+        return self.frames / float(self.sample_rate)
+
+    def chunk(self, start: int, end: int) -> AudioChunk:
+        """
+        Frames [start, end) as a zero-copy chunk.
+        """
+        start, end = max(0, start), min(self.frames, end)
+        return AudioChunk(pcm=self.pcm[start:end], sample_rate=self.sample_rate,
+                          start_s=start / float(self.sample_rate), end_s=end / float(self.sample_rate))
+
+    def iter_chunks(self, chunk_seconds: float = 2.5) -> Iterator[AudioChunk]:
+        """
+        Fixed-length chunks (the last one may be shorter).
+        """
+        step = max(1, int(self.sample_rate * chunk_seconds))
+        for start in range(0, self.frames, step):
+            yield self.chunk(start, start + step)
+
+    def speech_chunks(self, vad: Optional[EnergyVAD] = None) -> List[AudioChunk]:
+        """
+        The speech regions found by the VAD, cut in pauses with silence
+        dropped (see EnergyVAD.segment).
+        """
+        vad = vad or EnergyVAD()
+        # analysed straight from the map: the first channel of a multi-channel
+        # file is a strided view (a downmix would copy the whole recording)
+        mono = self.pcm if self.pcm.ndim == 1 else self.pcm[:, 0]
+        if mono.dtype == np.uint8:
+            mono = pcm_to_float32(mono)
+        return [self.chunk(seg.start, seg.end) for seg in vad.segment(mono, self.sample_rate)]
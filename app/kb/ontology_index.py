@@ -0,0 +1,370 @@
+"""
+Compiled, memory-mappable ontology index.
+
+    python -m app.kb.ontology_index app/kb/ontology_stub.json [-o app/kb/ontology_stub.idx]
+
+File: magic "ICSONT", u16 version, u64 header length, JSON header, 64-byte aligned arrays.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import struct
+import tempfile
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Word tokens; matching works on whole tokens, so "cold" never hits "scolded"
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?", re.I)
+
+MAGIC = b"ICSONT"
+FORMAT_VERSION = 1
+_PREFIX = struct.Struct("<6sHQ")
+_ALIGN = 64
+
+
+def tokenize(text: str) -> List[Tuple[str, int, int]]:
+    """
+    Lowercased word tokens with their character spans in text.
+    """
+    return [(m.group().lower(), m.start(), m.end()) for m in TOKEN_RE.finditer(text)]
+
+
+def token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _compile(terms: Iterable[Tuple[str, str, str]]) -> Tuple[Dict[str, np.ndarray], List[str]]:
+    """
+    Build the automaton with Python dicts, then flatten it into arrays.
+    """
+    goto: List[Dict[int, int]] = [{}]
+    out: List[List[int]] = [[]]
+    vocab: Dict[str, int] = {}
+    categories: List[str] = []
+    strings: List[str] = []
+    string_ids: Dict[str, int] = {}
+    payloads: List[Tuple[int, int, int, int]] = []   # category, canonical, synonym, n_tokens
+
+    def intern(s: str) -> int:
+        sid = string_ids.get(s)
+        if sid is None:
+            sid = string_ids[s] = len(strings)
+            strings.append(s)
+        return sid
+
+    for category, canonical, synonym in terms:
+        tokens = [t for t, _, _ in tokenize(synonym)]
+        if not tokens:
+            continue
+        if category not in categories:
+            categories.append(category)
+        state = 0
+        for tok in tokens:
+            tid = vocab.setdefault(tok, len(vocab))
+            nxt = goto[state].get(tid)
+            if nxt is None:
+                nxt = goto[state][tid] = len(goto)
+                goto.append({})
+                out.append([])
+            state = nxt
+        out[state].append(len(payloads))
+        payloads.append((categories.index(category), intern(canonical), intern(synonym), len(tokens)))
+
+    n_states = len(goto)
+    fail = [0] * n_states
+    out_link = [0] * n_states
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for tid, nxt in goto[state].items():
+            queue.append(nxt)
+            f = fail[state]
+            while f and tid not in goto[f]:
+                f = fail[f]
+            cand = goto[f].get(tid, 0)
+            fail[nxt] = cand if cand != nxt else 0
+            fl = fail[nxt]
+            out_link[nxt] = fl if out[fl] else out_link[fl]
+
+    # token ids are re-assigned in hash order so the vocabulary is a sorted hash array
+    hashes = np.array([token_hash(t) for t in vocab], dtype="<u8")
+    order = np.argsort(hashes, kind="stable")
+    remap = np.empty(len(vocab), dtype=np.int64)
+    remap[order] = np.arange(len(vocab))
+    n_vocab = len(vocab)
+
+    root_next = np.zeros(n_vocab, dtype="<i4")
+    edge_keys, edge_next = [], []
+    for state, edges in enumerate(goto):
+        for tid, nxt in edges.items():
+            new_tid = int(remap[tid])
+            if state == 0:
+                root_next[new_tid] = nxt
+            else:
+                edge_keys.append(state * n_vocab + new_tid)
+                edge_next.append(nxt)
+    edge_order = np.argsort(np.array(edge_keys, dtype="<i8"), kind="stable")
+
+    out_start = np.zeros(n_states + 1, dtype="<i4")
+    out_start[1:] = np.cumsum([len(o) for o in out])
+    encoded = [s.encode("utf-8") for s in strings]
+    str_offsets = np.zeros(len(encoded) + 1, dtype="<i8")
+    str_offsets[1:] = np.cumsum([len(b) for b in encoded])
+
+    arrays = {
+        "vocab_hash": hashes[order],
+        "root_next": root_next,
+        "edge_key": np.array(edge_keys, dtype="<i8")[edge_order],
+        "edge_next": np.array(edge_next, dtype="<i4")[edge_order],
+        "fail": np.array(fail, dtype="<i4"),
+        "out_link": np.array(out_link, dtype="<i4"),
+        "out_start": out_start,
+        "out_payload": np.array([p for o in out for p in o], dtype="<i4"),
+        "payload": np.array(payloads, dtype="<i4").reshape(-1, 4),
+        "str_offsets": str_offsets,
+        "str_blob": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+    }
+    return arrays, categories
+
+
+class OntologyIndex:
+    """
+    Flat-array Aho-Corasick automaton over ontology terms.
+    Built in memory with build(), persisted with save(), and memory-mapped
+    read-only with load().
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], header: Dict[str, Any]):
+        self.arrays = arrays
+        self.header = header
+        self.categories: List[str] = header["categories"]
+        self.n_vocab = int(arrays["vocab_hash"].shape[0])
+
+        self.vocab_hash = arrays["vocab_hash"]
+        # memoryviews give cheap Python-int element access on the hot path
+        self._root_next = memoryview(np.ascontiguousarray(arrays["root_next"]))
+        self._edge_key = memoryview(np.ascontiguousarray(arrays["edge_key"]))
+        self._edge_next = memoryview(np.ascontiguousarray(arrays["edge_next"]))
+        self._fail = memoryview(np.ascontiguousarray(arrays["fail"]))
+        self._out_link = memoryview(np.ascontiguousarray(arrays["out_link"]))
+        self._out_start = memoryview(np.ascontiguousarray(arrays["out_start"]))
+        self._out_payload = memoryview(np.ascontiguousarray(arrays["out_payload"]))
+        self._payload = memoryview(np.ascontiguousarray(arrays["payload"]).reshape(-1))
+        self._str_offsets = memoryview(np.ascontiguousarray(arrays["str_offsets"]))
+        self._str_blob = memoryview(np.ascontiguousarray(arrays["str_blob"]))
+        self._strings: Dict[int, str] = {}
+
+    # ---- construction / persistence ----
+
+    @classmethod
+    def build(cls, ontology: Dict[str, Dict[str, List[str]]], source: Optional[Dict[str, Any]] = None) -> "OntologyIndex":
+        terms = (
+            (category, canonical, s)
+            for category, concepts in ontology.items()
+            for canonical, synonyms in concepts.items()
+            for s in synonyms
+        )
+        arrays, categories = _compile(terms)
+        header = {
+            "format_version": FORMAT_VERSION,
+            "categories": categories,
+            "terms": int(arrays["payload"].shape[0]),
+            "built_at": time.time(),
+            "source": source or {},
+        }
+        return cls(arrays, header)
+
+    @classmethod
+    def build_from_file(cls, source_path: str) -> "OntologyIndex":
+        with open(source_path, "rb") as f:
+            raw = f.read()
+        st = os.stat(source_path)
+        source = {
+            "path": os.path.abspath(source_path),
+            "sha256": hashlib.sha256(raw).hexdigest(),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+        }
+        return cls.build(json.loads(raw.decode("utf-8")), source)
+
+    def save(self, path: str) -> None:
+        """
+        Atomic write (temp file + rename): readers never see a partial index,
+        and processes that already mapped the old file keep using it.
+        """
+        layout = {}
+        offset = 0
+        for name, arr in self.arrays.items():
+            offset = -(-offset // _ALIGN) * _ALIGN
+            layout[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+            offset += arr.nbytes
+
+        header = dict(self.header, arrays=layout)
+        header_bytes = json.dumps(header).encode("utf-8")
+        data_start = -(-(_PREFIX.size + len(header_bytes)) // _ALIGN) * _ALIGN
+
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".idx.tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+                f.write(header_bytes)
+                for name, arr in self.arrays.items():
+                    f.seek(data_start + layout[name]["offset"])
+                    f.write(np.ascontiguousarray(arr).tobytes())
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    @staticmethod
+    def read_header(path: str) -> Optional[Dict[str, Any]]:
+        """
+        Header only (cheap); None if the file is missing or not a compatible index.
+        """
+        try:
+            with open(path, "rb") as f:
+                magic, version, header_len = _PREFIX.unpack(f.read(_PREFIX.size))
+                if magic != MAGIC or version != FORMAT_VERSION:
+                    return None
+                header = json.loads(f.read(header_len).decode("utf-8"))
+        except (OSError, struct.error, ValueError):
+            return None
+        header["data_start"] = -(-(_PREFIX.size + header_len) // _ALIGN) * _ALIGN
+        return header
+
+    @classmethod
+    def load(cls, path: str) -> "OntologyIndex":
+        header = cls.read_header(path)
+        if header is None:
+            raise ValueError(f"Not a compatible ontology index: {path}")
+
+        mm = np.memmap(path, dtype=np.uint8, mode="r")
+        base = header["data_start"]
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"])) if spec["shape"] else 1
+            start = base + spec["offset"]
+            if start + count * dtype.itemsize > mm.shape[0]:
+                raise ValueError(f"Truncated ontology index: {path}")
+            arrays[name] = mm[start:start + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+        return cls(arrays, header)
+
+    # ---- lookup ----
+
+    @property
+    def source_sha256(self) -> str:
+        return self.header.get("source", {}).get("sha256", "")
+
+    def token_ids(self, tokens: List[str]) -> List[int]:
+        """
+        Vocabulary ids for a list of tokens (-1 = not in any term), vectorized.
+        """
+        if not tokens or self.n_vocab == 0:
+            return [-1] * len(tokens)
+        hashes = np.fromiter((token_hash(t) for t in tokens), dtype="<u8", count=len(tokens))
+        pos = np.searchsorted(self.vocab_hash, hashes)
+        pos_c = np.minimum(pos, self.n_vocab - 1)
+        found = self.vocab_hash[pos_c] == hashes
+        return np.where(found, pos_c, -1).tolist()
+
+    def step(self, state: int, tid: int) -> int:
+        """
+        Aho-Corasick transition (follows failure links); 0 = root.
+        """
+        while state:
+            key = state * self.n_vocab + tid
+            j = bisect_left(self._edge_key, key)
+            if j < len(self._edge_key) and self._edge_key[j] == key:
+                return self._edge_next[j]
+            state = self._fail[state]
+        return self._root_next[tid]
+
+    def outputs(self, state: int) -> Iterable[Tuple[str, str, str, int]]:
+        """
+        (category, canonical, synonym, n_tokens) of every term ending in this state.
+        """
+        s = state
+        while s:
+            for k in range(self._out_start[s], self._out_start[s + 1]):
+                p = 4 * self._out_payload[k]
+                cat, canon, syn, n = self._payload[p:p + 4].tolist()
+                yield self.categories[cat], self.string(canon), self.string(syn), n
+            s = self._out_link[s]
+
+    def has_outputs(self, state: int) -> bool:
+        return bool(state) and (
+            self._out_start[state] != self._out_start[state + 1] or self._out_link[state] != 0
+        )
+
+    def string(self, sid: int) -> str:
+        s = self._strings.get(sid)
+        if s is None:
+            s = bytes(self._str_blob[self._str_offsets[sid]:self._str_offsets[sid + 1]]).decode("utf-8")
+            self._strings[sid] = s
+        return s
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "terms": self.header["terms"],
+            "states": int(self.arrays["fail"].shape[0]),
+            "vocab": self.n_vocab,
+            "bytes": int(sum(a.nbytes for a in self.arrays.values())),
+        }
+
+
+def default_index_path(source_path: str) -> str:
+    return os.path.splitext(source_path)[0] + ".idx"
+
+
+def load_or_build(source_path: str, index_path: Optional[str] = None) -> OntologyIndex:
+    """
+    Memory-map the compiled index if it matches the source file, otherwise
+    (re)build it first. A stat match (size + mtime) skips hashing the source.
+    """
+    index_path = index_path or default_index_path(source_path)
+    header = OntologyIndex.read_header(index_path)
+    if header is not None:
+        src = header.get("source", {})
+        st = os.stat(source_path)
+        if ((src.get("size"), src.get("mtime_ns")) == (st.st_size, st.st_mtime_ns)
+                or src.get("sha256") == _sha256_file(source_path)):
+            try:
+                return OntologyIndex.load(index_path)
+            except ValueError:
+                pass   # damaged: rebuilt below
+
+    OntologyIndex.build_from_file(source_path).save(index_path)
+    return OntologyIndex.load(index_path)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("source", help="ontology JSON ({category: {canonical: [synonyms]}})")
+    ap.add_argument("-o", "--output", help="index path (default: <source>.idx)")
+    args = ap.parse_args()
+
+    out = args.output or default_index_path(args.source)
+    t0 = time.perf_counter()
+    index = OntologyIndex.build_from_file(args.source)
+    index.save(out)
+    print(json.dumps({"index": out, "build_s": round(time.perf_counter() - t0, 3), **index.stats()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+SCHEMA_PATH = Path(__file__).with_name("schema.sql")
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite connection with the ICS schema applied.
+    WAL lets readers (UI sessions) and a writer proceed concurrently.
+    """
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
+    return conn
+
+
+def sha256_file(path: str, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def content_key(*parts: Any) -> str:
+    """
+    Stable sha256 over JSON-serializable parts (content hashes, fingerprints, text).
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def encode(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+def decode(blob: Optional[bytes]) -> Any:
+    return json.loads(zlib.decompress(blob).decode("utf-8")) if blob is not None else None
+
+
+class _ThreadLocalConnection:
+    """
+    One SQLite connection per thread (connections must not cross threads).
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.db_path)
+            self._local.conn = conn
+        return conn
+
+
+@dataclass
+class TierPolicy:
+    max_bytes: int = 64 * 1024 * 1024
+    ttl: float = 0.0    # seconds, 0 = no expiry
+
+
+class ResultCache(_ThreadLocalConnection):
+    """
+    Content-addressed, tiered result cache on SQLite.
+    Each tier has its own size bound (LRU eviction) and TTL.
+    A hit refreshes accessed_at at most once per touch_interval seconds,
+    so repeated reads stay read-only and do not queue on the write lock.
+    """
+
+    def __init__(self, db_path: str, tiers: Dict[str, TierPolicy], touch_interval: float = 60.0):
+        super().__init__(db_path)
+        self.tiers = tiers
+        self.touch_interval = touch_interval
+
+    def get(self, tier: str, key: str) -> Optional[Any]:
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, accessed_at, expires_at FROM cache_entries WHERE tier = ? AND key = ?",
+            (tier, key),
+        ).fetchone()
+        if row is None:
+            return None
+
+        value, accessed_at, expires_at = row
+        if expires_at is not None and expires_at <= now:
+            with conn:
+                conn.execute("DELETE FROM cache_entries WHERE tier = ? AND key = ?", (tier, key))
+            return None
+        if now - accessed_at >= self.touch_interval:
+            with conn:
+                conn.execute(
+                    "UPDATE cache_entries SET accessed_at = ? WHERE tier = ? AND key = ?",
+                    (now, tier, key),
+                )
+        return decode(value)
+
+    def put(self, tier: str, key: str, value: Any) -> None:
+        policy = self.tiers.get(tier, TierPolicy())
+        blob = encode(value)
+        if len(blob) > policy.max_bytes:
+            return
+
+        now = time.time()
+        expires_at = now + policy.ttl if policy.ttl > 0 else None
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries "
+                "(tier, key, value, size_bytes, created_at, accessed_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (tier, key, blob, len(blob), now, now, expires_at),
+            )
+            self._evict(conn, tier, policy, now)
+
+    def _evict(self, conn: sqlite3.Connection, tier: str, policy: TierPolicy, now: float) -> None:
+        conn.execute(
+            "DELETE FROM cache_entries WHERE tier = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+            (tier, now),
+        )
+        total = conn.execute(
+            "SELECT COALESCE(SUM(size_bytes), 0) FROM cache_entries WHERE tier = ?", (tier,)
+        ).fetchone()[0]
+        if total <= policy.max_bytes:
+            return
+
+        # walk entries oldest-access first until the tier fits again
+        victims = []
+        for key, size in conn.execute(
+            "SELECT key, size_bytes FROM cache_entries WHERE tier = ? ORDER BY accessed_at",
+            (tier,),
+        ):
+            if total <= policy.max_bytes:
+                break
+            victims.append((tier, key))
+            total -= size
+        conn.executemany("DELETE FROM cache_entries WHERE tier = ? AND key = ?", victims)
+
+    def clear(self, tier: Optional[str] = None) -> None:
+        conn = self._conn()
+        with conn:
+            if tier is None:
+                conn.execute("DELETE FROM cache_entries")
+            else:
+                conn.execute("DELETE FROM cache_entries WHERE tier = ?", (tier,))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        rows = self._conn().execute(
+            "SELECT tier, COUNT(*), COALESCE(SUM(size_bytes), 0) FROM cache_entries GROUP BY tier"
+        ).fetchall()
+        return {tier: {"entries": n, "bytes": size} for tier, n, size in rows}
+
+
+JOB_STAGES = ("asr", "llm")
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+_JOB_COLUMNS = ("id, status, audio_path, options, payload, result, error, attempts, worker, "
+                "created_at, updated_at")
+
+
+@dataclass
+class Job:
+    id: str
+    status: str
+    audio_path: str
+    options: Dict[str, Any]
+    payload: Optional[Any]
+    result: Optional[Any]
+    error: Optional[str]
+    attempts: int
+    worker: Optional[str]
+    created_at: float
+    updated_at: float
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "Job":
+        (job_id, status, audio_path, options, payload, result, error,
+         attempts, worker, created_at, updated_at) = row
+        return cls(job_id, status, audio_path, json.loads(options), decode(payload), decode(result),
+                   error, attempts, worker, created_at, updated_at)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_DONE, JOB_FAILED)
+
+
+class JobQueue(_ThreadLocalConnection):
+    """
+    Persistent pipeline job queue on SQLite.
+    asr_queued -> asr_running -> llm_queued -> llm_running -> done; claims are leases.
+    """
+
+    def __init__(self, db_path: str, lease: float = 900.0, max_attempts: int = 3):
+        if sqlite3.sqlite_version_info < (3, 35, 0):
+            # claim() takes a job in one statement with UPDATE ... RETURNING
+            raise RuntimeError(f"JobQueue needs SQLite >= 3.35, this Python links {sqlite3.sqlite_version}")
+        super().__init__(db_path)
+        self.lease = lease
+        self.max_attempts = max_attempts
+
+    def submit(self, audio_path: str, options: Optional[Dict[str, Any]] = None) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, audio_path, options, created_at, updated_at) "
+                "VALUES (?, 'asr_queued', ?, ?, ?, ?)",
+                (job_id, audio_path, json.dumps(options or {}), now, now),
+            )
+        return job_id
+
+    def claim(self, stage: str, worker: str) -> Optional[Job]:
+        """
+        Take the oldest job queued for stage (or whose lease ran out), or None.
+        """
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            # a worker that died on its last attempt never calls fail()
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = 'lease expired', worker = NULL, "
+                "lease_expires_at = NULL, updated_at = ? "
+                "WHERE status = ? AND lease_expires_at < ? AND attempts >= ?",
+                (JOB_FAILED, now, f"{stage}_running", now, self.max_attempts),
+            )
+            row = conn.execute(
+                f"UPDATE jobs SET status = ?, worker = ?, lease_expires_at = ?, "
+                f"attempts = attempts + 1, updated_at = ? "
+                f"WHERE id = ("
+                f"  SELECT id FROM jobs "
+                f"  WHERE status = ? OR (status = ? AND lease_expires_at < ? AND attempts < ?) "
+                f"  ORDER BY created_at LIMIT 1"
+                f") RETURNING {_JOB_COLUMNS}",
+                (f"{stage}_running", worker, now + self.lease, now,
+                 f"{stage}_queued", f"{stage}_running", now, self.max_attempts),
+            ).fetchone()
+        return Job.from_row(row) if row else None
+
+    def _update(self, job: Job, worker: str, sql: str, params: tuple) -> bool:
+        # only the current lease holder may move the job on
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                f"UPDATE jobs SET {sql}, updated_at = ? WHERE id = ? AND status = ? AND worker = ?",
+                params + (time.time(), job.id, job.status, worker),
+            )
+        return cur.rowcount == 1
+
+    def advance(self, job: Job, worker: str, next_stage: str, payload: Any) -> bool:
+        """
+        Hand the job to the next stage's queue with this stage's output.
+        """
+        return self._update(
+            job, worker,
+            "status = ?, payload = ?, attempts = 0, worker = NULL, lease_expires_at = NULL",
+            (f"{next_stage}_queued", encode(payload)),
+        )
+
+    def finish(self, job: Job, worker: str, result: Any) -> bool:
+        return self._update(
+            job, worker,
+            "status = ?, result = ?, lease_expires_at = NULL",
+            (JOB_DONE, encode(result)),
+        )
+
+    def fail(self, job: Job, worker: str, error: str) -> bool:
+        """
+        Requeue the stage, or mark the job failed after max_attempts.
+        """
+        stage = job.status.rsplit("_", 1)[0]
+        status = JOB_FAILED if job.attempts >= self.max_attempts else f"{stage}_queued"
+        return self._update(
+            job, worker,
+            "status = ?, error = ?, worker = NULL, lease_expires_at = NULL",
+            (status, error),
+        )
+
+    def get(self, job_id: str) -> Optional[Job]:
+        row = self._conn().execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    def recent(self, limit: int = 20) -> List[Job]:
+        rows = self._conn().execute(
+            f"SELECT {_JOB_COLUMNS} FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [Job.from_row(r) for r in rows]
+
+    def stats(self) -> Dict[str, int]:
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
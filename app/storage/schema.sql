@@ -0,0 +1,31 @@
+-- Content-addressed result cache (see app/storage/db.py)
+CREATE TABLE IF NOT EXISTS cache_entries (
+    tier        TEXT    NOT NULL,   -- asr | soap | std
+    key         TEXT    NOT NULL,   -- sha256 of input content + stage fingerprint
+    value       BLOB    NOT NULL,   -- zlib-compressed JSON
+    size_bytes  INTEGER NOT NULL,
+    created_at  REAL    NOT NULL,
+    accessed_at REAL    NOT NULL,
+    expires_at  REAL,               -- NULL = no TTL
+    PRIMARY KEY (tier, key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_cache_lru ON cache_entries (tier, accessed_at);
+
+-- Pipeline job queue (see app/storage/db.py JobQueue, app/core/jobs.py)
+CREATE TABLE IF NOT EXISTS jobs (
+    id               TEXT    PRIMARY KEY,
+    status           TEXT    NOT NULL,   -- asr_queued | asr_running | llm_queued | llm_running | done | failed
+    audio_path       TEXT    NOT NULL,
+    options          TEXT    NOT NULL,   -- JSON, e.g. {"force_human_review": false}
+    payload          BLOB,               -- zlib JSON handed from one stage to the next (ASR result)
+    result           BLOB,               -- zlib JSON PipelineOutput
+    error            TEXT,
+    attempts         INTEGER NOT NULL DEFAULT 0,   -- claims of the current stage
+    worker           TEXT,
+    lease_expires_at REAL,               -- a running job whose lease expired is claimable again
+    created_at       REAL    NOT NULL,
+    updated_at       REAL    NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
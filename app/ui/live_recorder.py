@@ -1,39 +1,64 @@
-import queue
-import numpy as np
-import soundfile as sf
+import os
+import tempfile
+import threading
+from typing import Optional
 
-_audio_q = queue.Queue()
+from app.core.audio_writer import FORMAT_EXTENSIONS, StreamingAudioWriter
 
-def push_audio_frame(audio_frame) -> None:
-    """
-    Called for every audio frame coming from browser mic.
-    audio_frame: av.AudioFrame
-    """
-    # Convert to numpy float32
-    pcm = audio_frame.to_ndarray()
-    # pcm shape can be (channels, samples)
-    if pcm.ndim == 2:
-        pcm = pcm.T  # -> (samples, channels)
-    _audio_q.put(pcm.astype(np.float32))
 
-def drain_audio_to_wav(path: str, sample_rate: int = 48000) -> int:
+class LiveRecorder:
     """
-    Save all queued frames into a WAV file.
-    Returns number of samples written.
+    Per-session recorder for the browser mic.
+    Frames are written through to a temp file as 16 kHz mono, up to max_seconds.
     """
-    chunks = []
-    total = 0
-    while True:
-        try:
-            x = _audio_q.get_nowait()
-            chunks.append(x)
-            total += x.shape[0]
-        except queue.Empty:
-            break
 
-    if not chunks:
-        return 0
+    def __init__(self,
+                 fmt: str = "wav",
+                 max_seconds: float = 7200.0,
+                 directory: Optional[str] = None,
+                 default_rate: int = 48000):
+        self.fmt = fmt
+        self.max_seconds = max_seconds
+        self.directory = directory
+        self.default_rate = default_rate   # if a frame does not carry its rate
+        self.dropped_seconds = 0.0
+        self._writer: Optional[StreamingAudioWriter] = None
+        self._lock = threading.Lock()
+
+    def push_frame(self, audio_frame) -> None:
+        """
+        Called for every audio frame coming from browser mic.
+        audio_frame: av.AudioFrame
+        """
+        rate = getattr(audio_frame, "sample_rate", None) or self.default_rate
+        with self._lock:
+            if self._writer is None:
+                fd, path = tempfile.mkstemp(prefix="clinical_live_", suffix=FORMAT_EXTENSIONS[self.fmt],
+                                            dir=self.directory)
+                os.close(fd)
+                self._writer = StreamingAudioWriter(path, rate, fmt=self.fmt)
+            if self._writer.seconds_written >= self.max_seconds:
+                self.dropped_seconds += audio_frame.samples / float(rate)
+                return
+            self._writer.write_frame(audio_frame)
+
+    @property
+    def duration(self) -> float:
+        writer = self._writer
+        return writer.seconds_written if writer is not None else 0.0
 
-    audio = np.concatenate(chunks, axis=0)
-    sf.write(path, audio, sample_rate)
-    return total
+    def finish(self) -> Optional[str]:
+        """
+        Finalize the current recording; returns its path, or None if no
+        audio was captured.
+        """
+        with self._lock:
+            writer, self._writer = self._writer, None
+            self.dropped_seconds = 0.0
+        if writer is None:
+            return None
+        path = writer.close()
+        if writer.samples_written == 0:
+            os.remove(path)
+            return None
+        return path
@@ -16,9 +16,12 @@ RTC_CONFIG = RTCConfiguration(
 )
 
 from app.config.settings import Settings
-from app.core.pipeline import ClinicalDocPipeline
+from app.core.pipeline import get_pipeline
+from app.core.jobs import get_job_queue, job_output, submit_job
 from app.core.diagrams import build_state_diagram
-from app.ui.live_recorder import push_audio_frame, drain_audio_to_wav
+from app.core.soap_drafter import IncrementalSOAPDrafter
+from app.core.vad import EnergyVAD
+from app.ui.live_recorder import LiveRecorder
 import pandas as pd
 
 if "last_out" not in st.session_state:
@@ -36,7 +39,8 @@ st.subheader("ICS State Diagram")
 st.graphviz_chart(build_state_diagram())
 
 settings = Settings()
-pipeline = ClinicalDocPipeline(settings)
+# Cached per process: reruns and concurrent sessions share one pipeline / Whisper model
+pipeline = get_pipeline(settings)
 
 tab_upload, tab_live, tab_stream = st.tabs([
     "Upload Audio (Existing)",
@@ -54,11 +58,69 @@ with st.container(border=True):
         st.audio(audio_path)
 
         if st.button("Run Full ICS Pipeline", key="run_upload"):
-            with st.spinner("Running full ICS pipeline..."):
-                st.session_state["upload_out"] = pipeline.run_full(
-                    audio_path,
-                    force_human_review=force_human
-                )
+            status = st.empty()
+            soap_box = st.empty()
+            sections_box = st.empty()
+            status.info("Running ASR...")
+
+            # transcript renders segment by segment, then the SOAP text token by
+            # token; sections are checked as they complete
+            transcript_live = ""
+            soap_live = ""
+            previews = {}
+            for evt in pipeline.run_full_streaming(audio_path, force_human_review=force_human):
+                if evt.kind == "segment":
+                    transcript_live = f"{transcript_live} {evt.data.text}".strip()
+                    status.info(f"Running ASR... {evt.data.end:.0f} s transcribed")
+                    soap_box.caption(transcript_live)
+                elif evt.kind == "asr":
+                    status.info("Generating SOAP note...")
+                    soap_box.empty()
+                elif evt.kind == "token":
+                    soap_live += evt.data
+                    soap_box.markdown(soap_live)
+                elif evt.kind == "regenerate":
+                    status.warning(f"Supervisor requested a revision (attempt {evt.data['attempt']})...")
+                    soap_live = ""
+                    previews = {}
+                    soap_box.markdown(soap_live)
+                    sections_box.empty()
+                elif evt.kind == "section":
+                    previews[evt.data["section"]] = {
+                        "entities": evt.data["entities"],
+                        "checks": evt.data["checks"],
+                    }
+                    sections_box.json(previews, expanded=False)
+                elif evt.kind == "done":
+                    st.session_state["upload_out"] = evt.data
+
+            status.empty()
+            soap_box.empty()
+            sections_box.empty()
+
+        # Background mode: queue the file for the job workers (run_workers.py)
+        if settings.jobs_enabled and st.button("Submit as Background Job", key="submit_job"):
+            job_id = submit_job(settings, audio_path, force_human_review=force_human)
+            st.session_state.setdefault("job_ids", []).append(job_id)
+
+    job_ids = st.session_state.get("job_ids", [])
+    if settings.jobs_enabled and job_ids:
+        jobs = [get_job_queue(settings).get(job_id) for job_id in job_ids]
+        jobs = [j for j in jobs if j is not None]
+        st.subheader("Background Jobs")
+        st.dataframe(pd.DataFrame([
+            {"job": j.id[:8], "status": j.status, "attempts": j.attempts, "error": (j.error or "")[-200:]}
+            for j in jobs
+        ]), use_container_width=True)
+
+        for j in jobs:
+            if j.status == "done" and st.session_state.get("job_shown") != j.id:
+                if st.button(f"Show result of job {j.id[:8]}", key=f"show_{j.id}"):
+                    st.session_state["upload_out"] = job_output(j)
+                    st.session_state["job_shown"] = j.id
+
+        # polled at the end of the script so the other tabs still render
+        st.session_state["jobs_pending"] = not all(j.finished for j in jobs)
 
     # ✅ عرض النتائج فقط إذا كانت موجودة
     if "upload_out" in st.session_state:
@@ -94,9 +156,15 @@ with tab_live:
     st.markdown("### Live Recording")
     st.write("Click **Start** to record from your microphone, then **Stop**, then run the pipeline on the recorded audio.")
 
+    # one recorder per browser session; the callback runs on another thread,
+    # so it captures the recorder instead of reading st.session_state
+    if "live_capture" not in st.session_state:
+        st.session_state["live_capture"] = LiveRecorder(fmt=settings.live_format, max_seconds=settings.live_max_seconds)
+    recorder: LiveRecorder = st.session_state["live_capture"]
+
     # WebRTC streamer
     def audio_frame_callback(frame: av.AudioFrame) -> av.AudioFrame:
-        push_audio_frame(frame)
+        recorder.push_frame(frame)
         return frame
 
     webrtc_streamer(
@@ -109,14 +177,19 @@ with tab_live:
     colA, colB = st.columns(2)
 
     with colA:
-        if st.button("Save Recording to WAV", key="save_wav"):
-            out_wav = os.path.join(tempfile.gettempdir(), "clinical_live_recording.wav")
-            n = drain_audio_to_wav(out_wav, sample_rate=48000)
+        if st.button("Save Recording", key="save_wav"):
+            # frames are already on disk (16 kHz mono); this only finalizes the file
+            duration = recorder.duration
+            dropped = recorder.dropped_seconds
+            out_wav = recorder.finish()
 
-            if n == 0:
+            if out_wav is None:
                 st.error("No audio captured yet. Click Start and speak, then try again.")
             else:
-                st.success(f"Saved: {out_wav} (samples: {n})")
+                st.success(f"Saved: {out_wav} ({duration:.1f} s)")
+                if dropped:
+                    st.warning(f"Recording exceeded {settings.live_max_seconds:.0f} s; "
+                               f"the last {dropped:.0f} s were not saved.")
                 st.session_state["live_wav_path"] = out_wav
                 st.audio(out_wav)
 
@@ -124,7 +197,7 @@ with tab_live:
         if st.button("Run Pipeline on Live Recording", key="run_live"):
             wav_path = st.session_state.get("live_wav_path")
             if not wav_path or not os.path.exists(wav_path):
-                st.error("Please record audio and click 'Save Recording to WAV' first.")
+                st.error("Please record audio and click 'Save Recording' first.")
             else:
                 with st.spinner("Running full ICS pipeline on live recording..."):
                     out = pipeline.run_full(wav_path, force_human_review=force_human)
@@ -152,22 +225,118 @@ with tab_live:
                 st.dataframe(pd.DataFrame(out.meta["state_log"]), use_container_width=True)
 
 with tab_stream:
-    st.markdown("### Live Streaming ASR (Chunk-based)")
-    st.write("Start speaking. The transcript will update every few seconds.")
+    st.markdown("### Live Streaming ASR (Incremental)")
+    st.write("Start speaking. Final words appear once two consecutive decodes agree; the partial line may still change.")
 
     # UI controls
-    chunk_sec = st.slider("Chunk size (seconds)", 1.0, 6.0, 2.5, 0.5)
+    chunk_sec = st.slider("Update interval (seconds)", 0.5, 6.0, 1.0, 0.5)
+    live_draft = st.checkbox("Draft the SOAP note while recording", value=True, key="live_draft")
+
+    def new_stream_session() -> StreamingASRSession:
+        return StreamingASRSession(chunk_seconds=chunk_sec,
+                                   drafter=IncrementalSOAPDrafter(pipeline.llm_agent) if live_draft else None)
 
     # Session state for streaming ASR
     if "stream_asr" not in st.session_state:
-        st.session_state["stream_asr"] = StreamingASRSession(chunk_seconds=chunk_sec)
+        st.session_state["stream_asr"] = new_stream_session()
     else:
         st.session_state["stream_asr"].chunk_seconds = chunk_sec
 
     sess: StreamingASRSession = st.session_state["stream_asr"]
+    if live_draft and sess.drafter is None:
+        sess.drafter = IncrementalSOAPDrafter(pipeline.llm_agent)
+        sess.drafter.feed(sess.full_text)
+    elif not live_draft:
+        sess.drafter = None
 
     # WebRTC streamer
-    from app.ui.pseudo_streaming import split_wav_to_chunks
+    ctx = webrtc_streamer(
+        key="streaming_asr",
+        mode=WebRtcMode.SENDONLY,
+        rtc_configuration=RTC_CONFIG,
+        media_stream_constraints={"audio": True, "video": False},
+        audio_receiver_size=256,
+    )
+
+    transcript_box = st.empty()
+    partial_box = st.empty()
+    status_box = st.empty()
+    draft_box = st.empty()
+
+    if ctx.state.playing:
+        status_box.info("Recording... incremental transcription running.")
+
+        # Pull audio frames from receiver in a loop-like pattern.
+        # Streamlit reruns, so we do limited work each run.
+        frames = []
+        if ctx.audio_receiver:
+            try:
+                frames = ctx.audio_receiver.get_frames(timeout=0.1)
+            except Exception:
+                frames = []
+
+        for fr in frames:
+            sess.push_frame(fr)
+
+        try:
+            # Rolling window with overlap: re-decode conditioned on the committed
+            # text and only commit words two consecutive decodes agree on
+            sess.process_incremental(pipeline.asr_agent)
+        except Exception as e:
+            st.error(f"ASR update failed: {e}")
+    else:
+        status_box.warning("Click Start in the WebRTC component to begin.")
+        if sess.partial_text:
+            # recording stopped: the pending hypothesis becomes final
+            sess.finish()
+        if sess.drafter is not None and sess.drafter.pending:
+            # only the text since the last draft update is left to draft
+            with st.spinner("Finishing SOAP draft..."):
+                try:
+                    sess.drafter.finish(timeout=settings.llm_timeout)
+                except Exception as e:
+                    st.error(f"SOAP draft update failed: {e}")
+
+    transcript_box.text_area(
+        "Live Transcript (final)",
+        value=sess.full_text,
+        height=220
+    )
+    partial_box.caption(f"Partial: {sess.partial_text}" if sess.partial_text else "Partial: -")
+    if sess.drafter is not None and sess.drafter.draft:
+        with draft_box.container():
+            st.subheader("SOAP Draft (updated while recording)")
+            st.caption(f"{sess.drafter.updates} updates"
+                       + (" - updating..." if sess.drafter.busy else "")
+                       + (f" - last update failed: {sess.drafter.error}" if sess.drafter.error else ""))
+            st.write(sess.drafter.draft)
+
+    colA, colB = st.columns(2)
+    with colA:
+        if st.button("Clear Transcript", key="clear_stream_asr"):
+            st.session_state["stream_asr"] = new_stream_session()
+            st.success("Cleared.")
+    with colB:
+        if st.button("Run LLM on Current Transcript", key="llm_on_stream_text"):
+            if not sess.full_text.strip():
+                st.error("No transcript yet.")
+            else:
+                with st.spinner("Generating SOAP note from current transcript..."):
+                    if sess.drafter is not None:
+                        # the running draft plus the text it has not seen yet
+                        soap = sess.drafter.finish(timeout=settings.llm_timeout)
+                    else:
+                        soap = pipeline.llm_agent.generate_soap(sess.full_text)
+                st.subheader("SOAP Note (from live transcript)")
+                st.write(soap)
+
+    # keep polling the receiver while recording
+    if ctx.state.playing:
+        time.sleep(0.2)
+        st.rerun()
+
+    from app.ui.pseudo_streaming import read_wav_chunks, read_wav_speech_chunks
+
 
 st.markdown("### Fallback: Pseudo-Streaming (Guaranteed)")
 st.write("If WebRTC streaming fails, use a saved WAV or upload a WAV and stream it in chunks.")
@@ -179,11 +348,13 @@ with colF1:
     if st.button("Use last live WAV (if exists)", key="use_last_live_wav"):
         # reuse your existing live recording path if you saved one
         wav_path = st.session_state.get("live_wav_path")
-        if wav_path and os.path.exists(wav_path):
+        if wav_path and os.path.exists(wav_path) and not wav_path.endswith(".wav"):
+            st.error("Pseudo-streaming reads WAV only; set LIVE_FORMAT=wav for live recordings.")
+        elif wav_path and os.path.exists(wav_path):
             st.session_state["pseudo_wav_path"] = wav_path
             st.success(f"Using: {wav_path}")
         else:
-            st.error("No live WAV found. Record and click 'Save Recording to WAV' first.")
+            st.error("No live WAV found. Record and click 'Save Recording' first.")
 
 with colF2:
     if fallback_wav:
@@ -194,6 +365,7 @@ with colF2:
         st.success("Fallback WAV uploaded.")
 
 pseudo_chunk_sec = st.slider("Pseudo-stream chunk size (seconds)", 1.0, 8.0, 2.5, 0.5, key="pseudo_chunk_sec")
+pseudo_vad = st.checkbox("Cut chunks at pauses and skip silence (VAD)", value=True, key="pseudo_vad")
 
 if st.button("Run Pseudo-Streaming ASR", key="run_pseudo_stream"):
     wav_path = st.session_state.get("pseudo_wav_path")
@@ -201,14 +373,23 @@ if st.button("Run Pseudo-Streaming ASR", key="run_pseudo_stream"):
         st.error("Please provide a WAV file first.")
     else:
         st.audio(wav_path)
-        chunks = split_wav_to_chunks(wav_path, chunk_seconds=pseudo_chunk_sec)
+        if pseudo_vad:
+            # chunk size is the minimum here; chunks grow to the next pause
+            vad = EnergyVAD(min_chunk_s=pseudo_chunk_sec, max_chunk_s=max(20.0, pseudo_chunk_sec))
+            chunks = read_wav_speech_chunks(wav_path, vad)
+        else:
+            chunks = read_wav_chunks(wav_path, chunk_seconds=pseudo_chunk_sec)
 
         full_text = ""
         prog = st.progress(0)
         out_box = st.empty()
 
-        for i, ch in enumerate(chunks, start=1):
-            asr_res = pipeline.asr_agent.transcribe(ch)  # adjust name if needed
+        # chunks are independent: decode them in parallel, results arrive in order
+        results = pipeline.asr_agent.transcribe_batch(
+            (ch.pcm for ch in chunks),
+            sample_rate=chunks[0].sample_rate if chunks else 16000,
+        )
+        for i, asr_res in enumerate(results, start=1):
             if asr_res.text:
                 full_text = (full_text + " " + asr_res.text.strip()).strip()
 
@@ -218,82 +399,7 @@ if st.button("Run Pseudo-Streaming ASR", key="run_pseudo_stream"):
         st.success("Pseudo-streaming done.")
         st.session_state["pseudo_stream_text"] = full_text
 
-    from streamlit_webrtc import webrtc_streamer, WebRtcMode
-
-    ctx = webrtc_streamer(
-    key="streaming_asr",
-    mode=WebRtcMode.SENDONLY,
-    rtc_configuration=RTC_CONFIG,
-    media_stream_constraints={"audio": True, "video": False},
-    audio_receiver_size=256,
-    )
-
-
-    transcript_box = st.empty()
-    status_box = st.empty()
-
-    if ctx.state.playing:
-        time.sleep(0.2)
-        st.rerun()
-
-    if ctx.state.playing:
-        status_box.info("Recording... partial transcription running.")
-
-        # Pull audio frames from receiver in a loop-like pattern.
-        # Streamlit reruns, so we do limited work each run.
-        frames = []
-        if ctx.audio_receiver:
-            try:
-                frames = ctx.audio_receiver.get_frames(timeout=0.1)
-            except Exception:
-                frames = []
-
-        for fr in frames:
-            sess.push_frame(fr)
-
-        chunk_path = sess.pop_chunk_if_ready()
-        if chunk_path:
-            try:
-                # Use your existing ASR agent via pipeline.asr_agent
-                # (we reuse the same Whisper model & settings)
-                asr_res = pipeline.asr_agent.transcribe(chunk_path)
-
-                # Update texts
-                sess.partial_text = asr_res.text.strip()
-                if sess.partial_text:
-                    sess.full_text = (sess.full_text + " " + sess.partial_text).strip()
-
-                # Optional: show last chunk wav
-                st.caption("Last audio chunk processed:")
-                st.audio(chunk_path)
-
-            except Exception as e:
-                st.error(f"ASR chunk failed: {e}")
-
-        transcript_box.text_area(
-            "Live Transcript (accumulated)",
-            value=sess.full_text,
-            height=220
-        )
-    else:
-        status_box.warning("Click Start in the WebRTC component to begin.")
-        transcript_box.text_area(
-            "Live Transcript (accumulated)",
-            value=sess.full_text if "stream_asr" in st.session_state else "",
-            height=220
-        )
-
-    colA, colB = st.columns(2)
-    with colA:
-        if st.button("Clear Transcript", key="clear_stream_asr"):
-            st.session_state["stream_asr"] = StreamingASRSession(chunk_seconds=chunk_sec)
-            st.success("Cleared.")
-    with colB:
-        if st.button("Run LLM on Current Transcript", key="llm_on_stream_text"):
-            if not sess.full_text.strip():
-                st.error("No transcript yet.")
-            else:
-                with st.spinner("Generating SOAP note from current transcript..."):
-                    soap = pipeline.llm_agent.generate_soap(sess.full_text)
-                st.subheader("SOAP Note (from live transcript)")
-                st.write(soap)
+# Poll background jobs until they finish
+if st.session_state.get("jobs_pending"):
+    time.sleep(settings.jobs_poll_interval)
+    st.rerun()
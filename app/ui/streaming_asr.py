@@ -1,81 +1,261 @@
-import os
 import time
-import wave
-import tempfile
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 import numpy as np
 import av
 
+from app.core.ring_buffer import AudioRingBuffer
+from app.core.soap_drafter import IncrementalSOAPDrafter
+from app.core.vad import EnergyVAD
 
-def _frame_to_pcm16_mono(frame: av.AudioFrame) -> np.ndarray:
-    """
-    Convert an incoming AudioFrame to mono int16 PCM.
-    Handles common cases from browser mic.
-    """
-    pcm = frame.to_ndarray()  # shape: (channels, samples) or (samples,)
-    if pcm.ndim == 2:
-        # average channels -> mono
-        pcm = pcm.mean(axis=0)
 
-    # Ensure int16
-    if pcm.dtype != np.int16:
-        # Many browsers provide float32 in [-1, 1]
-        pcm = np.clip(pcm, -1.0, 1.0)
-        pcm = (pcm * 32767.0).astype(np.int16)
+@dataclass
+class TimedWord:
+    start: float   # seconds since the session started
+    end: float
+    text: str
+
 
-    return pcm
+def _normalize_word(w: str) -> str:
+    return w.strip().lower().strip(".,!?;:\"'")
 
 
-def _write_wav(path: str, pcm16: np.ndarray, sample_rate: int) -> None:
+class HypothesisBuffer:
     """
-    Write mono int16 PCM into WAV file.
+    Local-agreement commit policy (LocalAgreement-2):
+    a word becomes final once two consecutive decodes agree on it.
     """
-    with wave.open(path, "wb") as wf:
-        wf.setnchannels(1)
-        wf.setsampwidth(2)  # int16
-        wf.setframerate(sample_rate)
-        wf.writeframes(pcm16.tobytes())
+
+    def __init__(self):
+        self.committed: List[TimedWord] = []
+        self.previous: List[TimedWord] = []   # unconfirmed tail of the last decode
+        self.last_committed_end: float = 0.0
+
+    def insert(self, words: List[TimedWord]) -> List[TimedWord]:
+        """
+        Feed the words of a new decode; returns the newly committed words.
+        """
+        # the window overlaps audio we already committed: skip re-decoded words
+        new = [w for w in words if w.start >= self.last_committed_end - 0.1]
+
+        # timestamps drift slightly between decodes; also drop an n-gram
+        # at the head that repeats the tail of the committed text
+        if new and self.committed:
+            for n in range(min(5, len(new), len(self.committed)), 0, -1):
+                tail = [_normalize_word(w.text) for w in self.committed[-n:]]
+                head = [_normalize_word(w.text) for w in new[:n]]
+                if tail == head:
+                    new = new[n:]
+                    break
+
+        agreed: List[TimedWord] = []
+        for prev, cur in zip(self.previous, new):
+            if _normalize_word(prev.text) != _normalize_word(cur.text):
+                break
+            agreed.append(cur)
+
+        self.previous = new[len(agreed):]
+        self._commit(agreed)
+        return agreed
+
+    def flush(self) -> List[TimedWord]:
+        """
+        Commit the pending tail without waiting for agreement (end of stream).
+        """
+        tail = self.previous
+        self.previous = []
+        self._commit(tail)
+        return tail
+
+    def _commit(self, words: List[TimedWord]) -> None:
+        if words:
+            self.committed.extend(words)
+            self.last_committed_end = words[-1].end
 
 
 @dataclass
 class StreamingASRSession:
     """
     Collects audio frames, cuts into chunks, and produces partial transcripts.
+    - pop_chunk_if_ready(): fixed chunks, each transcribed cold
+    - process_incremental(): rolling window with local-agreement commit
     """
     sample_rate: int = 48000
     chunk_seconds: float = 2.5
-    buffer_pcm: List[np.ndarray] = field(default_factory=list)
     last_chunk_time: float = field(default_factory=time.time)
     partial_text: str = ""
     full_text: str = ""
-    last_chunk_wav: Optional[str] = None
+    last_chunk_pcm: Optional[np.ndarray] = None
+    last_chunk_start: float = 0.0        # session time of last_chunk_pcm[0]
+    max_chunk_seconds: float = 10.0      # pop mode: cut even without a pause past this
+    vad: Optional[EnergyVAD] = field(default_factory=EnergyVAD)
+
+    # incremental mode
+    max_window_seconds: float = 15.0     # trim the window once it grows past this
+    hard_window_seconds: float = 30.0    # never decode more; past it the hypothesis is force-committed
+    overlap_seconds: float = 1.0         # audio kept before the last committed word
+    prompt_chars: int = 200              # committed text passed as decoder prompt
+    hypothesis: HypothesisBuffer = field(default_factory=HypothesisBuffer)
+    drafter: Optional[IncrementalSOAPDrafter] = None
+
+    # capture ring; grown if needed to hold a full window plus pending chunks
+    ring_seconds: float = 60.0
+    ring: AudioRingBuffer = field(init=False, repr=False)
+    consumed: int = field(init=False, default=0)       # ring position handed to ASR so far
+    window_from: int = field(init=False, default=0)    # ring position of the window's first sample
+
+    def __post_init__(self):
+        seconds = max(self.ring_seconds, self.hard_window_seconds + 4 * self.chunk_seconds)
+        self.ring = AudioRingBuffer(seconds, self.sample_rate, contiguous=True)
 
     def push_frame(self, frame: av.AudioFrame):
-        pcm = _frame_to_pcm16_mono(frame)
-        self.buffer_pcm.append(pcm)
+        self.ring.write_frame(frame)
 
     def _buffer_duration_seconds(self) -> float:
-        if not self.buffer_pcm:
-            return 0.0
-        total_samples = int(sum(x.shape[0] for x in self.buffer_pcm))
-        return total_samples / float(self.sample_rate)
+        return (self.ring.total - self.consumed) / float(self.sample_rate)
 
-    def pop_chunk_if_ready(self) -> Optional[str]:
+    def pop_chunk_if_ready(self) -> Optional[np.ndarray]:
         """
-        If buffer duration >= chunk_seconds, write a WAV chunk and clear buffer.
-        Returns path to chunk WAV or None.
+        If chunk_seconds are buffered, return the next chunk (mono int16 PCM) or None.
+        The chunk is a copy, so it stays valid while the ring is overwritten.
         """
-        if self._buffer_duration_seconds() < self.chunk_seconds:
+        pending_s = self._buffer_duration_seconds()
+        if pending_s < self.chunk_seconds:
             return None
 
-        pcm16 = np.concatenate(self.buffer_pcm, axis=0)
-        self.buffer_pcm.clear()
+        start = max(self.consumed, self.ring.start)
+        pending = self.ring.view(start)
+        if self.vad is None:
+            pcm16 = pending
+            self.consumed = self.ring.total
+        else:
+            n, speech = self.vad.next_chunk(pending, self.sample_rate, force=pending_s >= self.max_chunk_seconds)
+            self.consumed = start + n
+            if speech is None:
+                return None
+            pcm16 = pending[speech.start:speech.end]
+            start += speech.start
+
+        pcm16 = pcm16.copy()
+        self.last_chunk_pcm = pcm16
+        self.last_chunk_start = start / float(self.sample_rate)
+        return pcm16
+
+    @property
+    def final_text(self) -> str:
+        return self.full_text
+
+    @property
+    def window_start(self) -> float:
+        """
+        Session time (seconds) of the window's first sample.
+        """
+        return self.window_from / float(self.sample_rate)
+
+    @property
+    def window_pcm(self) -> np.ndarray:
+        return self.ring.view(self.window_from, self.consumed)
+
+    def _window_duration_seconds(self) -> float:
+        return (self.consumed - self.window_from) / float(self.sample_rate)
+
+    def process_incremental(self, asr_agent: Any, language: Optional[str] = "en") -> bool:
+        """
+        Re-decode the rolling window once chunk_seconds of new audio are buffered.
+        Returns True if the hypotheses were updated.
+        """
+        updated = self._decode_window(asr_agent, language)
+        if self.drafter is not None:
+            self.drafter.poll()
+        return updated
+
+    def _decode_window(self, asr_agent: Any, language: Optional[str]) -> bool:
+        if self._buffer_duration_seconds() < self.chunk_seconds:
+            return False
+
+        # only if updates stalled for longer than the ring holds
+        self.window_from = max(self.window_from, self.ring.start)
+        # one decode is at most hard_window_seconds; a backlog is caught up over the next ticks
+        end = min(self.ring.total, self.window_from + self._hard_window_samples())
+        pause = (self.vad is not None
+                 and not self.vad.has_speech(self.ring.view(max(self.consumed, self.ring.start), end), self.sample_rate))
+        self.consumed = end
+
+        # nothing new to hear and no partial waiting for a confirming decode:
+        # skip Whisper, and start the window at the silence instead of re-decoding it
+        if pause and not self.hypothesis.previous:
+            self._restart_window()
+            return False
+
+        committed = self.full_text
+        res = asr_agent.transcribe(
+            self.window_pcm,
+            language=language,
+            sample_rate=self.sample_rate,
+            initial_prompt=committed[-self.prompt_chars:] or None,
+            word_timestamps=True,
+        )
+        words = _timed_words(res.segments, self.window_start)
+
+        newly = self.hypothesis.insert(words)
+        self._append_final(newly)
+
+        # the speaker paused, or no agreement within the hard cap (noise, music):
+        # commit what there is and restart the window at the end, so speech
+        # broken by long silences does not pile up into one oversized decode
+        if pause or self.consumed - self.window_from >= self._hard_window_samples():
+            self._append_final(self.hypothesis.flush())
+            self._restart_window()
+
+        self.partial_text = " ".join(w.text for w in self.hypothesis.previous)
+        self._trim_window()
+        return True
+
+    def finish(self) -> str:
+        """
+        End of stream: commit the pending partial hypothesis.
+        """
+        self._append_final(self.hypothesis.flush())
+        self.partial_text = ""
+        return self.full_text
+
+    def _append_final(self, words: List[TimedWord]) -> None:
+        text = " ".join(w.text for w in words if w.text)
+        if text:
+            self.full_text = (self.full_text + " " + text).strip()
+            if self.drafter is not None:
+                self.drafter.feed(text)
+
+    def _hard_window_samples(self) -> int:
+        return int(self.hard_window_seconds * self.sample_rate)
+
+    def _restart_window(self) -> None:
+        # keep only overlap_seconds before the consumed end
+        overlap = int(self.overlap_seconds * self.sample_rate)
+        self.window_from = max(self.window_from, self.consumed - overlap)
+
+    def _trim_window(self) -> None:
+        """
+        Drop audio that is fully committed, keeping overlap_seconds of context
+        before the last committed word so edge words are re-decoded whole.
+        """
+        if self._window_duration_seconds() <= self.max_window_seconds:
+            return
+
+        cut_time = self.hypothesis.last_committed_end - self.overlap_seconds
+        cut = int((cut_time - self.window_start) * self.sample_rate)
+        if cut <= 0:
+            return
+
+        self.window_from += min(cut, self.consumed - self.window_from)
 
-        tmp_dir = tempfile.gettempdir()
-        chunk_path = os.path.join(tmp_dir, f"asr_chunk_{int(time.time()*1000)}.wav")
-        _write_wav(chunk_path, pcm16, self.sample_rate)
 
-        self.last_chunk_wav = chunk_path
-        return chunk_path
+def _timed_words(segments: List[Dict[str, Any]], offset: float) -> List[TimedWord]:
+    words = []
+    for seg in segments:
+        for w in seg.get("words", []):
+            text = w["word"].strip()    # Whisper words carry their leading space
+            if text:
+                words.append(TimedWord(start=offset + w["start"], end=offset + w["end"], text=text))
+    return words
@@ -0,0 +1,41 @@
+import argparse
+import json
+import os
+import sys
+
+def main():
+    # Ensure project root is in PYTHONPATH
+    project_root = os.path.dirname(os.path.abspath(__file__))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+    parser = argparse.ArgumentParser(description="Run the ICS pipeline over a directory or manifest of audio files")
+    parser.add_argument("source", help="directory of audio files, or a manifest (.txt paths / .jsonl records)")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="JSONL output file")
+    parser.add_argument("--asr-workers", type=int, default=1, help="concurrent ASR decodes")
+    parser.add_argument("--llm-workers", type=int, default=4, help="concurrent LLM / post-ASR stages")
+    parser.add_argument("--queue-size", type=int, default=8, help="transcripts buffered between the stages")
+    parser.add_argument("--resume", action="store_true", help="skip files already done in the output")
+    args = parser.parse_args()
+
+    from app.config.settings import Settings
+    from app.core.batch import discover_inputs, run_batch
+    from app.core.pipeline import get_pipeline
+
+    items = discover_inputs(args.source)
+    if not items:
+        sys.exit(f"no audio files found in {args.source}")
+
+    summary = run_batch(
+        get_pipeline(Settings()),
+        items,
+        args.output,
+        asr_workers=args.asr_workers,
+        llm_workers=args.llm_workers,
+        queue_size=args.queue_size,
+        resume=args.resume,
+    )
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import datetime
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+
+SUITES = {
+    "standardizer": "app.bench.bench_standardizer",
+    "supervisor": "app.bench.bench_supervisor",
+    "audio": "app.bench.bench_audio",
+    "e2e": "app.bench.bench_e2e",
+}
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def run(names, quick):
+    from app.core.metrics import process_sample
+    import numpy as np
+
+    results = {
+        "meta": {
+            "commit": _git("rev-parse", "--short", "HEAD"),
+            "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "quick": quick,
+        },
+        "suites": {},
+    }
+    for name in names:
+        print(f"[bench] {name} ...", file=sys.stderr)
+        results["suites"][name] = importlib.import_module(SUITES[name]).suite(quick=quick)
+    results["meta"]["peak_rss_mb"] = round(process_sample()["ics_process_peak_resident_memory_bytes"] / 2**20, 1)
+    return results
+
+def main():
+    # Ensure project root is in PYTHONPATH
+    project_root = os.path.dirname(os.path.abspath(__file__))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+    parser = argparse.ArgumentParser(description="ICS benchmark suite (JSON results, p50/p95/p99, peak memory)")
+    parser.add_argument("--suite", default=",".join(SUITES), help=f"comma-separated subset of {', '.join(SUITES)}")
+    parser.add_argument("--quick", action="store_true", help="smaller inputs and fewer repeats")
+    parser.add_argument("-o", "--output", help="result file (default: bench_results/<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"),
+                        help="diff two result files instead of running; exits 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    # app paths (app/kb/..., .env) are relative to the project root; result files to the caller's cwd
+    if args.output:
+        args.output = os.path.abspath(args.output)
+    if args.compare:
+        args.compare = [os.path.abspath(p) for p in args.compare]
+    os.chdir(project_root)
+
+    from app.bench.harness import compare
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            base = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        rows = compare(base, new, args.threshold)
+        print(json.dumps({"base": base["meta"].get("commit"), "new": new["meta"].get("commit"), "cases": rows}, indent=2))
+        sys.exit(1 if any(r["regression"] for r in rows) else 0)
+
+    names = [n.strip() for n in args.suite.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SUITES]
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(unknown)}")
+
+    results = run(names, args.quick)
+    out = args.output or os.path.join("bench_results", f"{results['meta']['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"[bench] wrote {out}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import os
 import sys
+import threading
 
 def main():
     # Ensure project root is in PYTHONPATH
@@ -7,6 +8,13 @@ def main():
     if project_root not in sys.path:
         sys.path.insert(0, project_root)
 
+    # Load the Whisper model in the background so the first request does not pay for it
+    from app.config.settings import Settings
+    from app.core.pipeline import warm_up
+    settings = Settings()
+    if settings.asr_warmup:
+        threading.Thread(target=warm_up, args=(settings,), daemon=True).start()
+
     # Run Streamlit app
     import streamlit.web.cli as stcli
     sys.argv = ["streamlit", "run", "app/ui/main.py"]
@@ -0,0 +1,27 @@
+import argparse
+import logging
+import os
+import sys
+
+def main():
+    # Ensure project root is in PYTHONPATH
+    project_root = os.path.dirname(os.path.abspath(__file__))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+    from app.config.settings import Settings
+    from app.core.jobs import run_workers
+    settings = Settings()
+
+    parser = argparse.ArgumentParser(description="Run ICS pipeline job workers (see JOBS_* settings)")
+    parser.add_argument("--asr-workers", type=int, default=settings.jobs_asr_workers,
+                        help="ASR worker processes (CPU-bound)")
+    parser.add_argument("--llm-workers", type=int, default=settings.jobs_llm_workers,
+                        help="LLM worker threads (I/O-bound)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(threadName)s %(message)s")
+    run_workers(settings, args.asr_workers, args.llm_workers)
+
+if __name__ == "__main__":
+    main()
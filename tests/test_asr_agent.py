@@ -0,0 +1,84 @@
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.agents.asr_agent import ASRAgent
+
+
+class FakeWhisper:
+    """
+    Decodes a chunk to the number it is filled with, after a random delay.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = 0
+        self.running = 0
+        self.max_running = 0
+
+    def transcribe(self, audio, **options):
+        with self.lock:
+            self.started += 1
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(random.uniform(0, 0.005))
+            if audio[0] < 0:
+                raise RuntimeError("bad chunk")
+            seg = SimpleNamespace(start=0.0, end=1.0, text=str(int(audio[0])))
+            return iter([seg]), SimpleNamespace(language="en", duration=1.0)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+class StubRegistry:
+    def __init__(self):
+        self.model = FakeWhisper()
+
+    def acquire(self, *key):
+        return self.model
+
+    def release(self, *key):
+        pass
+
+
+def chunks(n):
+    return (np.full(160, i, dtype=np.float32) for i in range(n))
+
+
+def test_batch_keeps_input_order_and_bounds_in_flight():
+    registry = StubRegistry()
+    agent = ASRAgent(registry=registry, num_workers=2)
+    model = registry.model
+
+    out = []
+    for result in agent.transcribe_batch(chunks(40)):
+        out.append(result.text)
+        # submitted but not yet handed to the consumer
+        assert model.started - len(out) <= 2 * 2
+        time.sleep(0.001)
+    assert out == [str(i) for i in range(40)]
+    assert model.max_running <= 2
+
+
+def test_batch_stops_submitting_when_the_consumer_stops():
+    registry = StubRegistry()
+    agent = ASRAgent(registry=registry, num_workers=3)
+    results = agent.transcribe_batch(chunks(100))
+    assert [next(results).text for _ in range(5)] == ["0", "1", "2", "3", "4"]
+    results.close()
+    assert registry.model.started <= 5 + 2 * 3
+
+
+def test_batch_raises_the_first_failure_in_order():
+    agent = ASRAgent(registry=StubRegistry(), num_workers=2)
+    source = [np.full(160, v, dtype=np.float32) for v in (0, 1, -1, 3)]
+    results = agent.transcribe_batch(source)
+    assert [next(results).text for _ in range(2)] == ["0", "1"]
+    with pytest.raises(RuntimeError, match="bad chunk"):
+        next(results)
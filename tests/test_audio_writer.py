@@ -0,0 +1,54 @@
+import wave
+
+import numpy as np
+import pytest
+
+from app.core.audio import StreamResampler, resample
+from app.core.audio_writer import StreamingAudioWriter
+
+
+def chunks(x, seed=0):
+    rng = np.random.default_rng(seed)
+    i = 0
+    while i < x.shape[0]:
+        n = int(rng.integers(1, 2000))
+        yield x[i:i + n]
+        i += n
+
+
+@pytest.mark.parametrize("src_rate", [48000, 44100, 22050, 16000, 8000])
+def test_chunked_resampling_equals_one_shot(src_rate):
+    x = np.random.default_rng(1).uniform(-1, 1, src_rate).astype(np.float32)
+    rs = StreamResampler(src_rate, 16000)
+    streamed = np.concatenate([rs.process(c) for c in chunks(x)] + [rs.flush()])
+    expected = resample(x, src_rate, 16000)
+    assert streamed.dtype == np.float32
+    assert streamed.shape == expected.shape
+    np.testing.assert_allclose(streamed, expected, atol=1e-6)
+
+
+def test_streamed_wav_is_complete_after_close(tmp_path):
+    path = str(tmp_path / "live.wav")
+    rng = np.random.default_rng(2)
+    stereo = (rng.uniform(-0.5, 0.5, (2, 48000 * 2 + 7)) * 32767).astype(np.int16)
+    writer = StreamingAudioWriter(path, in_rate=48000)
+    total = sum(writer.write(stereo[:, i:i + 960]) for i in range(0, stereo.shape[1], 960))
+    assert writer.close() == path and writer.closed
+    with pytest.raises(ValueError):
+        writer.write(stereo[:, :10])
+
+    assert total == writer.samples_written == 32002      # the 1-sample remainder of 48k/16k is dropped
+    assert writer.seconds_written == pytest.approx(2.0, abs=1e-3)
+    with wave.open(path, "rb") as w:
+        assert (w.getnchannels(), w.getsampwidth(), w.getframerate(), w.getnframes()) == (1, 2, 16000, total)
+        pcm = np.frombuffer(w.readframes(total), dtype="<i2")
+    assert (tmp_path / "live.wav").stat().st_size == 44 + 2 * total
+
+    mono = stereo.astype(np.int32).sum(axis=0) // 2 / 32768.0
+    expected = np.round(resample(mono.astype(np.float32), 48000, 16000) * 32767)
+    assert np.abs(pcm - expected).max() <= 1
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="unknown audio format"):
+        StreamingAudioWriter(str(tmp_path / "x.mp3"), 48000, fmt="mp3")
@@ -0,0 +1,72 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from app.agents.entity_spans import EntitySpan, SpanIndex, is_negated
+from app.agents.standardizer_agent import StandardizerAgent
+from app.agents.term_matcher import clause_breaks
+from app.kb.ontology_index import tokenize
+
+ONTOLOGY = Path(__file__).resolve().parent.parent / "app" / "kb" / "ontology_stub.json"
+
+
+@pytest.fixture(scope="module")
+def agent(tmp_path_factory):
+    path = tmp_path_factory.mktemp("kb") / "ontology.json"
+    shutil.copy(ONTOLOGY, path)
+    return StandardizerAgent(str(path))
+
+
+def negated(text, term):
+    tokens = tokenize(text)
+    words = [t for t, _, _ in tokens]
+    i = words.index(term)
+    return is_negated(words, clause_breaks(text, tokens), i, i + 1)
+
+
+@pytest.mark.parametrize("text, term, expected", [
+    ("no fever", "fever", True),
+    ("Patient denies fever or chills", "fever", True),
+    ("negative for fever", "fever", True),
+    ("fever was ruled out", "fever", True),
+    ("fever", "fever", False),
+    ("no cough but fever", "fever", False),            # scope ends at the conjunction
+    ("no cough. fever since monday", "fever", False),  # ... and at a clause break
+    ("cough absent; fever present", "fever", False),
+])
+def test_negation_scope(text, term, expected):
+    assert negated(text, term) is expected
+
+
+def test_soap_section_attribution(agent):
+    note = "S: Headache and no fever.\nO: Lungs clear.\nA: Migraine.\nP: Ibuprofen as needed."
+    spans = {(s.canonical, s.section, s.negated) for s in agent.annotate(note)}
+    assert spans >= {("headache", "S", False), ("fever", "S", True), ("migraine", "A", False),
+                     ("ibuprofen", "P", False)}
+    assert {s.section for s in agent.annotate("just a headache", section="O")} == {"O"}
+
+    result = agent.standardize("I have a headache, no fever.", note)
+    transcript = [s for s in result.spans if s.source == "transcript"]
+    assert transcript and all(s.section is None for s in transcript)
+    assert [s.canonical for s in result.index.in_section("P")] == ["ibuprofen"]
+    assert result.negated == {"symptoms": ["fever"]}
+
+
+def span(start, end, canonical="x", source="soap"):
+    return EntitySpan(start, end, source, None, "symptoms", canonical, canonical, canonical)
+
+
+def test_span_index_overlap_queries():
+    index = SpanIndex([
+        span(0, 4, "a"), span(10, 20, "long"), span(12, 15, "inner"),   # inner loses to long
+        span(25, 30, "b"), span(25, 30, "b2"), span(0, 5, "t", source="transcript"),
+    ])
+    assert [s.canonical for s in index.spans("soap")] == ["a", "long", "b", "b2"]
+    assert len(index) == 5
+    assert [s.canonical for s in index.overlapping("soap", 3, 11)] == ["a", "long"]
+    assert index.overlapping("soap", 4, 10) == []           # half-open ranges
+    assert [s.canonical for s in index.overlapping("soap", 19, 26)] == ["long", "b", "b2"]
+    assert [s.canonical for s in index.at("soap", 13)] == ["long"]
+    assert index.at("soap", 20) == [] and index.overlapping("nope", 0, 99) == []
+    assert [s.canonical for s in index.at("transcript", 4)] == ["t"]
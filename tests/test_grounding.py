@@ -0,0 +1,80 @@
+from pathlib import Path
+
+import pytest
+
+from app.agents.standardizer_agent import StandardizerAgent
+from app.core.decision_policy import RuleEngine
+from app.core.grounding import GroundingChecker
+
+KB = Path(__file__).resolve().parent.parent / "app" / "kb"
+
+TRANSCRIPT = (
+    "Doctor: What brings you in today? "
+    "Patient: I've had a sore throat and a fever for three days, and I've been coughing a lot. "
+    "Doctor: Any trouble breathing? Patient: No, breathing is fine. "
+    "Doctor: Your temperature is 38.5 and your throat looks red. "
+    "Doctor: I think this is a viral infection. Take paracetamol for the fever, drink plenty of fluids, "
+    "and rest. Come back if it gets worse or you're not better in a week."
+)
+
+FAITHFUL = """S: Sore throat, fever and cough for 3 days. Denies shortness of breath.
+O: Temperature 38.5. Throat red.
+A: Viral upper respiratory infection.
+P: Paracetamol for fever, fluids and rest. Return if symptoms worsen or no improvement in one week."""
+
+
+@pytest.fixture(scope="module")
+def annotator():
+    return StandardizerAgent(str(KB / "ontology_stub.json"))
+
+
+@pytest.fixture(scope="module")
+def rules():
+    return RuleEngine(str(KB / "rules.yaml"))
+
+
+def grounding(rules, note, annotator):
+    return next(r for r in rules.evaluate(note, TRANSCRIPT, annotator) if r.id == "unsupported_claims")
+
+
+def test_faithful_paraphrase_passes(rules, annotator):
+    result = grounding(rules, FAITHFUL, annotator)
+    assert result.passed, result.details
+
+
+@pytest.mark.parametrize("plan", [
+    "P: Supportive care. Come back if it gets worse.",
+    "P: Acetaminophen as needed, push fluids, rest. Follow up in a week if not improving.",
+    "P: Rest and hydration. Seek care if breathing becomes difficult.",
+])
+def test_paraphrased_plans_pass(rules, annotator, plan):
+    note = FAITHFUL.rsplit("\n", 1)[0] + "\n" + plan
+    result = grounding(rules, note, annotator)
+    assert result.passed, result.details
+
+
+def test_invented_number_fails(rules, annotator):
+    note = FAITHFUL.replace("Temperature 38.5", "Temperature 39.4")
+    result = grounding(rules, note, annotator)
+    assert not result.passed
+    assert result.details["unsupported_numbers"] == ["39.4"]
+
+
+def test_many_unsupported_sentences_fail(rules, annotator):
+    note = FAITHFUL + (
+        "\nFamily history of diabetes. Smokes a pack a day. Works night shifts as a nurse."
+        " Allergic to penicillin."
+    )
+    result = grounding(rules, note, annotator)
+    assert not result.passed
+    assert len(result.details["unsupported_claims"]) >= 3
+
+
+def test_spoken_numbers_support_digits():
+    report = GroundingChecker().check("it started three days ago", "S: Started 3 days ago.")
+    assert report.unsupported == [] and report.unsupported_numbers == []
+
+
+def test_section_headers_and_not_mentioned_are_skipped():
+    report = GroundingChecker().check("a dry cough", "S: Dry cough.\nO: Not mentioned.")
+    assert [s.text for s in report.sentences] == ["Dry cough."]
@@ -0,0 +1,82 @@
+import sqlite3
+
+import pytest
+
+from app.storage.db import JOB_FAILED, JobQueue
+
+
+def make_queue(tmp_path, **kwargs):
+    return JobQueue(str(tmp_path / "jobs.db"), **kwargs)
+
+
+def test_claim_advance_finish(tmp_path):
+    q = make_queue(tmp_path)
+    job_id = q.submit("a.wav", {"language": "en"})
+
+    job = q.claim("asr", "w1")
+    assert job.id == job_id and job.status == "asr_running" and job.attempts == 1
+    assert q.claim("asr", "w2") is None
+    assert q.advance(job, "w1", "llm", {"transcript": "hi"})
+
+    job = q.claim("llm", "w2")
+    assert job.payload == {"transcript": "hi"} and job.attempts == 1
+    assert not q.finish(job, "w1", {"note": "x"})     # not the lease holder
+    assert q.finish(job, "w2", {"note": "x"})
+    assert q.get(job_id).result == {"note": "x"}
+
+
+def test_claim_is_oldest_first(tmp_path):
+    q = make_queue(tmp_path)
+    first = q.submit("a.wav")
+    q.submit("b.wav")
+    assert q.claim("asr", "w").id == first
+
+
+def test_fail_requeues_then_gives_up(tmp_path):
+    q = make_queue(tmp_path, max_attempts=2)
+    job_id = q.submit("a.wav")
+
+    assert q.fail(q.claim("asr", "w"), "w", "boom")
+    assert q.get(job_id).status == "asr_queued"
+    assert q.fail(q.claim("asr", "w"), "w", "boom")
+    job = q.get(job_id)
+    assert job.status == JOB_FAILED and job.error == "boom"
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    q = make_queue(tmp_path, lease=-1.0, max_attempts=3)   # leases are expired at once
+    job_id = q.submit("a.wav")
+
+    stale = q.claim("asr", "crashed")
+    job = q.claim("asr", "w2")
+    assert job.id == job_id and job.worker == "w2" and job.attempts == 2
+    assert not q.advance(stale, "crashed", "llm", None)   # the old lease holder lost the job
+    assert q.advance(job, "w2", "llm", None)
+
+
+def test_expired_lease_fails_after_max_attempts(tmp_path):
+    q = make_queue(tmp_path, lease=-1.0, max_attempts=2)
+    job_id = q.submit("a.wav")
+
+    assert q.claim("asr", "w1") is not None
+    assert q.claim("asr", "w2") is not None
+    assert q.claim("asr", "w3") is None                  # attempts used up
+    job = q.get(job_id)
+    assert job.status == JOB_FAILED and job.error == "lease expired" and job.attempts == 2
+    assert q.stats() == {JOB_FAILED: 1}
+
+
+def test_exhausted_lease_does_not_block_other_jobs(tmp_path):
+    q = make_queue(tmp_path, lease=-1.0, max_attempts=1)
+    stuck = q.submit("a.wav")
+    q.claim("asr", "w1")
+    fresh = q.submit("b.wav")
+
+    assert q.claim("asr", "w2").id == fresh
+    assert q.get(stuck).status == JOB_FAILED
+
+
+def test_old_sqlite_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(sqlite3, "sqlite_version_info", (3, 31, 1))
+    with pytest.raises(RuntimeError, match="3.35"):
+        make_queue(tmp_path)
@@ -0,0 +1,76 @@
+import asyncio
+
+from app.agents.llm_backend import BaseLLMAgent, LLMCompletion
+
+
+class FakeStream:
+    def __init__(self, model):
+        self.model = model
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+class FakeAgent(BaseLLMAgent):
+    backend = "fake"
+
+    def __init__(self, delays, **kwargs):
+        super().__init__("m0", fallback_models=[f"m{i}" for i in range(1, len(delays))], **kwargs)
+        self.delays = delays
+        self.streams = []
+
+    async def _call(self, model, messages, temperature=0.2, max_tokens=700, stream=False):
+        await asyncio.sleep(self.delays[int(model[1:])])
+        if stream:
+            self.streams.append(FakeStream(model))
+            return self.streams[-1]
+        return LLMCompletion(text=model, model=model)
+
+
+def test_hedges_finishing_together_close_the_loser():
+    agent = FakeAgent([0.05, 0.0], hedge_after=0.05)
+
+    async def run():
+        stream = await agent._complete([], stream=True)
+        await asyncio.sleep(0)
+        return stream
+
+    winner = asyncio.run(run())
+    assert len(agent.streams) == 2
+    assert not winner.closed
+    assert [s.closed for s in agent.streams if s is not winner] == [True]
+
+
+def test_slow_hedge_is_cancelled():
+    agent = FakeAgent([0.01, 1.0], hedge_after=0.005)
+    winner = asyncio.run(agent._complete([], stream=True))
+    assert winner.model == "m0" and agent.streams == [winner]
+
+
+class FailingAgent(FakeAgent):
+    def __init__(self):
+        super().__init__([0.0])
+        self.started = self.finished = 0
+
+    async def _call(self, model, messages, temperature=0.2, max_tokens=700, stream=False):
+        self.started += 1
+        if self.started == 1:
+            raise ValueError("boom")
+        await asyncio.sleep(0.05)
+        self.finished += 1
+        return LLMCompletion(text="facts", model=model)
+
+
+def test_map_failure_cancels_the_other_calls():
+    agent = FailingAgent()
+
+    async def run():
+        try:
+            await agent.aextract_facts(["a", "b", "c"], max_concurrency=3)
+        except ValueError:
+            pass
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert agent.started == 3 and agent.finished == 0
@@ -0,0 +1,59 @@
+from app.core.metrics import Metrics, _Histogram
+
+
+def test_histogram_buckets_and_quantile():
+    h = _Histogram((0.1, 1.0, 10.0))
+    for v in (0.05, 0.1, 0.5, 0.7, 5.0, 50.0):
+        h.observe(v)
+    assert h.counts == [2, 2, 1, 1]      # le is inclusive; last bucket is +Inf
+    assert h.count == 6 and abs(h.sum - 56.35) < 1e-9
+    assert h.quantile(0.33) == 0.1
+    assert h.quantile(0.5) == 1.0
+    assert h.quantile(0.8) == 10.0
+    assert h.quantile(1.0) == float("inf")
+    assert _Histogram((1.0,)).quantile(0.5) == 0.0
+
+
+def test_prometheus_text():
+    m = Metrics(buckets=(0.5, 1.0))
+    m.describe("jobs_total", "Jobs done")
+    m.inc("jobs_total", status="ok")
+    m.inc("jobs_total", 2, status="ok")
+    m.set_gauge("queue_depth", 3)
+    m.observe("stage_seconds", 0.2, stage="asr")
+    m.observe("stage_seconds", 2.0, stage="asr")
+
+    lines = m.to_prometheus().splitlines()
+    assert lines[:3] == ["# HELP jobs_total Jobs done", "# TYPE jobs_total counter", 'jobs_total{status="ok"} 3.0']
+    assert "# TYPE queue_depth gauge" in lines and "queue_depth 3.0" in lines
+    i = lines.index("# TYPE stage_seconds histogram")
+    assert lines[i + 1:] == [
+        'stage_seconds_bucket{stage="asr",le="0.5"} 1',
+        'stage_seconds_bucket{stage="asr",le="1"} 1',
+        'stage_seconds_bucket{stage="asr",le="+Inf"} 2',
+        'stage_seconds_sum{stage="asr"} 2.2',
+        'stage_seconds_count{stage="asr"} 2',
+    ]
+
+
+def test_label_values_are_escaped():
+    m = Metrics()
+    m.inc("errors_total", error='bad "x"\\y\nz')
+    assert 'errors_total{error="bad \\"x\\"\\\\y\\nz"} 1.0' in m.to_prometheus()
+
+
+def test_process_cpu_is_exported_as_counters():
+    m = Metrics()
+    m.sample_process()
+    text = m.to_prometheus()
+    assert "# TYPE ics_process_cpu_user_seconds_total counter" in text
+    assert "# TYPE ics_process_resident_memory_bytes gauge" in text
+
+
+def test_disabled_metrics_record_nothing():
+    m = Metrics(enabled=False)
+    m.inc("a")
+    m.observe("b", 1.0)
+    with m.timer("c"):
+        pass
+    assert m.to_prometheus() == "\n"
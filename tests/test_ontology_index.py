@@ -0,0 +1,76 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.kb.ontology_index import OntologyIndex, load_or_build
+
+ONTOLOGY = {
+    "symptoms": {"fever": ["fever", "high temperature"], "cough": ["cough"]},
+    "drugs": {"paracetamol": ["paracetamol", "acetaminophen"]},
+}
+
+
+def write_ontology(path, ontology=ONTOLOGY):
+    path.write_text(json.dumps(ontology), encoding="utf-8")
+    return str(path)
+
+
+def test_save_and_memory_map_round_trip(tmp_path):
+    built = OntologyIndex.build(ONTOLOGY)
+    path = str(tmp_path / "onto.idx")
+    built.save(path)
+    loaded = OntologyIndex.load(path)
+
+    assert isinstance(loaded.arrays["edge_key"].base, np.memmap)
+    assert loaded.stats() == built.stats()
+    assert loaded.categories == ["symptoms", "drugs"]
+    for name, arr in built.arrays.items():
+        assert np.array_equal(loaded.arrays[name], arr), name
+    state = 0
+    for tid in loaded.token_ids(["high", "temperature"]):
+        state = loaded.step(state, tid)
+    assert list(loaded.outputs(state)) == [("symptoms", "fever", "high temperature", 2)]
+    assert loaded.token_ids(["nope"]) == [-1]
+
+
+def test_load_or_build_reuses_until_the_source_changes(tmp_path):
+    source = write_ontology(tmp_path / "onto.json")
+    index_path = str(tmp_path / "onto.idx")
+    first = load_or_build(source, index_path)
+    built_at = first.header["built_at"]
+
+    # same size and mtime: mapped as is
+    assert load_or_build(source, index_path).header["built_at"] == built_at
+
+    # touched but identical content: the sha256 still matches
+    st = os.stat(source)
+    os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert load_or_build(source, index_path).header["built_at"] == built_at
+
+    # edited: stale, rebuilt
+    write_ontology(tmp_path / "onto.json", {**ONTOLOGY, "signs": {"rash": ["rash"]}})
+    rebuilt = load_or_build(source, index_path)
+    assert rebuilt.header["built_at"] != built_at and "signs" in rebuilt.categories
+    assert OntologyIndex.read_header(index_path)["source"]["sha256"] == rebuilt.source_sha256
+
+
+@pytest.mark.parametrize("damage", ["garbage", "truncated", "version"])
+def test_corrupt_index_is_rejected_and_rebuilt(tmp_path, damage):
+    source = write_ontology(tmp_path / "onto.json")
+    index_path = tmp_path / "onto.idx"
+    load_or_build(source, str(index_path))
+    raw = index_path.read_bytes()
+    if damage == "garbage":
+        index_path.write_bytes(b"not an index at all")
+    elif damage == "truncated":
+        index_path.write_bytes(raw[:len(raw) - 64])
+    else:
+        index_path.write_bytes(raw[:6] + b"\x63\x00" + raw[8:])
+
+    with pytest.raises(ValueError):
+        OntologyIndex.load(str(index_path))
+    index = load_or_build(source, str(index_path))
+    assert index.stats()["terms"] == 5
+    assert OntologyIndex.load(str(index_path)).stats() == index.stats()
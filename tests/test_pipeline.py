@@ -0,0 +1,202 @@
+import shutil
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from app.agents.asr_agent import ASRResult, ASRStream
+from app.bench.mock_llm_server import STUB_SOAP_NOTE, MockLLMServer
+from app.config.prompts import repair_instructions
+from app.config.settings import Settings
+from app.core.pipeline import ClinicalDocPipeline, transcript_chunks
+from app.core.state_machine import StateMachine
+
+KB = Path(__file__).resolve().parent.parent / "app" / "kb"
+
+TRANSCRIPT = (
+    "Doctor: What brings you in? Patient: I have had a sore throat and a cough for three days, "
+    "and a mild fever at night. No headache. Doctor: Your temperature is 37.9, the pharynx is "
+    "erythematous and the lungs are clear. This is likely a viral upper respiratory infection. "
+    "Take paracetamol as needed, fluids and rest, and return if symptoms worsen or persist beyond a week."
+)
+SEGMENTS = [{"start": 0.0, "end": 4.0, "text": TRANSCRIPT[:90]}, {"start": 4.0, "end": 9.0, "text": TRANSCRIPT[90:]}]
+
+
+def make_pipeline(tmp_path, **overrides):
+    ontology = tmp_path / "ontology.json"
+    shutil.copy(KB / "ontology_stub.json", ontology)
+    params = dict(
+        llm_backend="openai",
+        llm_base_url="http://127.0.0.1:9/v1",
+        llm_api_key="test",
+        llm_model="mock",
+        llm_max_retries=0,
+        cache_enabled=False,
+        cache_path=str(tmp_path / "cache.sqlite3"),
+        ontology_path=str(ontology),
+        rules_path=str(KB / "rules.yaml"),
+        metrics_path="",
+    )
+    params.update(overrides)
+    return ClinicalDocPipeline(Settings(**params))
+
+
+def states(out):
+    return [(e["to_state"], e["action"]) for e in out.meta["state_log"]]
+
+
+class StubLLM:
+    """
+    Answers generate_soap with notes[i] on the i-th call (the last one from then on).
+    """
+    model = "stub"
+
+    def __init__(self, notes, delay=0.0):
+        self.notes = notes
+        self.delay = delay
+        self.calls = []
+
+    def fingerprint(self):
+        return {"model": self.model}
+
+    def generate_soap(self, transcript, repair=None, previous=None, timeout=None, stats=None, facts=None):
+        self.calls.append({"repair": repair, "previous": previous})
+        time.sleep(self.delay)
+        return self.notes[min(len(self.calls), len(self.notes)) - 1]
+
+    def extract_facts(self, excerpts, max_concurrency=4, timeout=None, stats=None):
+        self.calls.append({"excerpts": list(excerpts)})
+        if stats is not None:
+            stats["map_calls"] = len(excerpts)
+        return [f"facts: {e[:10]}" for e in excerpts]
+
+
+def test_regenerate_stops_at_the_attempt_limit(tmp_path):
+    pipeline = make_pipeline(tmp_path, llm_regen_max_attempts=3, llm_regen_deadline=0)
+    pipeline.llm_agent = StubLLM(["S: sore throat"])
+    out = pipeline.run_from_asr(ASRResult(TRANSCRIPT, "en", SEGMENTS, None, None))
+
+    assert len(pipeline.llm_agent.calls) == 3
+    assert out.sup.action == "HUMAN_REVIEW"
+    assert out.sup.reasons["regenerate_exhausted"] == "max_attempts" and out.sup.reasons["attempts"] == 3
+    assert [a for s, a in states(out)].count("u_regenerate") == 2
+    assert states(out)[-3:] == [("S_SUP", "u_escalate"), ("S_STD", "u_std"), ("S_final", "u_finalize")]
+
+
+def test_regenerate_stops_at_the_deadline(tmp_path):
+    # an attempt takes 0.06 s: after the first, the 0.1 s budget cannot fit another
+    pipeline = make_pipeline(tmp_path, llm_regen_max_attempts=5, llm_regen_deadline=0.1)
+    pipeline.llm_agent = StubLLM(["S: sore throat"], delay=0.06)
+    out = pipeline.run_from_asr(ASRResult(TRANSCRIPT, "en", SEGMENTS, None, None))
+
+    assert len(pipeline.llm_agent.calls) == 1
+    assert out.sup.action == "HUMAN_REVIEW"
+    assert out.sup.reasons["regenerate_exhausted"] == "deadline"
+
+
+def test_regenerate_sends_repair_instructions_and_previous_note(tmp_path):
+    pipeline = make_pipeline(tmp_path, llm_regen_max_attempts=3, llm_regen_deadline=0)
+    pipeline.llm_agent = StubLLM(["S: sore throat", STUB_SOAP_NOTE])
+    short = pipeline.sup_agent.decide(TRANSCRIPT, "S: sore throat")
+    assert short.action == "REGENERATE" and short.reasons["code"] == "too_short"
+
+    out = pipeline.run_from_asr(ASRResult(TRANSCRIPT, "en", SEGMENTS, None, None))
+    first, second = pipeline.llm_agent.calls
+    assert first == {"repair": None, "previous": None}
+    assert second == {"repair": repair_instructions(short.reasons), "previous": "S: sore throat"}
+    assert out.soap_note == STUB_SOAP_NOTE and out.sup.action == "APPROVE"
+
+
+@pytest.fixture(scope="module")
+def mock_llm():
+    with MockLLMServer(latency=0.0) as server:
+        yield server
+
+
+class FakeWhisper:
+    def transcribe(self, audio, **options):
+        segments = [SimpleNamespace(**seg) for seg in SEGMENTS]
+        return iter(segments), SimpleNamespace(language="en", duration=9.0)
+
+
+class StubASR:
+    def stream(self, audio_path, language="en"):
+        return ASRStream(FakeWhisper(), audio_path, {}, "stub")
+
+
+def test_run_from_asr_against_mock_server(tmp_path, mock_llm):
+    pipeline = make_pipeline(tmp_path, llm_base_url=mock_llm.openai_url)
+    t0 = time.perf_counter()
+    out = pipeline.run_from_asr(ASRResult(TRANSCRIPT, "en", SEGMENTS, None, None))
+    assert time.perf_counter() - t0 < 0.1
+
+    assert out.soap_note == STUB_SOAP_NOTE
+    assert out.sup.action == "APPROVE"
+    assert states(out) == [("S_ASR", "u_asr"), ("S_LLM", "u_llm"), ("S_SUP", "u_sup"),
+                           ("S_STD", "u_std"), ("S_final", "u_finalize")]
+    assert out.std.entities
+
+
+def test_streaming_events_against_mock_server(tmp_path, mock_llm):
+    audio = tmp_path / "visit.wav"
+    audio.write_bytes(b"not decoded by the stub")
+    pipeline = make_pipeline(tmp_path, llm_base_url=mock_llm.openai_url, cache_enabled=True)
+    pipeline._asr_agent = StubASR()
+
+    t0 = time.perf_counter()
+    events = list(pipeline.run_full_streaming(str(audio)))
+    assert time.perf_counter() - t0 < 0.1
+
+    kinds = [e.kind for e in events]
+    assert kinds[:3] == ["segment", "segment", "asr"] and kinds[-1] == "done"
+    assert "".join(e.data for e in events if e.kind == "token") == STUB_SOAP_NOTE
+    assert [e.data["section"] for e in events if e.kind == "section"] == ["S", "O", "A", "P"]
+    out = events[-1].data
+    assert out.asr.text == TRANSCRIPT and out.soap_note == STUB_SOAP_NOTE
+
+    # second run: ASR and SOAP come from the cache, the note arrives as one token
+    again = list(pipeline.run_full_streaming(str(audio)))
+    assert [e.kind for e in again] == ["asr", "token"] + ["section"] * 4 + ["done"]
+    assert again[1].data == STUB_SOAP_NOTE
+    assert [e["to_state"] for e in again[-1].data.meta["state_log"]] == [e["to_state"] for e in out.meta["state_log"]]
+
+
+def test_transcript_chunks_split_on_segment_boundaries():
+    segments = [{"text": f" segment {i} " + "x" * 20} for i in range(10)]
+    chunks = transcript_chunks("ignored", segments, max_chars=70)
+    pieces = [seg["text"].strip() for seg in segments]
+    assert chunks == [" ".join(pieces[i:i + 2]) for i in range(0, 10, 2)]
+    assert all(len(c) <= 70 for c in chunks)
+
+    # no overlap and nothing lost: every segment is in exactly one excerpt, in order
+    assert " ".join(chunks) == " ".join(pieces)
+    # a segment longer than max_chars is its own excerpt, never cut
+    assert transcript_chunks("", [{"text": "a" * 100}, {"text": "b"}], 50) == ["a" * 100, "b"]
+
+
+def test_transcript_chunks_fall_back_to_sentences():
+    text = "Sore throat. Since Monday!  Any fever? No."
+    assert transcript_chunks(text, None, 20) == ["Sore throat.", "Since Monday!", "Any fever? No."]
+    assert transcript_chunks(text, [], 1000) == [text.replace("  ", " ")]
+
+
+def test_map_facts_caches_per_excerpt(tmp_path):
+    pipeline = make_pipeline(tmp_path, cache_enabled=True, llm_map_reduce_chars=50, llm_chunk_chars=60)
+    pipeline.llm_agent = agent = StubLLM([""])
+    segments = [{"text": f"part {i}: " + "y" * 40} for i in range(4)]
+    transcript = " ".join(s["text"] for s in segments)
+
+    facts = pipeline._map_facts(StateMachine(), transcript, segments)
+    assert len(facts) == 4 and agent.calls[-1]["excerpts"] == [s["text"] for s in segments]
+
+    # one segment changed: only its excerpt goes to the LLM again
+    segments[2] = {"text": "part 2: changed " + "z" * 30}
+    sm = StateMachine()
+    again = pipeline._map_facts(sm, " ".join(s["text"] for s in segments), segments)
+    assert agent.calls[-1]["excerpts"] == [segments[2]["text"]]
+    assert again[:2] == facts[:2] and again[3] == facts[3] and again[2] != facts[2]
+    assert sm.log[-1].details["cached"] == 3
+
+    assert pipeline._map_facts(StateMachine(), "short", None) is None
+    assert len(agent.calls) == 2
@@ -0,0 +1,67 @@
+import time
+
+from app.storage.db import ResultCache, TierPolicy, encode
+
+
+def make_cache(tmp_path, touch_interval=0.0, **tiers):
+    return ResultCache(str(tmp_path / "cache.db"), tiers, touch_interval=touch_interval)
+
+
+def test_roundtrip_and_tiers_are_separate(tmp_path):
+    cache = make_cache(tmp_path, asr=TierPolicy(), soap=TierPolicy())
+    cache.put("asr", "k", {"text": "hello"})
+    assert cache.get("asr", "k") == {"text": "hello"}
+    assert cache.get("soap", "k") is None
+
+
+def test_evicts_least_recently_accessed(tmp_path):
+    size = len(encode("x" * 100))
+    cache = make_cache(tmp_path, soap=TierPolicy(max_bytes=3 * size))
+    for key in "abc":
+        cache.put("soap", key, "x" * 100)
+        time.sleep(0.01)
+    cache.get("soap", "a")            # a is now more recent than b
+    time.sleep(0.01)
+    cache.put("soap", "d", "x" * 100)
+
+    assert cache.get("soap", "b") is None
+    assert all(cache.get("soap", k) is not None for k in "acd")
+    assert cache.stats()["soap"] == {"entries": 3, "bytes": 3 * size}
+
+
+def test_eviction_is_per_tier(tmp_path):
+    size = len(encode("x" * 100))
+    cache = make_cache(tmp_path, asr=TierPolicy(max_bytes=size), std=TierPolicy())
+    cache.put("std", "keep", "x" * 100)
+    cache.put("asr", "a", "x" * 100)
+    cache.put("asr", "b", "x" * 100)
+    assert cache.get("asr", "a") is None and cache.get("asr", "b") is not None
+    assert cache.get("std", "keep") is not None
+
+
+def test_oversized_values_are_not_stored(tmp_path):
+    cache = make_cache(tmp_path, asr=TierPolicy(max_bytes=10))
+    cache.put("asr", "k", "x" * 1000 + "y" * 1000)
+    assert cache.get("asr", "k") is None
+
+
+def test_ttl_expiry(tmp_path):
+    cache = make_cache(tmp_path, std=TierPolicy(ttl=0.05))
+    cache.put("std", "k", 1)
+    assert cache.get("std", "k") == 1
+    time.sleep(0.06)
+    assert cache.get("std", "k") is None
+    assert cache.stats() == {}
+
+
+def test_reads_refresh_access_time_at_most_once_per_interval(tmp_path):
+    cache = make_cache(tmp_path, touch_interval=3600, soap=TierPolicy())
+    cache.put("soap", "k", "v")
+    accessed = lambda: cache._conn().execute("SELECT accessed_at FROM cache_entries").fetchone()[0]
+    before = accessed()
+    assert cache.get("soap", "k") == "v"
+    assert accessed() == before
+    cache.touch_interval = 0.0
+    time.sleep(0.01)
+    cache.get("soap", "k")
+    assert accessed() > before
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from app.core.ring_buffer import AudioRingBuffer
+from app.ui.streaming_asr import StreamingASRSession
+
+
+@pytest.mark.parametrize("contiguous", [False, True])
+def test_writes_wrap_around_the_end(contiguous):
+    ring = AudioRingBuffer(1.0, sample_rate=10, contiguous=contiguous)
+    data = np.arange(1, 38, dtype=np.int16)
+    for part in np.split(data, [7, 14, 21, 30]):      # 7-sample writes cross the 10-sample end
+        ring.write(part)
+        assert np.array_equal(ring.view(), data[:ring.total][-ring.capacity:])
+
+    assert ring.total == 37 and ring.start == 27 and ring.dropped == 27
+    assert np.array_equal(ring.view(29, 35), data[29:35])       # spans the wrap point
+    assert np.array_equal(ring.view(0, 5), data[:0])            # already overwritten
+    assert np.array_equal(ring.latest(0.4), data[-4:])
+    parts = ring.segments(28, 37)
+    assert len(parts) == (1 if contiguous else 2)
+    assert np.array_equal(np.concatenate(parts), data[28:37])
+
+
+def test_oversized_write_keeps_the_newest_samples():
+    ring = AudioRingBuffer(1.0, sample_rate=10)
+    ring.write(np.arange(3, dtype=np.int16))
+    ring.write(np.arange(100, 125, dtype=np.int16))
+    assert ring.total == 28 and ring.dropped == 18
+    assert np.array_equal(ring.view(), np.arange(115, 125))
+
+
+def test_float_and_stereo_input_is_downmixed_to_int16():
+    ring = AudioRingBuffer(1.0, sample_rate=10)
+    ring.write(np.array([[0.5, -2.0], [0.5, 0.0]], dtype=np.float32))
+    ring.write(np.array([[100, 7], [300, 8]], dtype=np.int16))
+    assert ring.view().tolist() == [16383, -32767, 200, 7]
+
+
+def test_popped_chunk_survives_ring_overwrite():
+    session = StreamingASRSession(sample_rate=10, chunk_seconds=1.0, vad=None,
+                                  ring_seconds=1.0, hard_window_seconds=0.0)
+    session.ring.write(np.arange(10, dtype=np.int16))
+    chunk = session.pop_chunk_if_ready()
+    assert chunk.tolist() == list(range(10))
+    session.ring.write(np.full(40, -1, dtype=np.int16))         # wraps over the chunk's samples
+    assert chunk.tolist() == list(range(10))
+    assert session.last_chunk_pcm is chunk
@@ -0,0 +1,139 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from app.agents.supervisor_agent import SupervisorAgent
+from app.core.decision_policy import CompiledRules, Rule, RuleEngine
+
+RULES_PATH = str(Path(__file__).resolve().parent.parent / "app" / "kb" / "rules.yaml")
+
+BODY = "S: Sore throat for three days.\nO: Temperature 38.5, red throat.\nA: Viral pharyngitis.\nP: Fluids, rest, paracetamol. "
+
+
+def legacy_decide(note, min_length=150, max_length=4000):
+    """
+    SupervisorAgent.decide before the rule engine (as configured by the pipeline).
+    """
+    n = len(note.strip())
+    if n < min_length:
+        return "REGENERATE", "SOAP note too short"
+    if n > max_length:
+        return "REGENERATE", "SOAP note too long"
+    if not all(r in note for r in ["S:", "O:", "A:", "P:"]):
+        return "REGENERATE", "Missing SOAP sections (S/O/A/P)"
+    markers = ["I assume", "maybe", "probably", "might be", "not sure"]
+    if sum(1 for m in markers if m.lower() in note.lower()) >= 3:
+        return "HUMAN_REVIEW", "Too many uncertainty markers"
+    return "APPROVE", None
+
+
+NOTES = [
+    BODY + "Return if worse.",
+    "S: cough. O: none. A: cold. P: rest.",
+    BODY * 40,
+    BODY.replace("A:", "Assessment -"),
+    BODY.replace("O:", "o:"),
+    BODY + "Maybe viral, probably self-limiting, not sure about strep.",
+    BODY + "Maybe viral, probably self-limiting.",
+    BODY + "MAYBE viral, PROBABLY benign, I ASSUME no allergies.",
+    BODY + "Improbably bacterial; maybeline? Not surely.",
+    BODY + "Symptoms might be\nviral, maybe, probably.",
+    ("maybe probably not sure " * 3)[:100],
+]
+
+
+@pytest.mark.parametrize("note", NOTES)
+def test_default_rules_reproduce_legacy_decisions(note):
+    sup = SupervisorAgent(rules_path=RULES_PATH)
+    decision = sup.decide_batch([None], [note])[0]
+    assert (decision.action, decision.reasons.get("problem")) == legacy_decide(note)
+    assert sup.decide(None, note).action == decision.action
+
+
+def write_rules(path, text):
+    path.write_text(text, encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))   # a visible mtime change
+
+
+SHORT_FIRST = """
+rules:
+  - {id: too_short, type: length, min: 50, action: REGENERATE}
+  - {id: hedging, type: lexicon, terms: [maybe], threshold: 1, action: HUMAN_REVIEW}
+"""
+
+
+def test_first_failing_rule_in_file_order_decides(tmp_path):
+    path = tmp_path / "rules.yaml"
+    write_rules(path, SHORT_FIRST)
+    sup = SupervisorAgent(rules_path=str(path))
+    assert sup.decide("", "maybe").reasons["code"] == "too_short"
+    assert set(sup.decide("", "maybe").reasons["scores"]) == {"too_short", "hedging"}
+
+    too_short, hedging = SHORT_FIRST.strip().splitlines()[1:]
+    write_rules(path, "\n".join(["rules:", hedging, too_short]))
+    sup = SupervisorAgent(rules_path=str(path))
+    assert sup.decide("", "maybe").reasons["code"] == "hedging"
+
+
+def test_hot_reload_and_malformed_file_keeps_previous_rules(tmp_path):
+    path = tmp_path / "rules.yaml"
+    write_rules(path, SHORT_FIRST)
+    engine = RuleEngine(str(path), reload_interval=0)
+    assert engine.compiled.ids == ["too_short", "hedging"]
+    fingerprint = engine.fingerprint()
+
+    write_rules(path, SHORT_FIRST.replace("min: 50", "min: 10"))
+    assert engine.maybe_reload()
+    assert engine.compiled.rules[0].params["min"] == 10
+    assert engine.fingerprint() != fingerprint
+
+    for broken in ["rules: [ {id: x", "rules:\n  - {id: x, type: nope}", "rules: {id: x}"]:
+        write_rules(path, broken)
+        assert not engine.maybe_reload()
+        assert engine.last_error
+        assert engine.compiled.ids == ["too_short", "hedging"]
+        assert [r.passed for r in engine.evaluate("maybe")] == [False, False]
+
+    write_rules(path, SHORT_FIRST)
+    assert engine.maybe_reload() and engine.last_error is None
+
+
+def test_overrides_apply_on_reload(tmp_path):
+    path = tmp_path / "rules.yaml"
+    write_rules(path, SHORT_FIRST)
+    sup = SupervisorAgent(min_length=5, rules_path=str(path), reload_interval=0)
+    write_rules(path, SHORT_FIRST.replace("min: 50", "min: 500"))
+    assert sup.decide("", "fine note").action == "APPROVE"
+
+
+def test_combined_scan_matches_per_rule_semantics():
+    rules = CompiledRules([
+        Rule("sections", "sections", "REGENERATE", "", {"required": ["S:", "P:"]}),
+        Rule("substr", "lexicon", "HUMAN_REVIEW", "", {"terms": ["maybe", "not sure"], "threshold": 1}),
+        Rule("words", "lexicon", "HUMAN_REVIEW", "", {"terms": ["maybe", "not sure"], "threshold": 1,
+                                                      "whole_words": True}),
+    ])
+    by_id = lambda results: {r.id: r.value for r in results}
+    assert by_id(rules.evaluate("s: p: Maybeline")) == {"sections": 0, "substr": 1, "words": 0}
+    assert by_id(rules.evaluate("S: P: maybe, NOT  SURE")) == {"sections": 2, "substr": 2, "words": 2}
+
+    notes = ["S: maybe", "P: maybeline", "", "not sure S: P:"]
+    batch = rules.evaluate_batch(notes)
+    assert [by_id(row) for row in batch.results] == [by_id(rules.evaluate(n)) for n in notes]
+    assert batch.failed().tolist() == [0, 0, 0, 1]
+
+
+def test_disabled_rules_are_skipped():
+    rules = CompiledRules([Rule("too_short", "length", "REGENERATE", "", {"min": 10, "enabled": False})])
+    assert rules.ids == [] and rules.evaluate("x") == []
+
+
+def test_length_rule_checks_both_bounds():
+    rules = CompiledRules([Rule("length", "length", "REGENERATE", "", {"min": 5, "max": 10})])
+    assert [(r.passed, r.value) for r in rules.evaluate("abc")] == [(False, 3)]
+    assert [(r.passed, r.value) for r in rules.evaluate("abcdefg")] == [(True, 7)]
+    long = rules.evaluate("x" * 20)[0]
+    assert not long.passed and long.score == 0.5
+    assert long.details == {"min_length": 5, "max_length": 10}
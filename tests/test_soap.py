@@ -0,0 +1,42 @@
+from app.core.soap import SOAPSectionStream, split_soap_sections
+
+NOTE = (
+    "**S: Subjective**\nSore throat for three days.\n"
+    "O (Objective): Temperature 38.5.\n"
+    "## Assessment\nViral pharyngitis.\n"
+    "P - Plan: Fluids and rest."
+)
+
+
+def stream(deltas):
+    s = SOAPSectionStream()
+    out = []
+    for d in deltas:
+        out += s.feed(d)
+    return out + s.close()
+
+
+def test_stream_matches_one_shot_split():
+    expected = split_soap_sections(NOTE)
+    assert [sec.letter for sec in expected] == ["S", "O", "A", "P"]
+    for size in (1, 2, 3, 7, 16, len(NOTE)):
+        deltas = [NOTE[i:i + size] for i in range(0, len(NOTE), size)]
+        assert stream(deltas) == expected, size
+
+
+def test_header_split_across_deltas():
+    s = SOAPSectionStream()
+    assert s.feed("S: cough\nO") == []
+    assert s.feed("bjec") == []
+    done = s.feed("tive: clear chest\nA: viral\n")
+    assert [(sec.letter, sec.body(s.text)) for sec in done] == [("S", "cough"), ("O", "clear chest")]
+    assert [sec.letter for sec in s.close()] == ["A"]
+
+
+def test_sections_are_emitted_once_completed():
+    s = SOAPSectionStream()
+    assert s.feed("S: a\n") == []            # S may still grow
+    assert [sec.letter for sec in s.feed("O: b\n")] == ["S"]
+    assert s.feed("more of O\n") == []
+    last = s.close()
+    assert [sec.letter for sec in last] == ["O"] and last[0].body(s.text) == "b\nmore of O"
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import pytest
+
+from app.core.metrics import get_metrics
+from app.core.soap_drafter import IncrementalSOAPDrafter
+
+
+class StubAgent:
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+
+    async def aupdate_soap(self, draft, text, stats=None):
+        self.calls.append(text)
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("rate limited")
+        return f"{draft}\n{text}".strip()
+
+
+def wait(drafter):
+    while drafter.busy:
+        time.sleep(0.001)
+
+
+def draft_updates(outcome):
+    series = get_metrics().snapshot()["counters"].get("ics_draft_updates_total", {})
+    return series.get(f'{{outcome="{outcome}"}}', 0.0)
+
+
+def test_waits_for_enough_words_or_a_pause():
+    agent = StubAgent()
+    drafter = IncrementalSOAPDrafter(agent, min_new_words=5, debounce_s=0.05)
+    assert not drafter.poll()                      # nothing committed yet
+    drafter.feed("sore throat")
+    assert not drafter.poll()                      # 2 words, no pause yet
+    time.sleep(0.06)
+    assert drafter.poll()                          # ... then the speaker paused
+    wait(drafter)
+    assert agent.calls == ["sore throat"] and drafter.pending == ""
+
+    drafter.feed("since monday with a mild fever")
+    assert drafter.poll()                          # 6 new words: no need to wait
+    wait(drafter)
+    assert drafter.draft == "sore throat\nsince monday with a mild fever"
+    assert drafter.updates == 2
+
+
+def test_text_fed_during_an_update_is_coalesced():
+    agent = StubAgent(delay=0.05)
+    drafter = IncrementalSOAPDrafter(agent, min_new_words=1, debounce_s=10)
+    drafter.feed("cough")
+    assert drafter.poll()
+    for text in ("for three", "days", "no fever"):
+        drafter.feed(text)
+        assert not drafter.poll()                  # one update at a time
+    wait(drafter)
+    assert drafter.pending == "for three days no fever"
+    assert drafter.poll()
+    wait(drafter)
+    assert agent.calls == ["cough", "for three days no fever"]
+
+
+def test_failed_update_is_counted_and_backed_off():
+    before = draft_updates("error")
+    agent = StubAgent(fail=True)
+    drafter = IncrementalSOAPDrafter(agent, min_new_words=1, debounce_s=0.05)
+    drafter.feed("headache")
+    assert drafter.poll()
+    wait(drafter)
+    assert drafter.error == "RuntimeError: rate limited"
+    assert draft_updates("error") == before + 1
+    assert drafter.draft == "" and drafter.pending == "headache"
+
+    assert not drafter.poll()                      # backing off
+    time.sleep(0.06)
+    agent.fail = False
+    assert drafter.poll()
+    wait(drafter)
+    assert drafter.error is None and drafter.draft == "headache"
+
+
+def test_finish_drafts_the_rest():
+    agent = StubAgent(delay=0.01)
+    drafter = IncrementalSOAPDrafter(agent, min_new_words=100, debounce_s=10)
+    drafter.feed("fever")
+    assert drafter.finish(timeout=1.0) == "fever"
+    assert drafter.finish(timeout=1.0) == "fever" and len(agent.calls) == 1   # nothing left
+
+    slow = IncrementalSOAPDrafter(StubAgent(delay=0.5), min_new_words=100, debounce_s=10)
+    slow.feed("rash")
+    with pytest.raises(FutureTimeout):
+        slow.finish(timeout=0.01)
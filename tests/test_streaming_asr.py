@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.ui.streaming_asr import HypothesisBuffer, StreamingASRSession, TimedWord
+
+
+def words(*items):
+    """
+    items: (start, text) pairs; each word lasts 0.3 s.
+    """
+    return [TimedWord(start, start + 0.3, text) for start, text in items]
+
+
+def texts(ws):
+    return [w.text for w in ws]
+
+
+def test_commits_the_prefix_two_decodes_agree_on():
+    hyp = HypothesisBuffer()
+    assert hyp.insert(words((0.0, "the"), (0.4, "patient"), (0.8, "has"))) == []
+    assert texts(hyp.insert(words((0.0, "The"), (0.4, "patient,"), (0.8, "had"), (1.2, "a")))) == ["The", "patient,"]
+    assert texts(hyp.previous) == ["had", "a"]
+    assert hyp.last_committed_end == 0.7
+    assert texts(hyp.insert(words((0.8, "had"), (1.2, "a"), (1.6, "cough")))) == ["had", "a"]
+    assert texts(hyp.flush()) == ["cough"] and hyp.previous == []
+    assert texts(hyp.committed) == ["The", "patient,", "had", "a", "cough"]
+
+
+def test_re_decoded_overlap_is_trimmed():
+    hyp = HypothesisBuffer()
+    hyp.insert(words((0.0, "sore"), (0.4, "throat")))
+    hyp.insert(words((0.0, "sore"), (0.4, "throat")))
+    assert hyp.last_committed_end == 0.7
+
+    # the next window starts 1 s back: words before the committed end are skipped,
+    # and "throat" re-decoded with a drifted timestamp repeats the committed tail
+    again = words((0.0, "sore"), (0.65, "throat"), (1.0, "since"), (1.4, "monday"))
+    assert hyp.insert(again) == []
+    assert texts(hyp.previous) == ["since", "monday"]
+    assert texts(hyp.insert(words((0.65, "throat."), (1.0, "since"), (1.4, "Monday")))) == ["since", "Monday"]
+    assert texts(hyp.committed) == ["sore", "throat", "since", "Monday"]
+
+
+class DisagreeingASR:
+    """
+    A decoder that never repeats itself, so LocalAgreement never commits.
+    """
+
+    def __init__(self):
+        self.decoded_seconds = []
+
+    def transcribe(self, pcm, language=None, sample_rate=16000, initial_prompt=None, word_timestamps=False):
+        n = len(self.decoded_seconds)
+        self.decoded_seconds.append(pcm.shape[0] / sample_rate)
+        return SimpleNamespace(segments=[{"words": [{"start": 0.1, "end": 0.4, "word": f" w{n}"}]}])
+
+
+def test_window_is_hard_capped_without_agreement():
+    sr = 1000
+    session = StreamingASRSession(sample_rate=sr, chunk_seconds=1.0, vad=None,
+                                  max_window_seconds=5.0, hard_window_seconds=8.0)
+    asr = DisagreeingASR()
+    for _ in range(30):
+        session.ring.write(np.zeros(sr, dtype=np.int16))
+        assert session.process_incremental(asr)
+
+    assert max(asr.decoded_seconds) <= 8.0
+    assert asr.decoded_seconds[7] == 8.0           # grew to the cap, then restarted
+    assert asr.decoded_seconds[8] < 8.0
+    # the cap force-committed the pending words instead of waiting for agreement
+    assert session.full_text.startswith("w7")
+    assert session.finish().endswith("w29")
@@ -0,0 +1,47 @@
+from app.agents.term_matcher import TermMatcher
+
+MATCHER = TermMatcher.from_terms([
+    ("symptom", "common cold", "cold"),
+    ("symptom", "fever", "fever"),
+    ("symptom", "fever", "high temperature"),
+    ("symptom", "temperature", "temperature"),
+    ("symptom", "shortness of breath", "shortness of breath"),
+    ("symptom", "shortness of breath", "short of breath"),
+    ("drug", "paracetamol", "paracetamol"),
+    ("drug", "paracetamol", "acetaminophen"),
+])
+
+
+def spans(text, matches):
+    return [(text[m.start:m.end], m.canonical) for m in matches]
+
+
+def test_matches_whole_words_only():
+    text = "She scolded the colder child; a cold, then a Cold."
+    assert spans(text, MATCHER.find(text)) == [("cold", "common cold"), ("Cold", "common cold")]
+    assert MATCHER.find("feverish, paracetamols") == []
+
+
+def test_longest_match_wins():
+    text = "High temperature overnight, temperature now normal"
+    assert spans(text, MATCHER.find(text)) == [("High temperature", "fever"), ("temperature", "temperature")]
+    # find_all keeps the overlapped shorter term as well
+    assert spans(text, MATCHER.find_all(text))[:2] == [("High temperature", "fever"), ("temperature", "temperature")]
+    assert len(MATCHER.find_all(text)) == 3
+
+
+def test_multi_word_terms():
+    text = "Short of breath on exertion and shortness  of\tbreath at rest; took acetaminophen."
+    found = MATCHER.find(text)
+    assert spans(text, found) == [
+        ("Short of breath", "shortness of breath"),
+        ("shortness  of\tbreath", "shortness of breath"),
+        ("acetaminophen", "paracetamol"),
+    ]
+    assert [(m.token_start, m.token_end) for m in found] == [(0, 3), (6, 9), (12, 13)]
+    assert found[0].matched == "short of breath" and found[2].category == "drug"
+
+
+def test_terms_never_span_a_clause_break():
+    assert MATCHER.find("short of. breath") == []
+    assert MATCHER.find("high; temperature")[0].canonical == "temperature"
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from app.core.vad import EnergyVAD
+
+SR = 16000
+
+
+def signal(*parts):
+    """
+    parts: (seconds, is_tone) pairs; tone is 440 Hz at -13 dBFS over faint noise.
+    """
+    rng = np.random.default_rng(0)
+    out = []
+    for seconds, tone in parts:
+        n = int(seconds * SR)
+        x = rng.normal(0, 1e-4, n)
+        if tone:
+            x += 0.3 * np.sin(2 * np.pi * 440 * np.arange(n) / SR)
+        out.append(x)
+    return np.concatenate(out).astype(np.float32)
+
+
+def seconds(segments):
+    return [(round(s.start_s, 2), round(s.end_s, 2)) for s in segments]
+
+
+def test_silence_has_no_speech():
+    vad = EnergyVAD()
+    pcm = signal((3.0, False))
+    assert not vad.has_speech(pcm, SR)
+    assert vad.regions(pcm, SR) == [] and vad.segment(pcm, SR) == []
+    assert vad.next_chunk(pcm, SR) == (3 * SR - int(0.2 * SR), None)   # keeps a pad's worth
+
+
+def test_tone_burst_is_one_padded_region():
+    pcm = signal((1.0, False), (1.0, True), (1.0, False))
+    (region,) = EnergyVAD().regions(pcm, SR)
+    # frame-aligned (30 ms) speech, plus 200 ms padding on both sides
+    assert region.start_s == pytest.approx(0.8, abs=0.03)
+    assert region.end_s == pytest.approx(2.2, abs=0.03)
+    # the same with int16 input
+    assert seconds(EnergyVAD().regions((pcm * 32767).astype(np.int16), SR)) == seconds([region])
+
+
+def test_hangover_bridges_short_pauses_only():
+    vad = EnergyVAD(pad_ms=0)
+    short_gap = signal((0.5, False), (0.6, True), (0.2, False), (0.6, True), (0.5, False))
+    assert len(vad.regions(short_gap, SR)) == 1
+    long_gap = signal((0.5, False), (0.6, True), (0.8, False), (0.6, True), (0.5, False))
+    assert len(vad.regions(long_gap, SR)) == 2
+
+
+def test_bursts_shorter_than_min_speech_are_dropped():
+    pcm = signal((1.0, False), (0.09, True), (1.0, False))
+    assert EnergyVAD().regions(pcm, SR) == []
+    assert len(EnergyVAD(min_speech_ms=60).regions(pcm, SR)) == 1
+
+
+def test_short_regions_are_merged_into_chunks():
+    vad = EnergyVAD(pad_ms=0)
+    near = signal((0.5, False), (0.4, True), (0.9, False), (0.4, True), (0.5, False))
+    assert len(vad.regions(near, SR)) == 2
+    (chunk,) = vad.segment(near, SR)
+    assert (chunk.start_s, chunk.end_s) == pytest.approx((0.5, 2.2), abs=0.03)
+
+    far = signal((0.5, False), (0.4, True), (1.5, False), (0.4, True), (0.5, False))
+    assert len(vad.segment(far, SR)) == 2
+
+
+def test_long_speech_is_cut_at_max_chunk():
+    # enough silence for the adaptive noise floor (10th percentile of frame levels)
+    pcm = signal((2.0, False), (25.0, True), (2.0, False))
+    chunks = EnergyVAD(pad_ms=0).segment(pcm, SR)
+    assert len(chunks) == 2 and chunks[0].duration <= 20.0
+    assert chunks[0].end == chunks[1].start
+    assert chunks[1].end_s == pytest.approx(27.0, abs=0.03)
+
+
+def test_next_chunk_cuts_in_the_pause():
+    vad = EnergyVAD()
+    pending = signal((1.5, True), (1.0, False), (0.5, True))
+    consumed, speech = vad.next_chunk(pending, SR)
+    assert 1.5 < consumed / SR < 2.5                      # cut inside the pause
+    assert speech.start == 0 and speech.end_s == pytest.approx(1.7, abs=0.03)
+    assert vad.next_chunk(signal((0.5, True)), SR) == (0, None)   # no pause yet: keep buffering
@@ -0,0 +1,73 @@
+import struct
+import wave
+
+import numpy as np
+import pytest
+
+from app.core.wav import WavView
+
+
+def write_wav(path, pcm, sample_rate=16000, sampwidth=2):
+    channels = 1 if pcm.ndim == 1 else pcm.shape[1]
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(sampwidth)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm.tobytes())
+    return str(path)
+
+
+def read_with_wave(path, start, n):
+    with wave.open(path, "rb") as w:
+        w.setpos(start)
+        raw = w.readframes(n)
+        dtype = {1: "u1", 2: "<i2", 4: "<i4"}[w.getsampwidth()]
+        pcm = np.frombuffer(raw, dtype=dtype)
+        return pcm.reshape(-1, w.getnchannels()) if w.getnchannels() > 1 else pcm
+
+
+def raw_wav(path, audio_format, bits, channels=1, frames=10):
+    block = channels * bits // 8
+    fmt = struct.pack("<HHIIHH", audio_format, channels, 8000, 8000 * block, block, bits)
+    data = bytes(frames * block)
+    body = b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", len(data)) + data
+    path.write_bytes(b"RIFF" + struct.pack("<I", len(body)) + body)
+    return str(path)
+
+
+@pytest.mark.parametrize("channels", [1, 2])
+def test_chunks_match_the_wave_module(tmp_path, channels):
+    rng = np.random.default_rng(0)
+    shape = (40_123, channels) if channels > 1 else (40_123,)
+    path = write_wav(tmp_path / "a.wav", rng.integers(-32768, 32767, shape, dtype=np.int16))
+    view = WavView(path)
+    assert (view.frames, view.channels, view.sampwidth, view.sample_rate) == (40_123, channels, 2, 16000)
+    assert isinstance(view.pcm, np.memmap)
+
+    chunks = list(view.iter_chunks(1.0))
+    assert len(chunks) == 3 and chunks[-1].pcm.shape[0] == 40_123 - 32_000   # partial last chunk
+    for chunk in chunks:
+        start = int(round(chunk.start_s * 16000))
+        expected = read_with_wave(path, start, 16000)
+        assert np.array_equal(chunk.pcm, expected)
+        assert chunk.end_s == pytest.approx((start + expected.shape[0]) / 16000)
+    assert chunks[-1].end_s == pytest.approx(view.duration)
+
+
+def test_8_and_32_bit_are_mapped_in_their_own_dtype(tmp_path):
+    for sampwidth, dtype in ((1, np.uint8), (4, np.int32)):
+        pcm = np.arange(100, dtype=dtype)
+        view = WavView(write_wav(tmp_path / f"{sampwidth}.wav", pcm, sampwidth=sampwidth))
+        assert view.pcm.dtype == dtype and np.array_equal(view.pcm, pcm)
+
+
+@pytest.mark.parametrize("audio_format, bits", [(0x0006, 8), (0x0003, 64), (0x0055, 16)])
+def test_unsupported_encodings_are_rejected(tmp_path, audio_format, bits):
+    with pytest.raises(ValueError, match="Unsupported WAV encoding"):
+        WavView(raw_wav(tmp_path / "x.wav", audio_format, bits))
+
+
+def test_non_wave_files_are_rejected(tmp_path):
+    (tmp_path / "x.wav").write_bytes(b"ID3\x03" + bytes(100))
+    with pytest.raises(ValueError, match="not a RIFF/WAVE"):
+        WavView(str(tmp_path / "x.wav"))